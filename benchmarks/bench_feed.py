@@ -0,0 +1,119 @@
+"""Student /updates feed: join over updates x enrollments vs. the student_feed inbox.
+
+    python benchmarks/bench_feed.py --courses 200 --updates 50000
+
+Seeds a throwaway copy of database.db, enrolls a student in a few courses,
+and times the first page and a deep page of their feed both ways.
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import feed  # noqa: E402
+import migrate  # noqa: E402
+
+JOIN_QUERY = '''
+    SELECT updates.id, updates.message, updates.created_at, updates.teacher_id,
+           users.name, updates.title
+    FROM updates
+    JOIN users ON updates.teacher_id = users.id
+    JOIN enrollments ON enrollments.course_id = updates.course_id
+    WHERE enrollments.student_id = ?
+      AND (updates.created_at, updates.id) < (?, ?)
+    ORDER BY updates.created_at DESC, updates.id DESC
+    LIMIT ?
+'''
+
+TOP = ('9999-12-31', 2 ** 62)
+
+
+def prepare_database(path, args):
+    shutil.copy(os.path.join(ROOT, 'database.db'), path)
+    migrate.upgrade(path)
+    rng = random.Random(42)
+    conn = sqlite3.connect(path)
+    admin_id = conn.execute("SELECT id FROM users WHERE role = 'admin' LIMIT 1").fetchone()[0]
+    course_ids = [conn.execute('INSERT INTO courses (name, code) VALUES (?, ?)', (f'Bench {i}', f'B{i}')).lastrowid
+                  for i in range(args.courses)]
+    student_id = conn.execute(
+        "INSERT INTO users (name, role, phone, password_hash) VALUES ('Bench Student', 'student', 'bench', 'x')"
+    ).lastrowid
+    conn.executemany('INSERT INTO enrollments (student_id, course_id) VALUES (?, ?)',
+                     [(student_id, c) for c in rng.sample(course_ids, args.enrolled)])
+    start = time.perf_counter()
+    conn.executemany(
+        'INSERT INTO updates (course_id, teacher_id, title, message, created_at) VALUES (?, ?, ?, ?, ?)',
+        [(rng.choice(course_ids), admin_id, f'Update {n}', 'x' * 200,
+          f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00:00')
+         for n in range(args.updates)],
+    )
+    conn.commit()
+    write_time = time.perf_counter() - start
+    conn.close()
+    return student_id, write_time
+
+
+def timed(fn, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return sorted(latencies)[len(latencies) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--courses', type=int, default=200)
+    parser.add_argument('--enrolled', type=int, default=5)
+    parser.add_argument('--updates', type=int, default=50000)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-feed-')
+    try:
+        path = os.path.join(workdir, 'database.db')
+        student_id, write_time = prepare_database(path, args)
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+
+        def join_page(before):
+            return conn.execute(JOIN_QUERY, (student_id, before[0], before[1], args.page_size + 1)).fetchall()
+
+        def inbox_page(before):
+            return feed.page(conn, student_id, before, args.page_size + 1)
+
+        # A cursor half way down the student's feed
+        rows = inbox_page(TOP)
+        all_rows = conn.execute('SELECT created_at, update_id FROM student_feed WHERE student_id = ? '
+                                'ORDER BY created_at DESC, update_id DESC', (student_id,)).fetchall()
+        deep = tuple(all_rows[len(all_rows) // 2]) if all_rows else TOP
+        assert [r['id'] for r in join_page(TOP)] == [r['id'] for r in rows], 'inbox and join disagree'
+
+        results = {
+            'first page': (timed(lambda: join_page(TOP), args.repeat), timed(lambda: inbox_page(TOP), args.repeat)),
+            'deep page': (timed(lambda: join_page(deep), args.repeat), timed(lambda: inbox_page(deep), args.repeat)),
+        }
+        feed_rows = conn.execute('SELECT COUNT(*) FROM student_feed').fetchone()[0]
+        conn.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f'{args.updates} updates in {args.courses} courses, student in {args.enrolled}; '
+          f'{feed_rows} inbox row(s), writing updates took {write_time:.2f}s')
+    for name, (join, inbox) in results.items():
+        print(f'{name:10}  join p50={join * 1000:7.3f} ms   inbox p50={inbox * 1000:7.3f} ms   '
+              f'({join / inbox:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
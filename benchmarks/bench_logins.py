@@ -0,0 +1,126 @@
+"""Logins per second under concurrency, hashing inline vs. in the process pool.
+
+    python benchmarks/bench_logins.py --clients 16 --seconds 10
+
+Runs POST /login from concurrent clients against a throwaway copy of
+database.db and prints throughput, p50/p99 latency and the number of 503
+(backpressure) answers for each mode.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('AUTO_MIGRATE', '0')
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+import db  # noqa: E402
+import hashing  # noqa: E402
+import migrate  # noqa: E402
+from app import app  # noqa: E402
+
+PASSWORD = 'bench-password'
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def prepare_database(path, students, method):
+    shutil.copy(os.path.join(ROOT, 'database.db'), path)
+    migrate.upgrade(path)
+    conn = sqlite3.connect(path)
+    pwhash = generate_password_hash(PASSWORD, method)
+    conn.executemany(
+        "INSERT INTO users (name, role, phone, password_hash) VALUES (?, 'student', ?, ?)",
+        [(f'Login Bench {i}', f'login-bench-{i}', pwhash) for i in range(students)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def run_mode(label, workers, args, path):
+    hasher = hashing.PasswordHasher(method=args.method, workers=workers, max_pending=args.max_pending)
+    app.extensions['password_hasher'] = hasher
+    app.extensions['db_pool'] = db.ConnectionPool(path, size=args.clients)
+
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    # Warm the pool so process start-up is not counted
+    if workers:
+        hasher.verify(generate_password_hash('warm', args.method), 'warm')
+
+    def client_loop(n):
+        client = app.test_client()
+        i = n
+        while not stop.is_set():
+            start = time.perf_counter()
+            resp = client.post('/login', data={
+                'phone': f'login-bench-{i % args.students}', 'password': PASSWORD,
+            })
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+            i += args.clients
+            if resp.status_code == 503:
+                # Well-behaved clients honour Retry-After
+                time.sleep(float(resp.headers.get('Retry-After', 1)))
+
+    threads = [threading.Thread(target=client_loop, args=(n,)) for n in range(args.clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    hasher.shutdown()
+    app.extensions['db_pool'].close_all()
+
+    ok = statuses.get(302, 0)
+    print(f'{label:8} logins/s={ok / elapsed:8.1f}  '
+          f'p50={percentile(latencies, 50) * 1000:8.1f} ms  '
+          f'p99={percentile(latencies, 99) * 1000:8.1f} ms  '
+          f'503={statuses.get(503, 0)}  other={sum(v for k, v in statuses.items() if k not in (302, 503))}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--students', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='hashing processes for the pool run')
+    parser.add_argument('--max-pending', type=int, default=None)
+    parser.add_argument('--method', default=hashing.DEFAULT_METHOD)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-logins-')
+    path = os.path.join(workdir, 'database.db')
+    try:
+        prepare_database(path, args.students, args.method)
+        app.config['DATABASE'] = path
+        run_mode('inline', 0, args, path)
+        run_mode('pool', args.workers, args, path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""FTS5 search (search.py) vs. naive LIKE '%term%' scans over the same tables.
+
+    python benchmarks/bench_search.py --updates 20000 --queries 200
+
+Seeds a throwaway copy of database.db with synthetic updates, events,
+resources and videos, then runs the same queries both ways as an enrolled
+student and prints p50/p99 latency per approach.
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import migrate  # noqa: E402
+import search  # noqa: E402
+
+SYLLABLES = 'ka lo mi ne ru sa ti vo ze ba de fi go hu ja'.split()
+
+
+def vocabulary(rng, size):
+    # Made-up words with Zipf-like frequencies: a few very common, most rare
+    words = sorted({''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(size * 2)})
+    rng.shuffle(words)
+    words = words[:size]
+    return words, [1 / (rank + 1) for rank in range(len(words))]
+
+
+LIKE_QUERY = '''
+    SELECT 'update', id, title FROM updates
+    WHERE (title LIKE :p OR message LIKE :p)
+      AND course_id IN (SELECT course_id FROM enrollments WHERE student_id = :student)
+    UNION ALL
+    SELECT 'event', id, title FROM events WHERE title LIKE :p OR description LIKE :p
+    UNION ALL
+    SELECT 'resource', id, title FROM resources
+    WHERE title LIKE :p AND course_id IN (SELECT course_id FROM enrollments WHERE student_id = :student)
+    UNION ALL
+    SELECT 'video', id, title FROM videos
+    WHERE title LIKE :p AND course_id IN (SELECT course_id FROM enrollments WHERE student_id = :student)
+    LIMIT 20
+'''
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def text(rng, vocab, n):
+    words, weights = vocab
+    return ' '.join(rng.choices(words, weights, k=n))
+
+
+def prepare_database(path, args, vocab):
+    shutil.copy(os.path.join(ROOT, 'database.db'), path)
+    migrate.upgrade(path)
+    rng = random.Random(42)
+    conn = sqlite3.connect(path)
+    admin_id = conn.execute("SELECT id FROM users WHERE role = 'admin' LIMIT 1").fetchone()[0]
+    course_ids = [conn.execute('INSERT INTO courses (name, code) VALUES (?, ?)', (f'Bench {i}', f'B{i}')).lastrowid
+                  for i in range(args.courses)]
+    student_id = conn.execute(
+        "INSERT INTO users (name, role, phone, password_hash) VALUES ('Bench Student', 'student', 'bench', 'x')"
+    ).lastrowid
+    conn.executemany('INSERT INTO enrollments (student_id, course_id) VALUES (?, ?)',
+                     [(student_id, c) for c in course_ids[:3]])
+    conn.executemany(
+        'INSERT INTO updates (course_id, teacher_id, title, message) VALUES (?, ?, ?, ?)',
+        [(rng.choice(course_ids), admin_id, text(rng, vocab, 5), text(rng, vocab, 60)) for _ in range(args.updates)],
+    )
+    conn.executemany(
+        'INSERT INTO events (title, description, created_by) VALUES (?, ?, ?)',
+        [(text(rng, vocab, 4), text(rng, vocab, 40), admin_id) for _ in range(args.updates // 10)],
+    )
+    conn.executemany(
+        "INSERT INTO resources (course_id, filename, title) VALUES (?, 'bench.pdf', ?)",
+        [(rng.choice(course_ids), text(rng, vocab, 6)) for _ in range(args.updates // 4)],
+    )
+    conn.executemany(
+        "INSERT INTO videos (course_id, title, embed_code) VALUES (?, ?, '')",
+        [(rng.choice(course_ids), text(rng, vocab, 6)) for _ in range(args.updates // 4)],
+    )
+    conn.commit()
+    conn.close()
+    return student_id
+
+
+def timed(fn, queries):
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--updates', type=int, default=20000)
+    parser.add_argument('--courses', type=int, default=20)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--vocabulary', type=int, default=5000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-search-')
+    try:
+        path = os.path.join(workdir, 'database.db')
+        rng = random.Random(7)
+        vocab = vocabulary(rng, args.vocabulary)
+        student_id = prepare_database(path, args, vocab)
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+
+        # Common words match thousands of documents, rare ones a handful;
+        # the two behave very differently under both approaches
+        words = vocab[0]
+        groups = {
+            'common': [rng.choice(words[:20]) for _ in range(args.queries)],
+            'rare': [rng.choice(words[len(words) // 2:]) for _ in range(args.queries)],
+        }
+        results = {}
+        for group, queries in groups.items():
+            results[group] = (
+                timed(lambda q: search.search(conn, q, student_id, 'student'), queries),
+                timed(lambda q: conn.execute(LIKE_QUERY, {'p': f'%{q}%', 'student': student_id}).fetchall(),
+                      queries),
+            )
+        conn.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    docs = args.updates + args.updates // 10 + 2 * (args.updates // 4)
+    print(f'{docs} documents, {args.queries} queries per group')
+    for group, (fts, like) in results.items():
+        print(f'\n== {group} words ==')
+        for name, lat in (('fts5', fts), ('like', like)):
+            print(f'{name:5}  p50={percentile(lat, 50) * 1000:8.2f} ms  p99={percentile(lat, 99) * 1000:8.2f} ms')
+        print(f'p50 speedup: {percentile(like, 50) / percentile(fts, 50):.1f}x')
+    print('\nLIKE stops at the first 20 matches in table order, unranked; FTS ranks every match.')
+
+
+if __name__ == '__main__':
+    main()
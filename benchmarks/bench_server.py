@@ -0,0 +1,129 @@
+"""Production server (serve.py, gunicorn) vs. the Werkzeug dev server.
+
+    python benchmarks/bench_server.py
+    python benchmarks/bench_server.py --scale medium --users 32 --iterations 3
+
+Seeds one database with seed.py and starts each server in its own process
+on it: the dev server the way `python app.py` used to run it (app.run,
+threaded, HTTP/1.0) and `python serve.py` with its computed settings. The
+load_test.py journeys then run against each over real HTTP. Reports
+throughput, p95 per route, errors, the memory of the server's process tree
+after the run and how long it takes to stop on SIGTERM.
+"""
+import argparse
+import http.client
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from load_test import ROOT, HttpSession, print_report, run, seed
+
+DEV_SERVER = "import os; from app import app; app.run(host='127.0.0.1', port=int(os.environ['PORT']))"
+SERVERS = {
+    'dev': [sys.executable, '-c', DEV_SERVER],
+    'serve.py': [sys.executable, 'serve.py'],
+}
+
+
+def wait_until_up(port, proc, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            sys.exit(f'Server exited with {proc.returncode} before answering')
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/login')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    sys.exit(f'Server not answering on port {port} after {timeout}s')
+
+
+def tree_rss(pid):
+    """Resident memory of a process and its descendants in MB (Linux only, else None)."""
+    total, pids = 0, [pid]
+    while pids:
+        pid = pids.pop()
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+            for tid in os.listdir(f'/proc/{pid}/task'):
+                with open(f'/proc/{pid}/task/{tid}/children') as f:
+                    pids.extend(int(p) for p in f.read().split())
+        except (OSError, StopIteration):
+            if total == 0 and not os.path.exists('/proc'):
+                return None
+    return round(total / 1024, 1)
+
+
+def free_port():
+    import socket
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def bench(name, command, env, data, args):
+    port = free_port()
+    env = dict(env, PORT=str(port))
+    proc = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up(port, proc)
+        result = run(lambda: HttpSession(f'http://127.0.0.1:{port}'), data, args)
+        result['rss_mb'] = tree_rss(proc.pid)
+        start = time.perf_counter()
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=120)
+        result['shutdown_s'] = round(time.perf_counter() - start, 2)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=list(seed.SCALES), default='small')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--users', type=int, default=16, help='concurrent virtual users')
+    parser.add_argument('--admins', type=int, default=1, help='how many of them are admins')
+    parser.add_argument('--iterations', type=int, default=5, help='journeys per user')
+    parser.add_argument('--server', choices=list(SERVERS), action='append', help='only these (repeatable)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-server-')
+    results = {}
+    try:
+        path = os.path.join(workdir, 'database.db')
+        uploads = os.path.join(workdir, 'uploads')
+        data = seed.build(path, args.scale, args.seed, uploads)
+        print(f"{args.scale} dataset, {args.users} users x {args.iterations} journeys")
+        env = dict(os.environ, DATABASE=path, UPLOAD_FOLDER=uploads, AUTO_MIGRATE='0', HOST='127.0.0.1')
+        env.pop('JOB_WORKERS', None)  # load_test sets 0 for itself; the servers run as deployed
+
+        for name in args.server or SERVERS:
+            results[name] = bench(name, SERVERS[name], env, data, args)
+            print_report(name, results[name])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    names = list(results)
+    print(f"\n{'':26}" + ''.join(f'{n:>14}' for n in names))
+    for label, key in (('req/s', 'rps'), ('memory MB', 'rss_mb'), ('stop on SIGTERM s', 'shutdown_s')):
+        print(f'{label:26}' + ''.join(f"{'-' if results[n][key] is None else results[n][key]:>14}" for n in names))
+    print(f"{'errors':26}" + ''.join(f"{sum(r['errors'] for r in results[n]['routes'].values()):>14}"
+                                    for n in names))
+    for label in results[names[0]]['routes']:
+        print(f'{"p95 ms " + label:26}' + ''.join(
+            f"{results[n]['routes'].get(label, {}).get('p95_ms', '-'):>14}" for n in names))
+
+
+if __name__ == '__main__':
+    main()
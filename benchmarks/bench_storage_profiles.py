@@ -0,0 +1,144 @@
+"""Readers on /updates vs. a writer on /upload_update, once per storage profile.
+
+    python benchmarks/bench_storage_profiles.py --readers 8 --seconds 10
+
+Runs against a throwaway copy of database.db and prints p50/p99 latency and the
+number of "database is locked" errors for each side.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from flask import got_request_exception
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('AUTO_MIGRATE', '0')  # migrations run on the copy instead
+
+import db  # noqa: E402
+import migrate  # noqa: E402
+from app import app  # noqa: E402
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def prepare_database(path):
+    shutil.copy(os.path.join(ROOT, 'database.db'), path)
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode = DELETE')
+    course_id = conn.execute(
+        "INSERT INTO courses (name, code) VALUES ('Bench Course', 'BENCH')"
+    ).lastrowid
+    student_id = conn.execute(
+        "INSERT INTO users (name, role, phone, password_hash) VALUES ('Bench Student', 'student', 'bench', 'x')"
+    ).lastrowid
+    admin_id = conn.execute("SELECT id FROM users WHERE role = 'admin' LIMIT 1").fetchone()[0]
+    conn.execute('INSERT INTO enrollments (student_id, course_id) VALUES (?, ?)', (student_id, course_id))
+    conn.executemany(
+        'INSERT INTO updates (course_id, teacher_id, title, message) VALUES (?, ?, ?, ?)',
+        [(course_id, admin_id, f'Seed {i}', 'seed message ' * 20) for i in range(500)],
+    )
+    conn.commit()
+    conn.close()
+    migrate.upgrade(path)
+    return course_id, student_id, admin_id
+
+
+def run_profile(profile, args):
+    workdir = tempfile.mkdtemp(prefix='bench-profile-')
+    path = os.path.join(workdir, 'database.db')
+    course_id, student_id, admin_id = prepare_database(path)
+
+    app.config['DATABASE'] = path
+    app.extensions['db_pool'] = db.ConnectionPool(
+        path, size=args.readers + 1, pragmas=db.PRAGMA_PROFILES[profile]
+    )
+
+    results = {'read': [], 'write': []}
+    locked = {'read': 0, 'write': 0}
+    failed = {'read': 0, 'write': 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+    current = threading.local()
+
+    def on_exception(sender, exception, **extra):
+        if isinstance(exception, sqlite3.OperationalError) and 'locked' in str(exception):
+            with lock:
+                locked[current.kind] += 1
+
+    got_request_exception.connect(on_exception, app)
+
+    def worker(kind, user_id, role):
+        current.kind = kind
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+            sess['role'] = role
+        n = 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            if kind == 'read':
+                resp = client.get('/updates')
+            else:
+                n += 1
+                resp = client.post('/upload_update', data={
+                    'course_id': course_id, 'title': f'Bench {n}', 'message': 'benchmark write',
+                })
+            elapsed = time.perf_counter() - start
+            with lock:
+                results[kind].append(elapsed)
+                if resp.status_code >= 500:
+                    failed[kind] += 1
+            if kind == 'write' and args.write_interval:
+                time.sleep(args.write_interval)
+
+    threads = [threading.Thread(target=worker, args=('read', student_id, 'student')) for _ in range(args.readers)]
+    threads.append(threading.Thread(target=worker, args=('write', admin_id, 'admin')))
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    got_request_exception.disconnect(on_exception, app)
+    app.extensions['db_pool'].close_all()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f'\n== {profile} ==')
+    for kind in ('read', 'write'):
+        lat = results[kind]
+        print(f'{kind:5}  requests={len(lat):6}  '
+              f'p50={percentile(lat, 50) * 1000:8.2f} ms  '
+              f'p99={percentile(lat, 99) * 1000:8.2f} ms  '
+              f'locked={locked[kind]}  5xx={failed[kind]}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--write-interval', type=float, default=0.0,
+                        help='pause between writes, in seconds')
+    parser.add_argument('--profiles', nargs='+', default=['default', 'production'],
+                        choices=sorted(db.PRAGMA_PROFILES))
+    args = parser.parse_args()
+
+    for profile in args.profiles:
+        run_profile(profile, args)
+
+
+if __name__ == '__main__':
+    main()
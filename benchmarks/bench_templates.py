@@ -0,0 +1,170 @@
+"""Per-template cost: compiling from source, loading from the bytecode cache, rendering.
+
+    python benchmarks/bench_templates.py
+    python benchmarks/bench_templates.py --scale small --repeat 50
+
+For every template the app can render:
+- compile: parse the source and compile it to Python, what each worker
+  did on a template's first use before the bytecode cache (templating.py),
+- cached: load the same template from a warm FileSystemBytecodeCache,
+  what a worker does now (nothing, under serve.py, where the master
+  loads them before forking),
+- render: the median time spent in Template.render on the pages that use
+  it, with real view data from a seed.py database (between Flask's
+  before_render_template and template_rendered signals, so it includes
+  the layouts and macros the template pulls in, but not the view's SQL).
+Templates no page renders are only compiled.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('AUTO_MIGRATE', '0')
+os.environ.setdefault('JOB_WORKERS', '0')
+
+from flask import before_render_template, template_rendered  # noqa: E402
+from jinja2 import FileSystemBytecodeCache  # noqa: E402
+
+import db  # noqa: E402
+import seed  # noqa: E402
+from app import app  # noqa: E402
+
+# (role, path); None is a visitor who is not logged in
+PAGES = [
+    (None, '/'),
+    (None, '/login'),
+    (None, '/courses'),
+    ('student', '/dashboard'),
+    ('student', '/student/enroll'),
+    ('student', '/updates'),
+    ('student', '/resources'),
+    ('student', '/videos'),
+    ('student', '/videos/watch/{video}'),
+    ('student', '/events'),
+    ('student', '/search?q=exam+notes'),
+    ('admin', '/dashboard'),
+    ('admin', '/updates'),
+    ('admin', '/upload_update'),
+    ('admin', '/admin/add-student'),
+    ('admin', '/admin/import-students'),
+    ('admin', '/admin/manage_course'),
+    ('admin', '/admin/edit_course/{course}'),
+    ('admin', '/admin/schedule-change'),
+    ('admin', '/manage-events'),
+    ('admin', '/manage-users'),
+    ('admin', '/edit-user/{student}'),
+    ('admin', '/admin/manage_resources'),
+    ('admin', '/admin/course/{course}/resources'),
+    ('admin', '/admin/resource/{resource}/edit'),
+    ('admin', '/admin/manage_videos'),
+    ('admin', '/admin/course/{course}/videos'),
+    ('admin', '/admin/video/{video}/edit'),
+]
+
+
+def median_ms(values):
+    return statistics.median(values) * 1000
+
+
+def load_times(names, bytecode_cache, repeat):
+    """Median ms to load each template, with no in-memory template cache."""
+    env = app.create_jinja_environment()
+    env.cache = None
+    env.bytecode_cache = bytecode_cache
+    if bytecode_cache is not None:
+        for name in names:
+            env.get_template(name)  # fill it
+    times = {}
+    for name in names:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            env.get_template(name)
+            samples.append(time.perf_counter() - start)
+        times[name] = median_ms(samples)
+    return times
+
+
+def render_times(ids, users, repeat):
+    """{template: (median render ms, first page that rendered it)}, from `repeat` walks over PAGES."""
+    samples, pages, started = {}, {}, []
+
+    def before(sender, template, context, **extra):
+        started.append(time.perf_counter())
+
+    def after(sender, template, context, **extra):
+        samples.setdefault(template.name, []).append(time.perf_counter() - started.pop())
+
+    before_render_template.connect(before, app)
+    template_rendered.connect(after, app)
+    try:
+        for _ in range(repeat):
+            for role, path in PAGES:
+                path = path.format(**ids)
+                client = app.test_client()
+                if role:
+                    with client.session_transaction() as sess:
+                        sess['user_id'] = users[role]
+                        sess['role'] = role
+                seen = set(samples)
+                resp = client.get(path)
+                if resp.status_code != 200:
+                    sys.exit(f'{path} as {role or "visitor"} returned {resp.status_code}')
+                for name in set(samples) - seen:
+                    pages[name] = f'{path} ({role or "visitor"})'
+    finally:
+        before_render_template.disconnect(before, app)
+        template_rendered.disconnect(after, app)
+    return {name: (median_ms(values), pages[name]) for name, values in samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=list(seed.SCALES), default='tiny')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-templates-')
+    try:
+        path = os.path.join(workdir, 'database.db')
+        data = seed.build(path, args.scale)
+        conn = sqlite3.connect(path)
+        ids = {
+            'course': conn.execute('SELECT MIN(id) FROM courses').fetchone()[0],
+            'resource': conn.execute('SELECT MIN(id) FROM resources').fetchone()[0],
+            'video': conn.execute('SELECT MIN(id) FROM videos').fetchone()[0],
+            'student': data['students'][0],
+        }
+        conn.close()
+        app.config['DATABASE'] = path
+        app.extensions['db_pool'] = db.ConnectionPool(path, size=1)
+
+        names = sorted(app.jinja_env.list_templates())
+        compiled = load_times(names, None, args.repeat)
+        cached = load_times(names, FileSystemBytecodeCache(workdir), args.repeat)
+        rendered = render_times(ids, {'student': data['students'][0], 'admin': data['admins'][0]}, args.repeat)
+        app.extensions['db_pool'].close_all()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f'{args.scale} dataset, median of {args.repeat}\n')
+    print(f"{'template':<28} {'lines':>5} {'compile ms':>10} {'cached ms':>9} {'render ms':>9}  page")
+    for name in names:
+        source, _, _ = app.jinja_env.loader.get_source(app.jinja_env, name)
+        render_ms, page = rendered.get(name, (None, ''))
+        print(f"{name:<28} {source.count(chr(10)):>5} {compiled[name]:10.2f} {cached[name]:9.2f} "
+              f"{'-' if render_ms is None else f'{render_ms:.2f}':>9}  {page}")
+    print(f"\nAll {len(names)} templates: compile {sum(compiled.values()):.1f} ms, "
+          f"from the bytecode cache {sum(cached.values()):.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Fail if starting the app imports too much or takes too long.
+
+    python benchmarks/check_import_time.py
+    python benchmarks/check_import_time.py --runs 9 --top 25
+
+Builds the default app in fresh interpreters under `python -X importtime`,
+as a gunicorn worker or a new autoscaled instance does (without the
+migration check), and takes the median of --runs. Fails when
+- startup (imports plus create_app) takes longer than --budget-ms,
+- this repository's own modules spend more than --own-budget-ms importing,
+- a module in HEAVY is imported at startup: those are optional or rarely
+  needed and belong inside the function that uses them.
+Prints the slowest imports, to show where the time went.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = (
+    'pymupdf', 'fitz', 'openpyxl', 'cachelib', 'eventlet', 'gunicorn', 'waitress',
+    'multiprocessing', 'concurrent.futures.process',
+    'numpy', 'pandas', 'scipy', 'sklearn', 'matplotlib', 'tensorflow', 'keras', 'h5py', 'grpc', 'cv2', 'openai',
+)
+
+STARTUP = 'import time; t = time.perf_counter(); import app; app.app; print(time.perf_counter() - t)'
+LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def own_modules():
+    names = {f[:-3] for f in os.listdir(ROOT) if f.endswith('.py')}
+    names.update(f'views.{f[:-3]}' for f in os.listdir(os.path.join(ROOT, 'views')) if f.endswith('.py'))
+    names.add('views')
+    return names - {'views.__init__'}
+
+
+def measure():
+    """One cold start: (seconds, {module: (self_us, cumulative_us)})."""
+    env = dict(os.environ, AUTO_MIGRATE='0', PYTHONDONTWRITEBYTECODE='1')
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', STARTUP], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            modules[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return float(proc.stdout.strip().splitlines()[-1]), modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=400, help='imports plus create_app')
+    parser.add_argument('--own-budget-ms', type=float, default=60, help="this repository's modules, self time")
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    subprocess.run([sys.executable, '-c', 'import app'], cwd=ROOT, check=True)  # warm the OS file cache
+    runs = [measure() for _ in range(args.runs)]
+    startup_ms = statistics.median(seconds for seconds, _ in runs) * 1000
+    names = set().union(*(modules for _, modules in runs))
+
+    def median_us(name, column):
+        return statistics.median(modules[name][column] for _, modules in runs if name in modules)
+
+    own = own_modules()
+    own_ms = sum(median_us(name, 0) for name in names & own) / 1000
+
+    print(f'startup {startup_ms:.1f} ms (budget {args.budget_ms:g}), own modules {own_ms:.1f} ms '
+          f'(budget {args.own_budget_ms:g}), {len(names)} modules, median of {args.runs} runs\n')
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+    for name in sorted(names, key=lambda n: median_us(n, 1), reverse=True)[:args.top]:
+        print(f'{median_us(name, 1) / 1000:14.1f} {median_us(name, 0) / 1000:8.1f}  {name}'
+              f"{'  (own)' if name in own else ''}")
+
+    problems = []
+    if startup_ms > args.budget_ms:
+        problems.append(f'startup takes {startup_ms:.1f} ms, budget {args.budget_ms:g} ms')
+    if own_ms > args.own_budget_ms:
+        problems.append(f"this repository's modules take {own_ms:.1f} ms to import, budget {args.own_budget_ms:g} ms")
+    for name in sorted(names):
+        if name in HEAVY or name.split('.')[0] in HEAVY:
+            problems.append(f'{name} is imported at startup; import it where it is used')
+
+    if problems:
+        print('\nFAILED:\n  ' + '\n  '.join(problems))
+        sys.exit(1)
+    print('\nWithin budget.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Fail if a page's SQL statement count grows with the amount of data.
+
+    python benchmarks/check_query_counts.py
+
+Each route is requested against a small and a large copy of database.db.
+Pages that are meant to run a fixed number of queries must issue the same
+number of statements at both sizes.
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+from flask import g
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('AUTO_MIGRATE', '0')
+
+import db  # noqa: E402
+import migrate  # noqa: E402
+from app import app  # noqa: E402
+
+# (path, role) pairs whose query count must not depend on data size
+ROUTES = [
+    ('/manage-users', 'admin'),
+    ('/resources', 'student'),
+    ('/videos', 'student'),
+]
+
+SCALES = (5, 50)
+
+
+def seed(path, scale):
+    """`scale` courses and students, every student enrolled in every course."""
+    shutil.copy(os.path.join(ROOT, 'database.db'), path)
+    migrate.upgrade(path)
+    conn = sqlite3.connect(path)
+    course_ids = [
+        conn.execute('INSERT INTO courses (name, code) VALUES (?, ?)', (f'Course {i}', f'C{i}')).lastrowid
+        for i in range(scale)
+    ]
+    student_ids = [
+        conn.execute(
+            "INSERT INTO users (name, role, roll, phone, password_hash) VALUES (?, 'student', ?, ?, 'x')",
+            (f'Student {i}', f'R{i}', f'count-{i}'),
+        ).lastrowid
+        for i in range(scale)
+    ]
+    conn.executemany(
+        'INSERT INTO enrollments (student_id, course_id) VALUES (?, ?)',
+        [(s, c) for s in student_ids for c in course_ids],
+    )
+    conn.executemany(
+        'INSERT INTO resources (course_id, filename, title) VALUES (?, ?, ?)',
+        [(c, f'{c}-{n}.pdf', f'Resource {n}') for c in course_ids for n in range(2)],
+    )
+    conn.executemany(
+        'INSERT INTO videos (course_id, title, embed_code) VALUES (?, ?, ?)',
+        [(c, f'Video {n}', '<iframe></iframe>') for c in course_ids for n in range(2)],
+    )
+    admin_id = conn.execute("SELECT id FROM users WHERE role = 'admin' LIMIT 1").fetchone()[0]
+    conn.commit()
+    conn.close()
+    return {'admin': admin_id, 'student': student_ids[0]}
+
+
+def main():
+    counts = []
+    app.config['COUNT_QUERIES'] = True
+    app.teardown_request(lambda exc: counts.append(g.get('sql_count', 0)))
+
+    results = {}
+    for scale in SCALES:
+        workdir = tempfile.mkdtemp(prefix='query-count-')
+        path = os.path.join(workdir, 'database.db')
+        users = seed(path, scale)
+        app.config['DATABASE'] = path
+        app.extensions['db_pool'] = db.ConnectionPool(path, size=1)
+
+        for route, role in ROUTES:
+            client = app.test_client()
+            with client.session_transaction() as sess:
+                sess['user_id'] = users[role]
+                sess['role'] = role
+            del counts[:]
+            resp = client.get(route)
+            if resp.status_code != 200:
+                sys.exit(f'{route} returned {resp.status_code} at scale {scale}')
+            results.setdefault(route, []).append(counts[-1])
+
+        app.extensions['db_pool'].close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    failed = False
+    for route, per_scale in results.items():
+        ok = len(set(per_scale)) == 1
+        failed = failed or not ok
+        sizes = ', '.join(f'{n} at scale {s}' for s, n in zip(SCALES, per_scale))
+        print(f"{'ok  ' if ok else 'FAIL'} {route}: {sizes}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Fail if X-Accel-Redirect / X-Sendfile would make the proxy serve the wrong file.
+
+    python benchmarks/check_sendfile.py
+
+Builds a small seed.py database with uploads, then requests each kind of
+stored file with FILE_SENDFILE_MODE set to 'x-accel' and to 'x-sendfile'.
+The header is resolved the way the proxy would (for x-accel through the
+prefix -> folder mapping in file_serving.py), and the file it names must
+have the same bytes the app serves itself with FILE_SENDFILE_MODE unset.
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from urllib.parse import unquote
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('AUTO_MIGRATE', '0')
+os.environ.setdefault('JOB_WORKERS', '0')
+
+import db  # noqa: E402
+import seed  # noqa: E402
+from app import app  # noqa: E402
+
+VIDEO = 'check-sendfile.mp4'
+THUMB = 'check-sendfile.jpg'
+
+
+def files(data):
+    """(label, url) for each kind of stored file."""
+    return [
+        ('sharded blob PDF', f"/pdf/{data['pdfs'][0]}"),
+        ('legacy PDF', '/pdf/legacy.pdf'),
+        ('PDF thumbnail', f'/thumb/{THUMB}'),
+        ('lecture video', f'/lectures/{VIDEO}'),
+    ]
+
+
+def proxied_path(response, mode):
+    """The file the proxy would send for this response."""
+    if mode == 'x-sendfile':
+        return response.headers.get('X-Sendfile')
+    header = response.headers.get('X-Accel-Redirect')
+    if header is None:
+        return None
+    for prefix, folder in ((app.config['FILE_ACCEL_PREFIX'], app.config['UPLOAD_FOLDER']),
+                           (app.config['VIDEO_ACCEL_PREFIX'], app.config['VIDEO_UPLOAD_FOLDER'])):
+        prefix = prefix.rstrip('/') + '/'
+        if header.startswith(prefix):
+            return os.path.join(folder, *unquote(header[len(prefix):]).split('/'))
+    return None
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix='check-sendfile-')
+    problems = []
+    try:
+        path = os.path.join(workdir, 'database.db')
+        uploads = os.path.join(workdir, 'uploads')
+        videos = os.path.join(workdir, 'videos')
+        data = seed.build(path, 'tiny', upload_folder=uploads)
+
+        os.makedirs(videos)
+        with open(os.path.join(uploads, 'legacy.pdf'), 'wb') as f:
+            f.write(b'%PDF-1.4\n% uploaded before the blob store\n%%EOF\n')
+        os.makedirs(os.path.join(uploads, 'thumbs'), exist_ok=True)
+        with open(os.path.join(uploads, 'thumbs', THUMB), 'wb') as f:
+            f.write(b'\xff\xd8\xff\xe0' + b'\0' * 1024)
+        with open(os.path.join(videos, VIDEO), 'wb') as f:
+            f.write(b'\0' * 4096)
+        conn = sqlite3.connect(path)
+        conn.execute("INSERT INTO videos (course_id, title, embed_code, filename) VALUES "
+                     "((SELECT MIN(id) FROM courses), 'Uploaded lecture', '', ?)", (VIDEO,))
+        conn.commit()
+        conn.close()
+
+        app.config.update(DATABASE=path, UPLOAD_FOLDER=uploads, THUMBNAIL_FOLDER=os.path.join(uploads, 'thumbs'),
+                          VIDEO_UPLOAD_FOLDER=videos)
+        app.extensions['db_pool'] = db.ConnectionPool(path, size=1)
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = data['admins'][0]
+            sess['role'] = 'admin'
+
+        for label, url in files(data):
+            app.config['FILE_SENDFILE_MODE'] = None
+            direct = client.get(url)
+            if direct.status_code != 200:
+                problems.append(f'{label}: {url} returned {direct.status_code}')
+                continue
+            for mode in ('x-accel', 'x-sendfile'):
+                app.config['FILE_SENDFILE_MODE'] = mode
+                target = proxied_path(client.get(url), mode)
+                if target is None or not os.path.isfile(target):
+                    problems.append(f'{label}, {mode}: the proxy would look for {target}, which does not exist')
+                    continue
+                with open(target, 'rb') as f:
+                    if f.read() != direct.data:
+                        problems.append(f'{label}, {mode}: {target} is not the file the app serves')
+                        continue
+                print(f'ok   {label}, {mode}: {os.path.relpath(target, workdir)}')
+        app.extensions['db_pool'].close_all()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if problems:
+        print('\nFAILED:\n  ' + '\n  '.join(problems))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""Fail if open /stream pages are limited by the server's thread count.
+
+    python benchmarks/check_stream_concurrency.py
+    python benchmarks/check_stream_concurrency.py --streams 500
+    WEB_WORKER_CLASS=gthread python benchmarks/check_stream_concurrency.py   # fails
+
+Starts `python serve.py` with one worker on a seed.py database and opens
+--streams /stream connections as a logged-in student, several times the 21
+threads a gthread worker would have. With all of them open it checks that
+/dashboard still answers, then publishes one event and checks that every
+stream receives it.
+"""
+import argparse
+import http.client
+import os
+import selectors
+import shutil
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+from bench_server import free_port, wait_until_up
+from load_test import ROOT, seed
+
+EVENT = b'event: check-stream-concurrency'
+
+
+def login(port, phone):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    conn.request('POST', '/login', urlencode({'phone': phone, 'password': seed.PASSWORD}),
+                 {'Content-Type': 'application/x-www-form-urlencoded'})
+    resp = conn.getresponse()
+    resp.read()
+    conn.close()
+    cookie = resp.getheader('Set-Cookie', '').split(';', 1)[0]
+    if resp.status != 302 or not cookie:
+        sys.exit(f'Login as {phone} returned {resp.status}')
+    return cookie
+
+
+def open_streams(port, cookie, count):
+    """{socket: bytes received}, each with a /stream request sent."""
+    request = (f'GET /stream HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: {cookie}\r\n'
+               'Accept: text/event-stream\r\n\r\n').encode()
+    streams = {}
+    for _ in range(count):
+        sock = socket.create_connection(('127.0.0.1', port))
+        sock.sendall(request)
+        sock.setblocking(False)
+        streams[sock] = b''
+    return streams
+
+
+def read_until(streams, done, timeout):
+    """Read from every stream until done(data) holds for all of them; returns how many it holds for."""
+    selector = selectors.DefaultSelector()
+    for sock in streams:
+        if not done(streams[sock]):
+            selector.register(sock, selectors.EVENT_READ)
+    deadline = time.monotonic() + timeout
+    while selector.get_map() and time.monotonic() < deadline:
+        for key, _ in selector.select(deadline - time.monotonic()):
+            chunk = key.fileobj.recv(65536)
+            streams[key.fileobj] += chunk
+            if not chunk or done(streams[key.fileobj]):
+                selector.unregister(key.fileobj)
+    selector.close()
+    return sum(1 for data in streams.values() if done(data))
+
+
+def timed_get(port, cookie, path):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    start = time.perf_counter()
+    try:
+        conn.request('GET', path, headers={'Cookie': cookie})
+        status = conn.getresponse().status
+    except OSError:
+        status = None  # timed out waiting for a free thread
+    finally:
+        conn.close()
+    return status, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--streams', type=int, default=200, help='open /stream connections')
+    parser.add_argument('--timeout', type=float, default=20.0, help='seconds to wait for each step')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='check-stream-')
+    problems = []
+    proc = None
+    try:
+        path = os.path.join(workdir, 'database.db')
+        uploads = os.path.join(workdir, 'uploads')
+        seed.build(path, 'tiny', 0, uploads)
+        port = free_port()
+        env = dict(os.environ, DATABASE=path, UPLOAD_FOLDER=uploads, AUTO_MIGRATE='0', HOST='127.0.0.1',
+                   PORT=str(port), WEB_CONCURRENCY='1', WEB_ACCESS_LOG='')
+        proc = subprocess.Popen([sys.executable, 'serve.py'], cwd=ROOT, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        wait_until_up(port, proc)
+        print(f"Worker class: {env.get('WEB_WORKER_CLASS') or 'serve.py default'}")
+
+        cookie = login(port, 'load-0')
+        streams = open_streams(port, cookie, args.streams)
+        started = read_until(streams, lambda data: b'retry:' in data, args.timeout)
+        print(f'{started}/{args.streams} streams started')
+        if started < args.streams:
+            problems.append(f'only {started} of {args.streams} streams were answered')
+
+        status, ms = timed_get(port, cookie, '/dashboard')
+        print(f'/dashboard with the streams open: {status} in {ms:.0f} ms')
+        if status != 200:
+            problems.append(f'/dashboard returned {status} with {args.streams} streams open')
+
+        db = sqlite3.connect(path)
+        db.execute('INSERT INTO push_events (course_id, event, data, created_at) VALUES (NULL, ?, ?, ?)',
+                   (EVENT.split(b': ')[1].decode(), '{}', time.time()))
+        db.commit()
+        db.close()
+        delivered = read_until(streams, lambda data: EVENT in data, args.timeout)
+        print(f'{delivered}/{args.streams} streams received the event')
+        if delivered < args.streams:
+            problems.append(f'only {delivered} of {args.streams} streams received the event')
+        for sock in streams:
+            sock.close()
+    finally:
+        if proc is not None:
+            proc.send_signal(signal.SIGTERM)
+            try:
+                proc.wait(60)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if problems:
+        print('\nFAILED:\n  ' + '\n  '.join(problems))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,362 @@
+"""Load test: scripted student and admin journeys over the main routes.
+
+    python benchmarks/load_test.py                         # small data, test client + real server
+    python benchmarks/load_test.py --scale medium --users 32
+    python benchmarks/load_test.py --save-baseline         # record benchmarks/baseline.json
+    python benchmarks/load_test.py --check                 # exit 1 if worse than the baseline
+    python benchmarks/load_test.py --mode server --url http://127.0.0.1:8000
+
+Builds a synthetic database with seed.py and runs concurrent
+virtual users. Each journey logs in, walks the pages a student (or admin)
+actually uses, downloads a PDF and logs out. The `client` mode goes through
+Flask's test client, so it measures the app alone. The `server` mode sends
+real HTTP over keep-alive connections to a threaded WSGI server started in
+this process, or to --url (a server started on a seed.py database, e.g.
+under gunicorn; no SQL counts then).
+
+For each route it reports throughput, p50/p95/p99 latency, errors (any
+unexpected status), 503 backpressure answers that were retried after
+Retry-After, and SQL statements per request. --check compares with the saved baseline: any
+error, a route running more SQL, a p95 more than --tolerance slower, or
+overall throughput more than --tolerance lower fails the run. Routes with
+fewer than MIN_P95_SAMPLES requests (the admin pages, with one admin) are
+compared on the median instead: their p95 is just the slowest request.
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('AUTO_MIGRATE', '0')
+os.environ.setdefault('JOB_WORKERS', '0')
+
+from flask import g, request  # noqa: E402
+from werkzeug.serving import WSGIRequestHandler, make_server  # noqa: E402
+
+import cache  # noqa: E402
+import db  # noqa: E402
+import seed  # noqa: E402
+from app import app  # noqa: E402
+
+BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+MAX_RETRIES = 20
+MIN_P95_SAMPLES = 20
+
+# (route label, method, path); labels are Flask URL rules, so SQL counts
+# recorded by the app line up with them
+STUDENT_PAGES = [
+    ('/dashboard', 'GET', '/dashboard'),
+    ('/updates', 'GET', '/updates'),
+    ('/courses', 'GET', '/courses'),
+    ('/resources', 'GET', '/resources'),
+    ('/pdf/<filename>', 'GET', '/pdf/{pdf}'),
+    ('/videos', 'GET', '/videos'),
+    ('/events', 'GET', '/events'),
+    ('/search', 'GET', '/search?q=exam+notes'),
+]
+ADMIN_PAGES = [
+    ('/dashboard', 'GET', '/dashboard'),
+    ('/manage-users', 'GET', '/manage-users'),
+    ('/admin/manage_resources', 'GET', '/admin/manage_resources'),
+    ('/admin/manage_videos', 'GET', '/admin/manage_videos'),
+    ('/updates', 'GET', '/updates'),
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+# ---------- Sessions ----------
+
+class ClientSession:
+    """A virtual user on Flask's test client."""
+
+    def __init__(self):
+        self.client = app.test_client()
+
+    def request(self, method, path, form=None):
+        resp = self.client.open(path, method=method, data=form)
+        return resp.status_code, resp.headers.get('Retry-After')
+
+    def close(self):
+        pass
+
+
+class HttpSession:
+    """A virtual user on one keep-alive HTTP connection, with its own session cookie."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.conn = None
+        self.cookie = None
+
+    def request(self, method, path, form=None):
+        body = urlencode(form) if form else None
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'} if form else {}
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        for attempt in (1, 2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                self.conn.request(method, path, body, headers)
+                resp = self.conn.getresponse()
+                resp.read()
+                break
+            except (ConnectionError, http.client.HTTPException):
+                self.close()  # the server dropped a kept-alive connection
+                if attempt == 2:
+                    raise
+        cookie = resp.getheader('Set-Cookie')
+        if cookie:
+            self.cookie = cookie.split(';', 1)[0]
+        if resp.will_close:
+            self.close()
+        return resp.status, resp.getheader('Retry-After')
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+class KeepAliveHandler(WSGIRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+# ---------- Running ----------
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.busy = {}
+        self.sql = {}
+
+    def request(self, label, seconds, ok):
+        with self.lock:
+            self.latencies.setdefault(label, []).append(seconds)
+            if not ok:
+                self.errors[label] = self.errors.get(label, 0) + 1
+
+    def rejected(self, label):
+        with self.lock:
+            self.busy[label] = self.busy.get(label, 0) + 1
+
+    def statements(self, label, count):
+        with self.lock:
+            self.sql.setdefault(label, []).append(count)
+
+
+def journey(session, recorder, phone, pages, pdf):
+    def step(label, method, path, form=None, expect=200):
+        for _ in range(MAX_RETRIES):
+            start = time.perf_counter()
+            status, retry_after = session.request(method, path, form)
+            if status != 503 or retry_after is None:
+                break
+            # Login backpressure (hashing.py): well-behaved clients come back later
+            recorder.rejected(label)
+            time.sleep(float(retry_after))
+        # A page answering with a redirect means the login didn't stick
+        recorder.request(label, time.perf_counter() - start, status == expect)
+
+    step('/login', 'POST', '/login', {'phone': phone, 'password': seed.PASSWORD}, expect=302)
+    for label, method, path in pages:
+        step(label, method, path.format(pdf=pdf))
+    step('/logout', 'GET', '/logout', expect=302)
+
+
+def run(make_session, data, args):
+    recorder = Recorder()
+    app.extensions['load_recorder'] = recorder
+    cache.get_cache(app).backend.clear()
+
+    def user(n):
+        session = make_session()
+        try:
+            for i in range(args.iterations):
+                if n < args.admins:
+                    journey(session, recorder, seed.ADMIN_PHONE, ADMIN_PAGES, None)
+                else:
+                    k = n * args.iterations + i
+                    phone = f'load-{k % len(data["students"])}'
+                    journey(session, recorder, phone, STUDENT_PAGES, data['pdfs'][k % len(data['pdfs'])])
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=user, args=(n,)) for n in range(args.users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - start
+    app.extensions.pop('load_recorder', None)
+
+    routes = {}
+    for label, lat in sorted(recorder.latencies.items()):
+        sql = recorder.sql.get(label)
+        routes[label] = {
+            'requests': len(lat),
+            'rps': round(len(lat) / duration, 2),
+            'p50_ms': round(percentile(lat, 50) * 1000, 2),
+            'p95_ms': round(percentile(lat, 95) * 1000, 2),
+            'p99_ms': round(percentile(lat, 99) * 1000, 2),
+            'errors': recorder.errors.get(label, 0),
+            'busy': recorder.busy.get(label, 0),
+            'sql_avg': round(sum(sql) / len(sql), 2) if sql else None,
+        }
+    total = sum(r['requests'] for r in routes.values())
+    return {'requests': total, 'seconds': round(duration, 2), 'rps': round(total / duration, 2), 'routes': routes}
+
+
+@app.teardown_request
+def _count_sql(exc):
+    recorder = app.extensions.get('load_recorder')
+    if recorder is not None and request.url_rule is not None:
+        recorder.statements(request.url_rule.rule, g.get('sql_count', 0))
+
+
+def serve(port=0):
+    server = make_server('127.0.0.1', port, app, threaded=True, request_handler=KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ---------- Reporting ----------
+
+def print_report(mode, result, baseline=None):
+    print(f"\n== {mode}: {result['requests']} requests in {result['seconds']}s, {result['rps']} req/s ==")
+    print(f"{'route':26} {'req':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'err':>4} {'503':>4} "
+          f"{'sql':>6}")
+    for label, r in result['routes'].items():
+        line = (f"{label:26} {r['requests']:6} {r['rps']:8.1f} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} "
+                f"{r['p99_ms']:8.2f} {r['errors']:4} {r['busy']:4} {'-' if r['sql_avg'] is None else r['sql_avg']:>6}")
+        base = (baseline or {}).get('routes', {}).get(label)
+        if base and base['p95_ms']:
+            line += f"   p95 {(r['p95_ms'] / base['p95_ms'] - 1) * 100:+.0f}%"
+        print(line)
+
+
+def regressions(mode, result, baseline, tolerance, min_delta_ms):
+    problems = []
+    if result['rps'] < baseline['rps'] * (1 - tolerance):
+        problems.append(f"{mode}: throughput {result['rps']} req/s, baseline {baseline['rps']}")
+    for label, r in result['routes'].items():
+        base = baseline['routes'].get(label)
+        if r['errors']:
+            problems.append(f"{mode} {label}: {r['errors']} error response(s)")
+        if base is None:
+            continue
+        if r['sql_avg'] is not None and base['sql_avg'] is not None and r['sql_avg'] > base['sql_avg'] + 0.5:
+            problems.append(f"{mode} {label}: {r['sql_avg']} SQL statements per request, baseline {base['sql_avg']}")
+        stat = 'p95' if min(r['requests'], base['requests']) >= MIN_P95_SAMPLES else 'p50'
+        now, before = r[f'{stat}_ms'], base[f'{stat}_ms']
+        if now > before * (1 + tolerance) and now - before > min_delta_ms:
+            problems.append(f"{mode} {label}: {stat} {now} ms, baseline {before} ms")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=list(seed.SCALES), default='small')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--users', type=int, default=8, help='concurrent virtual users')
+    parser.add_argument('--admins', type=int, default=1, help='how many of them are admins')
+    parser.add_argument('--iterations', type=int, default=5, help='journeys per user')
+    parser.add_argument('--mode', choices=['client', 'server', 'both'], default='both')
+    parser.add_argument('--url', help='test an already running server instead of starting one')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true', help='fail on a regression against the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed slowdown, 0.5 = 50%%')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0, help='ignore p95 changes smaller than this')
+    parser.add_argument('--json', help='also write the results here')
+    args = parser.parse_args()
+
+    config = {'scale': args.scale, 'seed': args.seed, 'users': args.users,
+              'admins': args.admins, 'iterations': args.iterations}
+    modes = ['client', 'server'] if args.mode == 'both' else [args.mode]
+    baseline = None
+    if args.check:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['config'] != config:
+            sys.exit(f"Baseline was recorded with {baseline['config']}, this run uses {config}")
+
+    workdir = tempfile.mkdtemp(prefix='load-test-')
+    results = {}
+    try:
+        path = os.path.join(workdir, 'database.db')
+        uploads = os.path.join(workdir, 'uploads')
+        start = time.perf_counter()
+        data = seed.build(path, args.scale, args.seed, uploads)
+        print(f"{args.scale} dataset: {len(data['students'])} students in {time.perf_counter() - start:.1f}s; "
+              f"{args.users} users x {args.iterations} journeys")
+
+        app.config.update(DATABASE=path, UPLOAD_FOLDER=uploads, THUMBNAIL_FOLDER=os.path.join(uploads, 'thumbs'),
+                          COUNT_QUERIES=True)
+        app.extensions['db_pool'] = db.ConnectionPool(
+            path, size=app.config['DB_POOL_SIZE'], timeout=app.config['DB_POOL_TIMEOUT'],
+            pragmas=app.config['DB_PRAGMAS'])
+
+        for mode in modes:
+            if mode == 'client':
+                results[mode] = run(ClientSession, data, args)
+            elif args.url:
+                results[mode] = run(lambda: HttpSession(args.url), data, args)
+            else:
+                server = serve()
+                try:
+                    url = f'http://127.0.0.1:{server.server_port}'
+                    results[mode] = run(lambda: HttpSession(url), data, args)
+                finally:
+                    server.shutdown()
+            print_report(mode, results[mode], (baseline or {}).get('results', {}).get(mode))
+        app.extensions['db_pool'].close_all()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'config': config, 'results': results}, f, indent=2, sort_keys=True)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'config': config, 'results': results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'\nBaseline saved to {os.path.relpath(args.baseline)}')
+
+    if baseline is not None:
+        problems = []
+        for mode, result in results.items():
+            if mode in baseline['results']:
+                problems += regressions(mode, result, baseline['results'][mode], args.tolerance, args.min_delta_ms)
+        if problems:
+            print('\nREGRESSIONS:')
+            for problem in problems:
+                print(f'  {problem}')
+            sys.exit(1)
+        print('\nNo regressions against the baseline.')
+
+
+if __name__ == '__main__':
+    main()
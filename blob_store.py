@@ -0,0 +1,208 @@
+"""Content-addressed store for uploaded PDFs.
+
+Every upload is saved once under its SHA-256, in directories sharded by hash
+prefix (blobs/ab/cd/abcd....pdf). Courses and resources store the blob name
+("<sha256>.pdf"). The same PDF uploaded to several courses therefore takes disk
+space once, and two different files with the same original name no longer
+overwrite each other.
+
+Reference counts live in the `blobs` table and are maintained by triggers
+(see migrations/0004_blob_store.sql). collect_garbage() removes blobs nothing
+points to any more, and files left behind by a rolled back upload.
+
+    python blob_store.py adopt-legacy   # move existing flat uploads into the store
+    python blob_store.py gc             # remove unreferenced blobs
+    python blob_store.py verify         # re-hash every blob and report corrupt ones
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+
+CHUNK_SIZE = 64 * 1024
+BLOB_NAME = re.compile(r'^[0-9a-f]{64}\.pdf$')
+
+
+def is_blob(name):
+    return bool(name) and bool(BLOB_NAME.match(name))
+
+
+def blob_root(upload_folder):
+    return os.path.join(upload_folder, 'blobs')
+
+
+def blob_dir(upload_folder, name):
+    return os.path.join(blob_root(upload_folder), name[:2], name[2:4])
+
+
+def locate(upload_folder, name):
+    """(directory, filename) for a stored name; older uploads sit directly in the upload folder."""
+    if is_blob(name):
+        return blob_dir(upload_folder, name), name
+    return upload_folder, name
+
+
+def _spool(stream, upload_folder):
+    # Hash while copying to a temp file next to the store, so the final move
+    # is an atomic rename and the upload is never held in memory
+    root = blob_root(upload_folder)
+    os.makedirs(root, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=root, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest(), size
+
+
+def store(conn, stream, upload_folder, original_name=None):
+    """Save an upload and return its blob name.
+
+    Opens a write transaction on `conn`; the caller inserts/updates the row that
+    references the blob and commits, which bumps the refcount via trigger. If
+    it rolls back instead, the file stays until the next collect_garbage().
+    """
+    tmp_path, digest, size = _spool(stream, upload_folder)
+    name = f'{digest}.pdf'
+    path = os.path.join(blob_dir(upload_folder, name), name)
+
+    try:
+        # Holding the write lock while the file is put in place keeps
+        # collect_garbage() from deleting it between here and the caller's commit
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('''
+            INSERT INTO blobs (name, size, original_name) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO NOTHING
+        ''', (name, size, original_name))
+        if os.path.exists(path):
+            os.remove(tmp_path)  # already stored, nothing new on disk
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return name
+
+
+class ChecksumMismatch(Exception):
+    pass
+
+
+def verify(upload_folder, name):
+    """Re-hash a stored blob and check it still matches its name."""
+    digest = hashlib.sha256()
+    with open(os.path.join(blob_dir(upload_folder, name), name), 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    if f'{digest.hexdigest()}.pdf' != name:
+        raise ChecksumMismatch(f'{name} is corrupt (content hashes to {digest.hexdigest()})')
+
+
+def original_name(conn, name):
+    row = conn.execute('SELECT original_name FROM blobs WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else None
+
+
+def _stored_names(upload_folder):
+    for directory, _, files in os.walk(blob_root(upload_folder)):
+        for name in files:
+            if is_blob(name):
+                yield name
+
+
+def collect_garbage(conn, upload_folder):
+    """Delete blobs whose refcount dropped to zero. Returns the removed names.
+
+    Also deletes files with no `blobs` row: store() puts the file in place
+    before the caller commits, so a rolled back transaction leaves one behind.
+    """
+    # Walked before taking the lock; a file placed since then is either
+    # committed or rolled back by the time we have it
+    on_disk = json.dumps(list(_stored_names(upload_folder)))
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        names = [row[0] for row in conn.execute('SELECT name FROM blobs WHERE refcount <= 0')]
+        names += [row[0] for row in conn.execute(
+            'SELECT value FROM json_each(?) WHERE value NOT IN (SELECT name FROM blobs)', (on_disk,))]
+        for name in names:
+            try:
+                os.remove(os.path.join(blob_dir(upload_folder, name), name))
+            except FileNotFoundError:
+                pass
+        conn.execute('DELETE FROM blobs WHERE refcount <= 0')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return names
+
+
+def adopt_legacy(conn, upload_folder):
+    """Move flat uploads referenced by courses/resources into the store."""
+    legacy = set()
+    for (name,) in conn.execute('''
+        SELECT syllabus_pdf FROM courses
+        WHERE syllabus_pdf IS NOT NULL AND syllabus_pdf != ''  -- full scan, one-off command
+    '''):
+        legacy.add(name)
+    for (name,) in conn.execute('SELECT filename FROM resources'):
+        legacy.add(name)
+
+    adopted = 0
+    for old in sorted(n for n in legacy if not is_blob(n)):
+        path = os.path.join(upload_folder, old)
+        if not os.path.isfile(path):
+            continue
+        with open(path, 'rb') as f:
+            new = store(conn, f, upload_folder, original_name=old)
+        conn.execute('UPDATE courses SET syllabus_pdf = ? WHERE syllabus_pdf = ?  -- full scan, one-off command',
+                     (new, old))
+        conn.execute('UPDATE resources SET filename = ? WHERE filename = ?  -- full scan, one-off command',
+                     (new, old))
+        conn.commit()
+        os.remove(path)
+        adopted += 1
+    return adopted
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Content-addressed upload store')
+    parser.add_argument('command', choices=['adopt-legacy', 'gc', 'verify'])
+    parser.add_argument('--database', default=os.environ.get('DATABASE', 'database.db'))
+    parser.add_argument('--uploads', default='static/uploads')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    conn.execute('PRAGMA foreign_keys = ON')
+    try:
+        if args.command == 'adopt-legacy':
+            print(f'Moved {adopt_legacy(conn, args.uploads)} file(s) into the blob store.')
+        elif args.command == 'gc':
+            print(f'Removed {len(collect_garbage(conn, args.uploads))} unreferenced blob(s).')
+        else:
+            bad = 0
+            for (name,) in conn.execute('SELECT name FROM blobs'):
+                try:
+                    verify(args.uploads, name)
+                except (ChecksumMismatch, FileNotFoundError) as e:
+                    print(e)
+                    bad += 1
+            print(f'{bad} corrupt or missing blob(s).')
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+
+class LRUCache:
+    """In-process cache with per-entry TTL, evicting the least recently used entry when full.
+
+    Same get/set/delete interface as cachelib's caches, so either can back `Cache`.
+    """
+
+    def __init__(self, maxsize=256, default_timeout=300):
+        self.maxsize = maxsize
+        self.default_timeout = default_timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires and expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        expires = time.monotonic() + timeout if timeout else 0
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+        return True
+
+
+class Cache:
+    """Read-through cache with hit/miss counters in front of a pluggable backend."""
+
+    def __init__(self, backend, default_timeout=300):
+        self.backend = backend
+        self.default_timeout = default_timeout
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, loader, timeout=None):
+        # Backends report a miss as None, so None itself is never cached
+        value = self.backend.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        with self._lock:
+            self.misses += 1
+        value = loader()
+        if value is not None:
+            self.backend.set(key, value, timeout=self.default_timeout if timeout is None else timeout)
+        return value
+
+    def delete(self, key):
+        self.backend.delete(key)
+
+    def clear(self):
+        self.backend.clear()
+
+    # Version counters: keys built from version(namespace) all go stale at once
+    # when the namespace is bumped, without having to know what those keys were.
+    # They live in the backend too, so a 'filesystem' backend shares them across workers.
+    def version(self, namespace):
+        value = self.backend.get(f'version:{namespace}')
+        if value is None:
+            value = self.bump(namespace)
+        return value
+
+    def bump(self, namespace):
+        value = time.time_ns()
+        self.backend.set(f'version:{namespace}', value, timeout=0)  # 0 = never expires
+        return value
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': type(self.backend).__name__,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def make_backend(config):
+    cache_type = config['CACHE_TYPE']
+    timeout = config['CACHE_DEFAULT_TIMEOUT']
+
+    # One process only: other workers keep their copies until they expire
+    if cache_type == 'lru':
+        return LRUCache(maxsize=config['CACHE_MAXSIZE'], default_timeout=timeout)
+
+    # Shared between gunicorn workers, so an invalidation in one worker is seen by all
+    if cache_type == 'filesystem':
+        from cachelib import FileSystemCache
+        return FileSystemCache(config['CACHE_DIR'], threshold=config['CACHE_MAXSIZE'], default_timeout=timeout)
+
+    if cache_type == 'null':
+        from cachelib import NullCache
+        return NullCache()
+
+    raise ValueError(f'Unknown CACHE_TYPE: {cache_type}')
+
+
+def get_cache(app=None):
+    app = app or current_app
+    return app.extensions['cache']
+
+
+def init_app(app):
+    app.config.setdefault('CACHE_TYPE', 'lru')
+    app.config.setdefault('CACHE_DEFAULT_TIMEOUT', 300)
+    app.config.setdefault('CACHE_MAXSIZE', 1024)
+    app.config.setdefault('CACHE_DIR', 'instance/cache')
+
+    app.extensions['cache'] = Cache(make_backend(app.config), default_timeout=app.config['CACHE_DEFAULT_TIMEOUT'])
@@ -0,0 +1,66 @@
+import json
+
+from cache import get_cache
+from db import get_db
+
+
+# Course content (resources, videos) for many courses at once.
+# Each loader runs one query for the whole set of course ids, so a page costs
+# the same number of queries whether the student takes one course or twenty.
+
+def _group_by_course(rows, course_ids):
+    grouped = {course_id: [] for course_id in course_ids}
+    for row in rows:
+        grouped.setdefault(row['course_id'], []).append(row)
+    return grouped
+
+
+def _id_list(course_ids):
+    # Bound as a single JSON parameter, expanded by json_each() in SQL, so the
+    # statement text stays the same for any number of courses
+    return json.dumps([int(course_id) for course_id in course_ids])
+
+
+def load_resources(conn, course_ids):
+    course_ids = list(course_ids)
+    if not course_ids:
+        return {}
+    # Page count, size and thumbnail come from pdf_index (NULL until indexed)
+    rows = conn.execute('''
+        SELECT r.*, m.page_count, m.size, m.thumbnail FROM resources r
+        LEFT JOIN resource_metadata m ON m.filename = r.filename
+        WHERE r.course_id IN (SELECT value FROM json_each(?))
+        ORDER BY r.course_id, r.id
+    ''', (_id_list(course_ids),)).fetchall()
+    return _group_by_course(rows, course_ids)
+
+
+def load_videos(conn, course_ids):
+    course_ids = list(course_ids)
+    if not course_ids:
+        return {}
+    rows = conn.execute('''
+        SELECT * FROM videos
+        WHERE course_id IN (SELECT value FROM json_each(?))
+        ORDER BY course_id, id
+    ''', (_id_list(course_ids),)).fetchall()
+    return _group_by_course(rows, course_ids)
+
+
+# ---------- Course catalogue ----------
+# Courses change a few times a term but are listed on most admin pages, so the
+# whole catalogue is cached and dropped whenever a course is added, edited or deleted.
+
+COURSES_CACHE_KEY = 'courses:all'
+
+
+def get_course_catalogue():
+    def load():
+        rows = get_db().execute('SELECT * FROM courses ORDER BY id').fetchall()
+        return [dict(row) for row in rows]  # plain dicts so shared backends can pickle them
+
+    return get_cache().get_or_load(COURSES_CACHE_KEY, load)
+
+
+def invalidate_course_catalogue():
+    get_cache().delete(COURSES_CACHE_KEY)
@@ -0,0 +1,191 @@
+import sqlite3
+import threading
+import time
+from queue import LifoQueue, Empty
+
+from flask import g, current_app
+
+
+# PRAGMAs run on every new pooled connection.
+# 'default' keeps SQLite's rollback journal, where a writer blocks every reader.
+# 'production' switches to WAL so readers keep going while a write is in progress.
+PRAGMA_PROFILES = {
+    'default': {
+        'foreign_keys': 'ON',
+        'journal_mode': 'DELETE',
+    },
+    'production': {
+        'foreign_keys': 'ON',
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',     # safe with WAL, fsync only at checkpoints
+        'busy_timeout': 5000,        # ms to wait on a lock before "database is locked"
+        'cache_size': -64000,        # negative = KiB, so ~64 MB page cache
+        'mmap_size': 268435456,      # 256 MB memory-mapped reads
+        'temp_store': 'MEMORY',
+    },
+}
+
+DEFAULT_PRAGMAS = PRAGMA_PROFILES['production']
+
+
+def apply_pragmas(conn, pragmas):
+    for name, value in pragmas.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+
+
+class PoolExhausted(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections shared by the request threads of one worker.
+
+    Connections are opened lazily, so a pool built before gunicorn forks
+    never hands a parent's connection to a child.
+    """
+
+    def __init__(self, database, size=5, timeout=10.0, pragmas=None, factory=sqlite3.Connection):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.factory = factory  # connection class, e.g. profiling.TimedConnection
+
+        self._idle = LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._opened = 0
+
+        # Metrics
+        self.checkouts = 0
+        self.exhausted = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database, check_same_thread=False, factory=self.factory)
+        conn.row_factory = sqlite3.Row
+        apply_pragmas(conn, self.pragmas)
+        return conn
+
+    def acquire(self):
+        start = time.perf_counter()
+        conn = None
+
+        try:
+            conn = self._idle.get_nowait()
+        except Empty:
+            with self._lock:
+                can_open = self._opened < self.size
+                if can_open:
+                    self._opened += 1
+            if can_open:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            else:
+                # Every connection is checked out, wait for one to come back
+                with self._lock:
+                    self.exhausted += 1
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except Empty:
+                    with self._lock:
+                        self.timeouts += 1
+                    raise PoolExhausted(
+                        f'No database connection available after {self.timeout}s '
+                        f'(pool size {self.size})'
+                    )
+
+        waited = time.perf_counter() - start
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        return conn
+
+    def release(self, conn):
+        # Never hand a half-finished transaction to the next request
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self.discard(conn)
+            return
+        self._idle.put_nowait(conn)
+
+    def discard(self, conn):
+        try:
+            conn.close()
+        finally:
+            with self._lock:
+                self._opened -= 1
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except Empty:
+                break
+            self.discard(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'open': self._opened,
+                'idle': self._idle.qsize(),
+                'checkouts': self.checkouts,
+                'exhausted': self.exhausted,
+                'timeouts': self.timeouts,
+                'wait_total_seconds': round(self.wait_total, 6),
+                'wait_avg_seconds': round(self.wait_total / self.checkouts, 6) if self.checkouts else 0.0,
+                'wait_max_seconds': round(self.wait_max, 6),
+            }
+
+
+def get_pool(app=None):
+    app = app or current_app
+    return app.extensions['db_pool']
+
+
+def _count_statement(sql):
+    g.sql_count = g.get('sql_count', 0) + 1
+
+
+def get_db():
+    """Connection checked out for the current request, returned in teardown."""
+    if 'db' not in g:
+        g.db = get_pool().acquire()
+        # A Python call per statement, so only when something reads g.sql_count
+        if current_app.config['COUNT_QUERIES']:
+            g.sql_count = 0
+            g.db.set_trace_callback(_count_statement)
+    return g.db
+
+
+def close_db(exc=None):
+    conn = g.pop('db', None)
+    if conn is not None:
+        conn.set_trace_callback(None)
+        get_pool().release(conn)
+
+
+def init_app(app):
+    app.config.setdefault('DATABASE', 'database.db')
+    app.config.setdefault('DB_POOL_SIZE', 5)
+    app.config.setdefault('DB_POOL_TIMEOUT', 10.0)
+    app.config.setdefault('DB_PROFILE', 'production')
+    app.config.setdefault('COUNT_QUERIES', False)  # g.sql_count, for profiling.py and the benchmarks
+    app.config.setdefault('DB_PRAGMAS', PRAGMA_PROFILES[app.config['DB_PROFILE']])
+
+    app.extensions['db_pool'] = ConnectionPool(
+        app.config['DATABASE'],
+        size=app.config['DB_POOL_SIZE'],
+        timeout=app.config['DB_POOL_TIMEOUT'],
+        pragmas=app.config['DB_PRAGMAS'],
+    )
+    app.teardown_appcontext(close_db)
@@ -0,0 +1,88 @@
+import json
+
+
+# Enrollment changes are applied as a diff against what is already stored:
+# only the courses that were added or dropped are written, in one transaction,
+# so unchanged rows keep their ids and concurrent readers never see a student
+# with zero enrollments halfway through a save.
+
+def diff_enrollments(current, wanted):
+    """(to_add, to_remove) as sets of course ids."""
+    current, wanted = set(current), set(wanted)
+    return wanted - current, current - wanted
+
+
+def current_enrollments(conn, student_ids):
+    """{student_id: set(course_ids)} for the given students, in one query."""
+    result = {student_id: set() for student_id in student_ids}
+    rows = conn.execute('''
+        SELECT student_id, course_id FROM enrollments
+        WHERE student_id IN (SELECT value FROM json_each(?))
+    ''', (json.dumps(list(result)),)).fetchall()
+    for student_id, course_id in rows:
+        result[student_id].add(course_id)
+    return result
+
+
+def existing_courses(conn, course_ids):
+    """The subset of `course_ids` that are rows in courses, in one query."""
+    rows = conn.execute(
+        'SELECT id FROM courses WHERE id IN (SELECT value FROM json_each(?))',
+        (json.dumps(sorted(course_ids)),),
+    ).fetchall()
+    return {row[0] for row in rows}
+
+
+def _apply(conn, student_ids, wanted_for, only_existing=False):
+    # IMMEDIATE takes the write lock before reading, so the diff can't go stale
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        current = current_enrollments(conn, student_ids)
+        inserts, deletes = [], []
+        for student_id, courses in current.items():
+            wanted = wanted_for(student_id, courses)
+            if wanted is None:
+                continue
+            to_add, to_remove = diff_enrollments(courses, wanted)
+            inserts.extend((student_id, course_id) for course_id in to_add)
+            deletes.extend((student_id, course_id) for course_id in to_remove)
+
+        if only_existing and inserts:
+            # Checked inside the transaction, so a course created a moment ago counts
+            known = existing_courses(conn, {course_id for _, course_id in inserts})
+            inserts = [row for row in inserts if row[1] in known]
+
+        if deletes:
+            conn.executemany('DELETE FROM enrollments WHERE student_id = ? AND course_id = ?', deletes)
+        if inserts:
+            conn.executemany('INSERT INTO enrollments (student_id, course_id) VALUES (?, ?)', inserts)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(inserts), len(deletes)
+
+
+def apply_enrollments(conn, wanted_by_student, only_existing=False):
+    """Make each student's enrollments exactly the given course ids.
+
+    `wanted_by_student` maps student_id -> iterable of course ids. Returns
+    (added, removed) row counts. Everything happens in one transaction.
+    With `only_existing`, ids that aren't in courses are skipped instead of
+    failing on the foreign key.
+    """
+    wanted_by_student = {int(s): {int(c) for c in courses} for s, courses in wanted_by_student.items()}
+    return _apply(conn, list(wanted_by_student), lambda student_id, courses: wanted_by_student[student_id],
+                  only_existing)
+
+
+def move_students(conn, student_ids, from_course_id, to_course_id):
+    """Move a batch of students from one course to another. Returns (added, removed)."""
+    from_course_id, to_course_id = int(from_course_id), int(to_course_id)
+
+    def wanted_for(student_id, courses):
+        if from_course_id not in courses:
+            return None  # not in the source course, leave alone
+        return (courses - {from_course_id}) | {to_course_id}
+
+    return _apply(conn, [int(s) for s in student_ids], wanted_for)
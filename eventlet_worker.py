@@ -0,0 +1,132 @@
+"""A gunicorn worker on eventlet green threads, for many open /stream pages.
+
+    gunicorn -k eventlet_worker.EventletWorker app:app
+    WEB_WORKER_CLASS=eventlet python serve.py      # the default when eventlet is installed
+
+Under gthread every open /stream connection holds one of the worker's
+threads until the page closes, so a few dozen open tabs use up a worker.
+Here each connection is a green thread waiting on the push broker, and the
+only limit is WEB_WORKER_CONNECTIONS. gunicorn dropped its own eventlet
+worker; this is the same idea on the current AsyncWorker.
+
+The standard library has to be patched before the app creates its locks,
+queues and threads. With preload that is in the master, before the app is
+imported: serve.py and gunicorn.conf.py call green_patch() first. SQLite
+calls don't yield to other green threads; they are short under WAL, but a
+write waiting on the database lock (busy_timeout) holds up the worker.
+"""
+import logging
+import sys
+from functools import partial
+
+import eventlet
+import eventlet.wsgi
+import greenlet
+from eventlet import greenthread, hubs
+from eventlet.greenio import GreenSocket
+from gunicorn.workers.base_async import AsyncWorker
+
+
+def green_patch():
+    eventlet.monkey_patch()
+    # logging's module lock is only held for moments, never across I/O. Left
+    # green, every process prints "greenlet is being finalized" when it exits
+    logging._lock = eventlet.patcher.original('threading').RLock()
+    if not hasattr(GreenSocket, 'sendfile'):
+        GreenSocket.sendfile = _sendfile
+
+
+def _sendfile(self, file, offset=0, count=None):
+    # gunicorn sends files with socket.sendfile(), which refuses the
+    # non-blocking socket under a GreenSocket. Copy through the green
+    # sendall() instead, so other connections keep going meanwhile.
+    file.seek(offset)
+    sent = 0
+    while count is None or sent < count:
+        data = file.read(65536 if count is None else min(65536, count - sent))
+        if not data:
+            break
+        self.sendall(data)
+        sent += len(data)
+    return sent
+
+
+def _serve(sock, handle, concurrency, spread):
+    pool = eventlet.GreenPool(concurrency)
+    server = greenthread.getcurrent()
+    while True:
+        try:
+            conn, addr = sock.accept()
+            thread = pool.spawn(handle, conn, addr)
+            thread.link(_closed, server, conn)
+            conn, addr, thread = None, None, None
+            if spread:
+                # Let the other workers take some of a burst; accepting
+                # greedily piles logins onto one worker's hashing slots
+                eventlet.sleep(0.001)
+        except eventlet.StopServe:
+            sock.close()
+            pool.waitall()  # in-flight requests; serve.py ends the streams
+            return
+
+
+def _closed(client, server, conn):
+    try:
+        try:
+            client.wait()
+        finally:
+            conn.close()
+    except greenlet.GreenletExit:
+        pass
+    except Exception:
+        greenthread.kill(server, *sys.exc_info())
+
+
+class EventletWorker(AsyncWorker):
+
+    def init_process(self):
+        hubs.use_hub()  # a fresh hub, not the one the master forked from
+        green_patch()   # a no-op when the master already did it
+        super().init_process()
+
+    def is_already_handled(self, respiter):
+        if getattr(eventlet.wsgi.WSGI_LOCAL, 'already_handled', None):
+            raise StopIteration()
+        return super().is_already_handled(respiter)
+
+    def timeout_ctx(self):
+        return eventlet.Timeout(self.cfg.keepalive or None, False)
+
+    def handle_quit(self, sig, frame):
+        # Out of the signal handler, so it may block
+        eventlet.spawn(super().handle_quit, sig, frame)
+
+    def handle_usr1(self, sig, frame):
+        eventlet.spawn(super().handle_usr1, sig, frame)
+
+    def run(self):
+        acceptors = []
+        for sock in self.sockets:
+            green = GreenSocket(sock)
+            green.setblocking(1)
+            acceptors.append(eventlet.spawn(_serve, green, partial(self.handle, green), self.worker_connections,
+                                            self.cfg.workers > 1))
+            eventlet.sleep(0.0)
+
+        while self.alive:
+            self.notify()
+            eventlet.sleep(1.0)
+
+        self.notify()
+        timeout = None
+        try:
+            with eventlet.Timeout(self.cfg.graceful_timeout) as timeout:
+                for acceptor in acceptors:
+                    acceptor.kill(eventlet.StopServe())
+                for acceptor in acceptors:
+                    acceptor.wait()
+        except eventlet.Timeout as e:
+            if e is not timeout:
+                raise
+            for acceptor in acceptors:
+                acceptor.kill()
@@ -0,0 +1,112 @@
+"""Per-student update feeds (the `student_feed` inbox).
+
+Triggers in migrations/0010_student_feed.sql fan each update out to the
+students enrolled in its course, so page() reads a student's feed as one
+range scan of the inbox's primary key. What the inbox should hold is always
+derivable from `updates` joined with `enrollments`; check() compares the two
+and rebuild() re-creates inboxes from them, e.g. after rows were changed
+with the triggers missing (an old backup, a manual import).
+
+    python feed.py check              # report students whose inbox is off
+    python feed.py check --repair     # ...and rebuild just those
+    python feed.py rebuild            # rebuild every inbox
+"""
+import argparse
+import json
+import os
+import sqlite3
+
+# What the inbox should contain, straight from the source tables
+_EXPECTED = '''
+    SELECT e.student_id, u.created_at, u.id, u.course_id
+    FROM updates u JOIN enrollments e ON e.course_id = u.course_id
+    WHERE u.created_at IS NOT NULL
+'''
+
+
+def page(conn, student_id, before, limit):
+    """Up to `limit` updates older than the (created_at, id) cursor `before`, newest first."""
+    return conn.execute('''
+        SELECT u.id, u.message, u.created_at, u.teacher_id, users.name, u.title
+        FROM student_feed f
+        JOIN updates u ON u.id = f.update_id
+        JOIN users ON users.id = u.teacher_id
+        WHERE f.student_id = ?
+          AND (f.created_at, f.update_id) < (?, ?)
+        ORDER BY f.created_at DESC, f.update_id DESC
+        LIMIT ?
+    ''', (student_id, before[0], before[1], limit)).fetchall()
+
+
+def check(conn):
+    """{student_id: (missing, extra)} for every student whose inbox differs from the source tables."""
+    problems = {}
+    missing = conn.execute(f'''
+        SELECT student_id, COUNT(*) FROM (
+            {_EXPECTED}
+            EXCEPT
+            SELECT student_id, created_at, update_id, course_id FROM student_feed
+        ) GROUP BY student_id  -- full scan, offline check
+    ''').fetchall()
+    extra = conn.execute(f'''
+        SELECT student_id, COUNT(*) FROM (
+            SELECT student_id, created_at, update_id, course_id FROM student_feed
+            EXCEPT
+            {_EXPECTED}
+        ) GROUP BY student_id  -- full scan, offline check
+    ''').fetchall()
+    for student_id, count in missing:
+        problems[student_id] = (count, 0)
+    for student_id, count in extra:
+        problems[student_id] = (problems.get(student_id, (0, 0))[0], count)
+    return problems
+
+
+def rebuild(conn, student_ids=None):
+    """Re-create the inboxes of the given students (default: everyone). Returns rows written."""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        if student_ids is None:
+            conn.execute('DELETE FROM student_feed')
+            cur = conn.execute(f'INSERT INTO student_feed (student_id, created_at, update_id, course_id) {_EXPECTED}')
+        else:
+            conn.executemany('DELETE FROM student_feed WHERE student_id = ?', [(s,) for s in student_ids])
+            cur = conn.execute(f'''
+                INSERT INTO student_feed (student_id, created_at, update_id, course_id)
+                {_EXPECTED} AND e.student_id IN (SELECT value FROM json_each(?))
+            ''', (json.dumps([int(s) for s in student_ids]),))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return cur.rowcount
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-student update feeds')
+    parser.add_argument('command', choices=['check', 'rebuild'])
+    parser.add_argument('--repair', action='store_true', help='with check: rebuild the inboxes that are off')
+    parser.add_argument('--database', default=os.environ.get('DATABASE', 'database.db'))
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    try:
+        if args.command == 'rebuild':
+            print(f'Rebuilt every inbox: {rebuild(conn)} row(s).')
+            return
+
+        problems = check(conn)
+        for student_id, (missing, extra) in sorted(problems.items()):
+            print(f'student {student_id}: {missing} missing, {extra} extra')
+        if not problems:
+            print('Every inbox matches updates x enrollments.')
+        elif args.repair:
+            print(f'Rebuilt {len(problems)} inbox(es): {rebuild(conn, list(problems))} row(s).')
+        else:
+            raise SystemExit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
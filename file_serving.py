@@ -0,0 +1,110 @@
+import hashlib
+import os
+import threading
+from urllib.parse import quote
+
+from flask import Response, abort, current_app, request, send_file, url_for
+from werkzeug.security import safe_join
+
+
+# Serving uploaded files (PDFs) with browser caching:
+#   - strong ETag from a SHA-256 of the content, so unchanged files answer 304
+#   - Range requests, so PDF viewers can fetch pages as they are needed
+#   - versioned URLs (?v=<etag>) are cached as immutable for a year
+#   - optional X-Sendfile / X-Accel-Redirect, so nginx/Apache streams the bytes
+#     instead of a Python worker. For X-Accel, FILE_ACCEL_PREFIX must map to
+#     UPLOAD_FOLDER (blobs/ab/cd/... and thumbs/ live below it) and
+#     VIDEO_ACCEL_PREFIX to VIDEO_UPLOAD_FOLDER:
+#         location /protected-uploads/ { internal; alias /srv/app/static/uploads/; }
+
+HASH_CHUNK = 1024 * 1024
+
+_etags = {}  # path -> (mtime_ns, size, etag)
+_etags_lock = threading.Lock()
+
+
+def content_etag(path):
+    """SHA-256 of the file, recomputed only when its size or mtime changes."""
+    st = os.stat(path)
+    with _etags_lock:
+        cached = _etags.get(path)
+    if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    etag = digest.hexdigest()
+
+    with _etags_lock:
+        _etags[path] = (st.st_mtime_ns, st.st_size, etag)
+    return etag
+
+
+def versioned_url(endpoint, directory, filename, **values):
+    """URL with the content hash as ?v=, or a plain URL if the file is missing."""
+    path = safe_join(directory, filename)
+    if path and os.path.isfile(path):
+        values['v'] = content_etag(path)[:16]
+    return url_for(endpoint, filename=filename, **values)
+
+
+def send_cached_file(directory, filename, mimetype=None, download_name=None,
+                     etag=None, accel_prefix=None, accel_root=None):
+    # Files that never change under the same name (uploaded lecture videos) can
+    # pass their own etag instead of having gigabytes hashed on first request.
+    # accel_root is the folder accel_prefix maps to (default UPLOAD_FOLDER).
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    config = current_app.config
+    etag = etag or content_etag(path)
+    immutable = request.args.get('v') == etag[:16]
+    max_age = config['FILE_IMMUTABLE_MAX_AGE'] if immutable else config['FILE_MAX_AGE']
+    mode = config['FILE_SENDFILE_MODE']
+
+    if mode:
+        # The front proxy reads the file and handles Range/conditional requests itself
+        response = Response(mimetype=mimetype)
+        if mode == 'x-accel':
+            prefix = accel_prefix or config['FILE_ACCEL_PREFIX']
+            # The path below the mapped folder, so sharded blobs keep their subfolders
+            relative = os.path.relpath(path, accel_root or config['UPLOAD_FOLDER'])
+            if relative.startswith(os.pardir):
+                raise ValueError(f'{path} is outside the folder {prefix} maps to')
+            response.headers['X-Accel-Redirect'] = f"{prefix.rstrip('/')}/{quote(relative.replace(os.sep, '/'))}"
+        else:
+            response.headers['X-Sendfile'] = os.path.abspath(path)
+        response.set_etag(etag)
+        response.last_modified = os.path.getmtime(path)
+        response.make_conditional(request)  # still answer 304 ourselves when we can
+        if response.status_code == 304:
+            response.headers.pop('X-Accel-Redirect', None)
+            response.headers.pop('X-Sendfile', None)
+    else:
+        # conditional=True gives us 304s and Range (206) support
+        response = send_file(
+            path, mimetype=mimetype, conditional=True, etag=etag,
+            download_name=download_name, max_age=max_age,
+        )
+
+    # Uploads are behind login, so only the browser may keep a copy
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.max_age = max_age
+    if immutable:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = None
+        response.cache_control.must_revalidate = True
+    return response
+
+
+def init_app(app):
+    app.config.setdefault('FILE_MAX_AGE', 300)
+    app.config.setdefault('FILE_IMMUTABLE_MAX_AGE', 365 * 24 * 3600)
+    app.config.setdefault('FILE_SENDFILE_MODE', None)  # None, 'x-sendfile' or 'x-accel'
+    app.config.setdefault('FILE_ACCEL_PREFIX', '/protected-uploads')
+    app.config.setdefault('VIDEO_ACCEL_PREFIX', '/protected-videos')
@@ -0,0 +1,9 @@
+# Read by `gunicorn app:app` when started from this directory. The sizing
+# and hooks live in serve.py, shared with `python serve.py`. Choose the
+# worker with WEB_WORKER_CLASS rather than -k, so the patching matches it.
+import serve
+
+_config, _app_env = serve.settings()
+serve.apply_app_env(_app_env)  # before gunicorn preloads the app
+serve.green_patch(_config)
+globals().update(_config)
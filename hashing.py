@@ -0,0 +1,223 @@
+import concurrent.futures
+import os
+import sys
+import threading
+
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+# Password hashing is deliberately slow. Running it on the request thread lets a
+# burst of logins hold every worker, so it goes to a small process pool (no GIL
+# contention) with a bounded number of jobs in flight. When the pool is full we
+# answer 503 right away instead of queueing requests behind it. Bulk imports
+# share those slots but hold at most half of them, so a login never queues
+# behind a whole roster.
+#
+# Under serve.py's eventlet worker a process pool's manager thread would be a
+# green thread, and the worker hangs on exit joining it. There the hashing runs
+# in eventlet's pool of real OS threads instead: hashlib's scrypt and pbkdf2
+# release the GIL, so that still spreads over the CPUs.
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+
+class HashingBusy(Exception):
+    pass
+
+
+def stored_method(method):
+    """The method as Werkzeug writes it into a hash, defaults filled in ('scrypt' -> 'scrypt:32768:8:1')."""
+    name, *params = method.split(':')
+    if name == 'scrypt':
+        n, r, p = map(int, params or (2 ** 15, 8, 1))
+        return f'scrypt:{n}:{r}:{p}'
+    if name == 'pbkdf2':
+        hash_name = params[0] if params else 'sha256'
+        iterations = int(params[1]) if len(params) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    return method
+
+
+def _green():
+    eventlet = sys.modules.get('eventlet')
+    return eventlet is not None and eventlet.patcher.is_monkey_patched('thread')
+
+
+class _OSThreadExecutor:
+    """The part of the Executor interface PasswordHasher uses, on eventlet.tpool."""
+
+    def __init__(self, max_workers):
+        from eventlet import tpool
+        tpool.set_num_threads(max_workers)  # nothing else in the app uses tpool
+
+    def submit(self, fn, *args):
+        import eventlet
+        from eventlet import tpool
+
+        future = concurrent.futures.Future()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(tpool.execute(fn, *args))
+            except BaseException as e:
+                future.set_exception(e)
+
+        eventlet.spawn_n(run)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+class PasswordHasher:
+    def __init__(self, method=DEFAULT_METHOD, workers=None, max_pending=None, timeout=30.0):
+        self.method = method
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_pending = max_pending or max(1, self.workers) * 4
+        self.timeout = timeout
+
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._bulk_slots = threading.BoundedSemaphore(max(1, self.max_pending // 2))
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.submitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _get_executor(self):
+        # Created on first use and again after a fork, so gunicorn workers
+        # never share the parent's pool (and startup doesn't import multiprocessing)
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                if _green():
+                    self._executor = _OSThreadExecutor(self.workers)
+                else:
+                    import multiprocessing
+                    from concurrent.futures import ProcessPoolExecutor
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                    )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)  # HASH_WORKERS=0: hash inline, handy for development
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingBusy('Too many password hashing jobs in flight')
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the hash is done, not until we stop waiting:
+        # a timed out hash that already started keeps its pool worker busy
+        future.add_done_callback(lambda future: self._slots.release())
+        with self._lock:
+            self.submitted += 1
+        try:
+            return future.result(timeout=self.timeout)
+        except concurrent.futures.TimeoutError:
+            # The pool is backed up: same answer as when no slot is free
+            future.cancel()  # only helps if it hasn't started
+            with self._lock:
+                self.timed_out += 1
+            raise HashingBusy('Password hashing timed out') from None
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def hash_many(self, passwords):
+        """Hash a batch across the pool (bulk imports), keeping input order.
+
+        Waits for a free slot before each password instead of failing, but
+        never holds more than half of the slots.
+        """
+        passwords = list(passwords)
+        if not self.workers:
+            return [generate_password_hash(p, self.method) for p in passwords]
+
+        def release(future):
+            self._slots.release()
+            self._bulk_slots.release()
+
+        executor = self._get_executor()
+        futures = []
+        for password in passwords:
+            self._bulk_slots.acquire()
+            self._slots.acquire()
+            try:
+                future = executor.submit(generate_password_hash, password, self.method)
+            except BaseException:
+                release(None)
+                raise
+            future.add_done_callback(release)
+            futures.append(future)
+        with self._lock:
+            self.submitted += len(futures)
+        return [future.result() for future in futures]
+
+    def needs_rehash(self, pwhash):
+        # Werkzeug hashes look like "method:params$salt$hash", with every parameter
+        # written out even when the configured method leaves them to the defaults
+        try:
+            return stored_method(pwhash.split('$', 1)[0]) != stored_method(self.method)
+        except (ValueError, IndexError):
+            return True  # not a hash this Werkzeug would write
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'method': self.method,
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+            }
+
+
+def get_hasher(app=None):
+    app = app or current_app
+    return app.extensions['password_hasher']
+
+
+def hash_password(password):
+    return get_hasher().hash(password)
+
+
+def verify_password(pwhash, password):
+    return get_hasher().verify(pwhash, password)
+
+
+def init_app(app):
+    app.config.setdefault('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+    app.config.setdefault('HASH_WORKERS', None)
+    app.config.setdefault('HASH_MAX_PENDING', None)
+    app.config.setdefault('HASH_TIMEOUT', 30.0)
+
+    app.extensions['password_hasher'] = PasswordHasher(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        workers=app.config['HASH_WORKERS'],
+        max_pending=app.config['HASH_MAX_PENDING'],
+        timeout=app.config['HASH_TIMEOUT'],
+    )
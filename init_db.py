@@ -1,159 +1,181 @@
+"""Create the database: tables, the default admins, then every migration.
+
+    python init_db.py
+
+For a database full of synthetic data at production scale, see seed.py.
+"""
+import os
 import sqlite3
 from werkzeug.security import generate_password_hash
 
-# Connect to DB
-conn = sqlite3.connect('database.db')
-c = conn.cursor()
-
-# Enable Foreign Key Support
-c.execute('PRAGMA foreign_keys = ON')
-
-# Users Table
-c.execute('''
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        role TEXT NOT NULL,
-        id_num TEXT,
-        roll TEXT,
-        reg_no TEXT,
-        photo TEXT,
-        phone TEXT,
-        password_hash TEXT NOT NULL
-    )
-''')
-
-# Courses Table
-c.execute('''
-    CREATE TABLE IF NOT EXISTS courses (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        code TEXT NOT NULL,
-        syllabus_pdf TEXT
-    )
-''')
-
-# Enrollments Table
-c.execute('''
-    CREATE TABLE IF NOT EXISTS enrollments (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        student_id INTEGER NOT NULL,
-        course_id INTEGER NOT NULL,
-        UNIQUE(student_id, course_id),
-        FOREIGN KEY(student_id) REFERENCES users(id) ON DELETE CASCADE,
-        FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE
-    )
-''')
-
-# Schedule Updates Table
-c.execute('''
-    CREATE TABLE IF NOT EXISTS schedule_updates (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        course_id INTEGER NOT NULL,
-        teacher_id INTEGER NOT NULL,
-        new_date TEXT NOT NULL,
-        new_time TEXT NOT NULL,
-        message TEXT,
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE,
-        FOREIGN KEY(teacher_id) REFERENCES users(id) ON DELETE CASCADE
-    )
-''')
-
-# Updates Table
-c.execute('''
-    CREATE TABLE IF NOT EXISTS updates (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        course_id INTEGER,
-        teacher_id INTEGER,
-        title TEXT NOT NULL,
-        message TEXT,
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE,
-        FOREIGN KEY(teacher_id) REFERENCES users(id) ON DELETE CASCADE
-    )
-''')
-
-# Test Reports Table
-c.execute('''
-    CREATE TABLE IF NOT EXISTS test_reports (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        course_id INTEGER,
-        student_id INTEGER,
-        marks INTEGER,
-        report_pdf TEXT,
-        FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE,
-        FOREIGN KEY(student_id) REFERENCES users(id) ON DELETE CASCADE
-    )
-''')
-
-# Events Table
-c.execute('''
-    CREATE TABLE IF NOT EXISTS events (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT NOT NULL,
-        description TEXT,
-        created_by INTEGER,
-        event_date TEXT,
-        FOREIGN KEY(created_by) REFERENCES users(id) ON DELETE CASCADE
-    )
-''')
-
-# Notifications Table
-c.execute('''
-    CREATE TABLE IF NOT EXISTS notifications (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        message TEXT,
-        created_at TEXT,
-        for_role TEXT
-    )
-''')
-
-
-# Resources Table (NEW)
-c.execute('''
-    CREATE TABLE IF NOT EXISTS resources (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        course_id INTEGER NOT NULL,
-        filename TEXT NOT NULL,
-        title TEXT,
-        uploaded_at TEXT DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE
-    )
-''')
-
-
-
-# Videos Table (new for YouTube video links)
-c.execute('''
-    CREATE TABLE IF NOT EXISTS videos (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        course_id INTEGER NOT NULL,
-        title TEXT NOT NULL,
-        embed_code TEXT NOT NULL,
-        FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE
-    )
-''')
-
-
-
-
-# Insert Default Admins if not exists
-admin_users = [
-    ('Mayeesha Farzana Khan', 'admin', None, None, None, None, '01300885500', generate_password_hash('huh_satfaltu')),
-    ('Sukkhokon Ahmad', 'admin', None, None, None, None, '01700885500', generate_password_hash('huh_1500@me')),
-    ('Tahsin Hasan', 'admin', None, None, None, None, '01816037877', generate_password_hash('amikisuiparina'))
-]
-
-existing_admins = c.execute("SELECT COUNT(*) FROM users WHERE role = 'admin'").fetchone()[0]
-if existing_admins == 0:
-    c.executemany(
-        'INSERT INTO users (name, role, id_num, roll, reg_no, photo, phone, password_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
-        admin_users
-    )
-
-# Commit and Close
-conn.commit()
-conn.close()
-
-print("Database Initialized!")
+import migrate
+from db import PRAGMA_PROFILES, apply_pragmas
+
+
+def create_tables(c):
+    # Users Table
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            role TEXT NOT NULL,
+            id_num TEXT,
+            roll TEXT,
+            reg_no TEXT,
+            photo TEXT,
+            phone TEXT,
+            password_hash TEXT NOT NULL
+        )
+    ''')
+
+    # Courses Table
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS courses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            code TEXT NOT NULL,
+            syllabus_pdf TEXT
+        )
+    ''')
+
+    # Enrollments Table
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS enrollments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER NOT NULL,
+            course_id INTEGER NOT NULL,
+            UNIQUE(student_id, course_id),
+            FOREIGN KEY(student_id) REFERENCES users(id) ON DELETE CASCADE,
+            FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE
+        )
+    ''')
+
+    # Schedule Updates Table
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS schedule_updates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course_id INTEGER NOT NULL,
+            teacher_id INTEGER NOT NULL,
+            new_date TEXT NOT NULL,
+            new_time TEXT NOT NULL,
+            message TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE,
+            FOREIGN KEY(teacher_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+    ''')
+
+    # Updates Table
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS updates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course_id INTEGER,
+            teacher_id INTEGER,
+            title TEXT NOT NULL,
+            message TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE,
+            FOREIGN KEY(teacher_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+    ''')
+
+    # Test Reports Table
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS test_reports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course_id INTEGER,
+            student_id INTEGER,
+            marks INTEGER,
+            report_pdf TEXT,
+            FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE,
+            FOREIGN KEY(student_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+    ''')
+
+    # Events Table
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            description TEXT,
+            created_by INTEGER,
+            event_date TEXT,
+            FOREIGN KEY(created_by) REFERENCES users(id) ON DELETE CASCADE
+        )
+    ''')
+
+    # Notifications Table
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message TEXT,
+            created_at TEXT,
+            for_role TEXT
+        )
+    ''')
+
+
+    # Resources Table (NEW)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS resources (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course_id INTEGER NOT NULL,
+            filename TEXT NOT NULL,
+            title TEXT,
+            uploaded_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE
+        )
+    ''')
+
+
+
+    # Videos Table (new for YouTube video links)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS videos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course_id INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            embed_code TEXT NOT NULL,
+            FOREIGN KEY(course_id) REFERENCES courses(id) ON DELETE CASCADE
+        )
+    ''')
+
+
+def create_admins(c):
+    # Insert Default Admins if not exists
+    admin_users = [
+        ('Mayeesha Farzana Khan', 'admin', None, None, None, None, '01300885500', generate_password_hash('huh_satfaltu')),
+        ('Sukkhokon Ahmad', 'admin', None, None, None, None, '01700885500', generate_password_hash('huh_1500@me')),
+        ('Tahsin Hasan', 'admin', None, None, None, None, '01816037877', generate_password_hash('amikisuiparina'))
+    ]
+
+    existing_admins = c.execute("SELECT COUNT(*) FROM users WHERE role = 'admin'").fetchone()[0]
+    if existing_admins == 0:
+        c.executemany(
+            'INSERT INTO users (name, role, id_num, roll, reg_no, photo, phone, password_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            admin_users
+        )
+
+
+def init_db(database, profile='production'):
+    # Connect to DB
+    conn = sqlite3.connect(database)
+    c = conn.cursor()
+
+    # Storage profile (WAL, synchronous, cache...), also enables foreign keys
+    apply_pragmas(conn, PRAGMA_PROFILES[profile])
+
+    create_tables(c)
+    create_admins(c)
+
+    # Commit and Close
+    conn.commit()
+    conn.close()
+
+    # Indexes and later schema changes live in migrations/
+    migrate.upgrade(database)
+
+
+if __name__ == '__main__':
+    init_db(os.environ.get('DATABASE', 'database.db'), os.environ.get('DB_PROFILE', 'production'))
+    print("Database Initialized!")
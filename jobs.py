@@ -0,0 +1,309 @@
+"""Persistent background jobs in a SQLite table.
+
+Requests enqueue work with the same connection (and in the same transaction)
+as the change that causes it, so a job exists exactly when that change was
+committed. Worker threads claim jobs one at a time, run the registered
+handler inside an app context, and delete the job when it succeeds. A failing
+job is retried with exponential backoff; after max_attempts it stays in the
+table with status 'dead' (the dead-letter list) until someone retries it.
+
+    python jobs.py work              # run workers in their own process
+    python jobs.py run-pending       # drain what is due now, then exit
+    python jobs.py dead              # list dead jobs
+    python jobs.py retry <id>|all    # put dead jobs back in the queue
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import traceback
+
+from flask import current_app
+
+from db import get_db
+
+HANDLERS = {}
+
+
+def handler(kind):
+    """Register the function that runs jobs of `kind`; it gets the payload dict."""
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def enqueue(conn, kind, payload=None, delay=0, unique=False, max_attempts=None):
+    """Add a job. Does not commit: it goes in with the caller's transaction.
+
+    With unique=True nothing is added if the same job is already waiting.
+    """
+    now = time.time()
+    payload = json.dumps(payload or {}, sort_keys=True)
+    max_attempts = max_attempts or current_app.config['JOB_MAX_ATTEMPTS']
+    if unique:
+        conn.execute('''
+            INSERT INTO jobs (kind, payload, max_attempts, run_after, created_at)
+            SELECT ?, ?, ?, ?, ?
+            WHERE NOT EXISTS (
+                SELECT 1 FROM jobs WHERE status = 'queued' AND kind = ? AND payload = ?
+            )
+        ''', (kind, payload, max_attempts, now + delay, now, kind, payload))
+    else:
+        conn.execute('''
+            INSERT INTO jobs (kind, payload, max_attempts, run_after, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (kind, payload, max_attempts, now + delay, now))
+
+    queue = current_app.extensions.get('job_queue')
+    if queue is not None:
+        queue.wake()
+
+
+class JobQueue:
+    def __init__(self, app, workers=2, poll_interval=1.0, retry_base=5.0, stale_after=600):
+        self.app = app
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.retry_base = retry_base
+        self.stale_after = stale_after
+
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+
+        # Metrics (this process only)
+        self.completed = 0
+        self.failed = 0
+        self.dead = 0
+        self.latency_total = 0.0  # enqueue -> finished
+        self.latency_max = 0.0
+        self.run_total = 0.0
+
+    # ---------- Workers ----------
+
+    def start(self):
+        # Also called before each request, so threads are (re)started in each
+        # gunicorn worker rather than lost in the fork
+        with self._lock:
+            if not self.workers or self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._threads = [
+                threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._pid = None
+
+    def wake(self):
+        self._wakeup.set()
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                ran = self.run_one()
+            except Exception:
+                traceback.print_exc()  # the database itself failed; back off and try again
+                ran = False
+            if not ran:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def run_pending(self):
+        """Run every job that is due now in this thread. Returns how many ran."""
+        count = 0
+        while self.run_one():
+            count += 1
+        return count
+
+    # ---------- One job ----------
+
+    def _claim(self, conn):
+        now = time.time()
+        # A plain read first, so an idle poll doesn't take the database's write lock
+        due = conn.execute('''
+            SELECT 1 FROM jobs WHERE status = 'queued' AND run_after <= ?
+            UNION ALL
+            SELECT 1 FROM jobs WHERE status = 'running' AND started_at < ?
+            LIMIT 1
+        ''', (now, now - self.stale_after)).fetchone()
+        if due is None:
+            return None
+        # Due jobs first; then jobs left 'running' by a worker that died
+        job = conn.execute('''
+            UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?
+            WHERE id = COALESCE(
+                (SELECT id FROM jobs WHERE status = 'queued' AND run_after <= ?
+                 ORDER BY run_after LIMIT 1),
+                (SELECT id FROM jobs WHERE status = 'running' AND started_at < ? LIMIT 1)
+            )
+            RETURNING id, kind, payload, attempts, max_attempts, created_at
+        ''', (now, now, now - self.stale_after)).fetchone()
+        conn.commit()
+        return job
+
+    def run_one(self):
+        with self.app.app_context():
+            conn = get_db()
+            job = self._claim(conn)
+            if job is None:
+                return False
+
+            started = time.time()
+            try:
+                fn = HANDLERS.get(job['kind'])
+                if fn is None:
+                    raise LookupError(f"No handler for job kind {job['kind']!r}")
+                fn(json.loads(job['payload']))
+            except Exception as e:
+                conn.rollback()  # whatever the handler left half done
+                self._fail(conn, job, f'{type(e).__name__}: {e}')
+                return True
+
+            conn.execute('DELETE FROM jobs WHERE id = ?', (job['id'],))
+            conn.commit()
+            finished = time.time()
+            with self._lock:
+                self.completed += 1
+                self.run_total += finished - started
+                latency = finished - job['created_at']
+                self.latency_total += latency
+                self.latency_max = max(self.latency_max, latency)
+            return True
+
+    def _fail(self, conn, job, error):
+        if job['attempts'] >= job['max_attempts']:
+            conn.execute('''
+                UPDATE jobs SET status = 'dead', finished_at = ?, last_error = ? WHERE id = ?
+            ''', (time.time(), error, job['id']))
+            with self._lock:
+                self.dead += 1
+        else:
+            backoff = min(self.retry_base * 2 ** (job['attempts'] - 1), 3600)
+            conn.execute('''
+                UPDATE jobs SET status = 'queued', run_after = ?, last_error = ? WHERE id = ?
+            ''', (time.time() + backoff, error, job['id']))
+            with self._lock:
+                self.failed += 1
+        conn.commit()
+
+    # ---------- Inspection ----------
+
+    def stats(self):
+        with self.app.app_context():
+            conn = get_db()
+            depth = dict(conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+            oldest = conn.execute('''
+                SELECT MIN(run_after) FROM jobs WHERE status = 'queued' AND run_after <= ?
+            ''', (time.time(),)).fetchone()[0]
+        with self._lock:
+            return {
+                'workers': len(self._threads),
+                'queued': depth.get('queued', 0),
+                'running': depth.get('running', 0),
+                'dead': depth.get('dead', 0),
+                'oldest_due_seconds': round(time.time() - oldest, 3) if oldest else 0,
+                'completed': self.completed,
+                'retried': self.failed,
+                'dead_lettered': self.dead,
+                'latency_avg_ms': round(self.latency_total / self.completed * 1000, 2) if self.completed else 0,
+                'latency_max_ms': round(self.latency_max * 1000, 2),
+                'run_avg_ms': round(self.run_total / self.completed * 1000, 2) if self.completed else 0,
+            }
+
+
+def dead_jobs(conn, limit=100):
+    return conn.execute('''
+        SELECT id, kind, payload, attempts, last_error, finished_at FROM jobs
+        WHERE status = 'dead' ORDER BY run_after DESC LIMIT ?
+    ''', (limit,)).fetchall()
+
+
+def retry_dead(conn, job_id=None):
+    """Requeue one dead job, or all of them. Returns the number requeued."""
+    now = time.time()
+    if job_id is None:
+        cur = conn.execute('''
+            UPDATE jobs SET status = 'queued', attempts = 0, run_after = ? WHERE status = 'dead'
+        ''', (now,))
+    else:
+        cur = conn.execute('''
+            UPDATE jobs SET status = 'queued', attempts = 0, run_after = ? WHERE id = ? AND status = 'dead'
+        ''', (now, job_id))
+    conn.commit()
+    return cur.rowcount
+
+
+def get_queue(app=None):
+    app = app or current_app
+    return app.extensions['job_queue']
+
+
+def init_app(app):
+    app.config.setdefault('JOB_WORKERS', 2)  # 0: no threads in the web process (use `python jobs.py work`)
+    app.config.setdefault('JOB_POLL_INTERVAL', 1.0)
+    app.config.setdefault('JOB_MAX_ATTEMPTS', 5)
+    app.config.setdefault('JOB_RETRY_BASE', 5.0)
+    app.config.setdefault('JOB_STALE_AFTER', 600)
+
+    queue = JobQueue(
+        app,
+        workers=app.config['JOB_WORKERS'],
+        poll_interval=app.config['JOB_POLL_INTERVAL'],
+        retry_base=app.config['JOB_RETRY_BASE'],
+        stale_after=app.config['JOB_STALE_AFTER'],
+    )
+    app.extensions['job_queue'] = queue
+    app.before_request(queue.start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Background job queue')
+    parser.add_argument('command', choices=['work', 'run-pending', 'dead', 'retry'])
+    parser.add_argument('job_id', nargs='?', help="for retry: a job id or 'all'")
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    os.environ.setdefault('JOB_WORKERS', '0')  # the web app's own threads stay off here
+    from app import create_app
+    app = create_app(blueprints=['views.content'])  # where the handlers live
+    queue = get_queue(app)
+
+    if args.command == 'work':
+        queue.workers = args.workers
+        queue.start()
+        print(f'{args.workers} job worker(s) running, Ctrl+C to stop.')
+        try:
+            while True:
+                time.sleep(60)
+        except KeyboardInterrupt:
+            queue.stop()
+    elif args.command == 'run-pending':
+        print(f'Ran {queue.run_pending()} job(s).')
+    else:
+        with app.app_context():
+            conn = get_db()
+            if args.command == 'dead':
+                for job in dead_jobs(conn):
+                    print(f"#{job['id']} {job['kind']} {job['payload']} "
+                          f"after {job['attempts']} attempt(s): {job['last_error']}")
+            else:
+                job_id = None if args.job_id in (None, 'all') else int(args.job_id)
+                print(f'Requeued {retry_dead(conn, job_id)} job(s).')
+
+
+if __name__ == '__main__':
+    main()
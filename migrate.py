@@ -0,0 +1,197 @@
+"""Versioned schema migrations for database.db.
+
+Migrations are the numbered .sql files in migrations/ (0001_name.sql, 0002_...),
+applied in order and recorded in the schema_version table.
+
+    python migrate.py upgrade        # apply pending migrations
+    python migrate.py status         # show applied / pending
+    python migrate.py check-plans    # fail if a query in app code does a full table scan
+"""
+import argparse
+import ast
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MIGRATIONS_DIR = os.path.join(BASE_DIR, 'migrations')
+
+# Modules whose SQL is checked by check-plans
+QUERY_SOURCES = ['views/auth.py', 'views/student.py', 'views/content.py', 'views/admin.py', 'course_content.py', 'roster_import.py', 'enrollments.py', 'blob_store.py', 'jobs.py', 'pdf_index.py', 'search.py', 'push.py', 'feed.py']
+
+MIGRATION_FILE = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+
+def split_statements(sql):
+    # executescript() would commit on its own, so run statements one by one
+    # inside our transaction. complete_statement() keeps trigger bodies whole.
+    statements, buf = [], ''
+    for line in sql.splitlines(keepends=True):
+        buf += line
+        if sqlite3.complete_statement(buf):
+            if buf.strip():
+                statements.append(buf.strip())
+            buf = ''
+    if buf.strip() and not all(l.strip().startswith('--') for l in buf.strip().splitlines()):
+        raise ValueError(f'Incomplete SQL statement at end of migration: {buf.strip()[:60]}')
+    return statements
+
+
+def load_migrations():
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+
+    versions = [m[0] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError('Duplicate migration version in migrations/')
+    return migrations
+
+
+def ensure_version_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def applied_versions(conn):
+    ensure_version_table(conn)
+    return {row[0] for row in conn.execute('SELECT version FROM schema_version')}
+
+
+def upgrade(database, target=None):
+    """Apply pending migrations up to `target` (all by default). Returns the applied names."""
+    conn = sqlite3.connect(database, isolation_level=None)
+    applied = []
+    try:
+        conn.execute('PRAGMA foreign_keys = ON')
+        for version, name, path in load_migrations():
+            if target is not None and version > target:
+                break
+
+            # IMMEDIATE takes the write lock up front, so when several workers
+            # start together only one applies each migration
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if version in applied_versions(conn):
+                    conn.execute('ROLLBACK')
+                    continue
+                with open(path, encoding='utf-8') as f:
+                    for statement in split_statements(f.read()):
+                        conn.execute(statement)
+                conn.execute('INSERT INTO schema_version (version, name) VALUES (?, ?)', (version, name))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            applied.append(f'{version:04d}_{name}')
+    finally:
+        conn.close()
+    return applied
+
+
+def status(database):
+    conn = sqlite3.connect(database)
+    try:
+        done = applied_versions(conn)
+    finally:
+        conn.close()
+    return [(version, name, version in done) for version, name, _ in load_migrations()]
+
+
+# ---------- Query plan check ----------
+
+def extract_queries(path):
+    """String literal SQL passed to execute()/executemany() in a module."""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    queries = []
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and node.func.attr in ('execute', 'executemany') and node.args
+                and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str)):
+            queries.append((node.lineno, node.args[0].value))
+    return queries
+
+
+def is_listing(sql):
+    # Reading a whole table without a filter is a scan by definition
+    return not re.search(r'\bWHERE\b', sql, re.IGNORECASE)
+
+
+def full_scans(conn, sql):
+    params = (None,) * sql.count('?')
+    plan = conn.execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+    # Scanning a table-valued function such as json_each(?) walks the bound
+    # parameter, not a table
+    return [row[3] for row in plan
+            if row[3].startswith('SCAN ') and ' USING ' not in row[3] and 'VIRTUAL TABLE' not in row[3]]
+
+
+def check_query_plans(database, sources=None):
+    """Return a list of (source, line, sql, scans) for queries that scan a table without an index."""
+    workdir = tempfile.mkdtemp(prefix='plan-check-')
+    copy = os.path.join(workdir, 'database.db')
+    try:
+        shutil.copy(database, copy)
+        upgrade(copy)
+
+        conn = sqlite3.connect(copy)
+        problems = []
+        for source in sources or QUERY_SOURCES:
+            for lineno, sql in extract_queries(os.path.join(BASE_DIR, source)):
+                if not re.match(r'\s*(SELECT|UPDATE|DELETE|WITH)\b', sql, re.IGNORECASE):
+                    continue
+                if re.search(r'--\s*full scan', sql):
+                    continue  # deliberate, e.g. one-off maintenance commands
+                scans = full_scans(conn, sql)
+                if is_listing(sql):
+                    # The outer loop of a listing may scan, joined tables may not
+                    scans = scans[1:]
+                if scans:
+                    problems.append((source, lineno, ' '.join(sql.split()), scans))
+        conn.close()
+        return problems
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Schema migrations for database.db')
+    parser.add_argument('command', choices=['upgrade', 'status', 'check-plans'])
+    parser.add_argument('--database', default=os.environ.get('DATABASE', 'database.db'))
+    parser.add_argument('--target', type=int, help='stop after this migration version')
+    args = parser.parse_args()
+
+    if args.command == 'upgrade':
+        applied = upgrade(args.database, args.target)
+        for name in applied:
+            print(f'Applied {name}')
+        print('Database is up to date.' if not applied else f'{len(applied)} migration(s) applied.')
+
+    elif args.command == 'status':
+        for version, name, done in status(args.database):
+            print(f"[{'x' if done else ' '}] {version:04d}_{name}")
+
+    elif args.command == 'check-plans':
+        problems = check_query_plans(args.database)
+        for source, lineno, sql, scans in problems:
+            print(f'{source}:{lineno}: {", ".join(scans)}\n    {sql}')
+        if problems:
+            print(f'{len(problems)} query(s) scan a table without an index.')
+            sys.exit(1)
+        print('All queries use an index.')
+
+
+if __name__ == '__main__':
+    main()
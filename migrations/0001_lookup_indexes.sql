@@ -0,0 +1,7 @@
+-- Login looks users up by phone, the admin dashboard counts by role
+CREATE INDEX IF NOT EXISTS idx_users_phone ON users(phone);
+CREATE INDEX IF NOT EXISTS idx_users_role ON users(role);
+
+-- UNIQUE(student_id, course_id) already covers lookups by student,
+-- this one covers joins that start from the course side
+CREATE INDEX IF NOT EXISTS idx_enrollments_course ON enrollments(course_id, student_id);
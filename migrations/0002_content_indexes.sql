@@ -0,0 +1,12 @@
+-- /updates joins on course_id and sorts by created_at
+CREATE INDEX IF NOT EXISTS idx_updates_course_created ON updates(course_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_updates_created ON updates(created_at);
+
+-- Per-course resource and video lists
+CREATE INDEX IF NOT EXISTS idx_resources_course ON resources(course_id);
+CREATE INDEX IF NOT EXISTS idx_videos_course ON videos(course_id);
+
+-- Events are always listed by date
+CREATE INDEX IF NOT EXISTS idx_events_date ON events(event_date);
+
+CREATE INDEX IF NOT EXISTS idx_schedule_updates_course ON schedule_updates(course_id);
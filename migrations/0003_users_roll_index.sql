@@ -0,0 +1,2 @@
+-- Roster imports check for duplicate roll numbers
+CREATE INDEX IF NOT EXISTS idx_users_roll ON users(roll);
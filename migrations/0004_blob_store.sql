@@ -0,0 +1,46 @@
+-- Content-addressed uploads. `name` is what courses.syllabus_pdf and
+-- resources.filename store ("<sha256>.pdf"); refcount is kept up to date by
+-- the triggers below, including rows removed by ON DELETE CASCADE.
+CREATE TABLE IF NOT EXISTS blobs (
+    name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    refcount INTEGER NOT NULL DEFAULT 0,
+    original_name TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_blobs_unreferenced ON blobs(refcount) WHERE refcount <= 0;
+
+CREATE TRIGGER IF NOT EXISTS blobs_resources_insert AFTER INSERT ON resources
+BEGIN
+    UPDATE blobs SET refcount = refcount + 1 WHERE name = NEW.filename;
+END;
+
+CREATE TRIGGER IF NOT EXISTS blobs_resources_delete AFTER DELETE ON resources
+BEGIN
+    UPDATE blobs SET refcount = refcount - 1 WHERE name = OLD.filename;
+END;
+
+CREATE TRIGGER IF NOT EXISTS blobs_resources_update AFTER UPDATE OF filename ON resources
+WHEN OLD.filename IS NOT NEW.filename
+BEGIN
+    UPDATE blobs SET refcount = refcount - 1 WHERE name = OLD.filename;
+    UPDATE blobs SET refcount = refcount + 1 WHERE name = NEW.filename;
+END;
+
+CREATE TRIGGER IF NOT EXISTS blobs_courses_insert AFTER INSERT ON courses
+BEGIN
+    UPDATE blobs SET refcount = refcount + 1 WHERE name = NEW.syllabus_pdf;
+END;
+
+CREATE TRIGGER IF NOT EXISTS blobs_courses_delete AFTER DELETE ON courses
+BEGIN
+    UPDATE blobs SET refcount = refcount - 1 WHERE name = OLD.syllabus_pdf;
+END;
+
+CREATE TRIGGER IF NOT EXISTS blobs_courses_update AFTER UPDATE OF syllabus_pdf ON courses
+WHEN OLD.syllabus_pdf IS NOT NEW.syllabus_pdf
+BEGIN
+    UPDATE blobs SET refcount = refcount - 1 WHERE name = OLD.syllabus_pdf;
+    UPDATE blobs SET refcount = refcount + 1 WHERE name = NEW.syllabus_pdf;
+END;
@@ -0,0 +1,5 @@
+-- Lecture files uploaded to the video folder. Videos keep embed_code for
+-- YouTube iframes; uploaded ones store the file name here instead.
+ALTER TABLE videos ADD COLUMN filename TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_videos_filename ON videos(filename) WHERE filename IS NOT NULL;
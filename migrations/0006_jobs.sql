@@ -0,0 +1,17 @@
+-- Background job queue (jobs.py). Finished jobs are deleted; jobs that ran
+-- out of attempts stay with status 'dead' until they are retried.
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'queued',  -- queued, running or dead
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_after REAL NOT NULL,               -- unix time
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    last_error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_status_run_after ON jobs(status, run_after);
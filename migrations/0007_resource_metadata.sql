@@ -0,0 +1,10 @@
+-- Page count, size and first-page thumbnail of each stored PDF (pdf_index.py).
+-- Keyed by the name in resources.filename / courses.syllabus_pdf.
+CREATE TABLE IF NOT EXISTS resource_metadata (
+    filename TEXT PRIMARY KEY,
+    page_count INTEGER,
+    size INTEGER NOT NULL,
+    thumbnail TEXT,  -- file name in THUMBNAIL_FOLDER, NULL if the PDF could not be rendered
+    error TEXT,
+    indexed_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
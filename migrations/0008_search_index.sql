@@ -0,0 +1,98 @@
+-- Full-text search over updates, events, resources and videos (search.py).
+-- One FTS5 table for all four; the rowid encodes the source as
+-- id * 4 + kind (0 update, 1 event, 2 resource, 3 video), so the triggers
+-- below find a document by rowid instead of scanning the index.
+-- course_id is NULL for events, which every user can see.
+CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+    title,
+    body,
+    course_id UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+
+-- Rank with BM25, title matches counting five times as much as body matches.
+-- Ordering by the built-in rank column lets FTS5 sort internally, so
+-- highlight()/snippet() only run for the rows that are returned.
+INSERT INTO search_index (search_index, rank) VALUES ('rank', 'bm25(5.0, 1.0)');
+
+CREATE TRIGGER IF NOT EXISTS search_updates_insert AFTER INSERT ON updates
+BEGIN
+    INSERT INTO search_index (rowid, title, body, course_id)
+    VALUES (NEW.id * 4, NEW.title, COALESCE(NEW.message, ''), NEW.course_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_updates_update AFTER UPDATE OF title, message, course_id ON updates
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4;
+    INSERT INTO search_index (rowid, title, body, course_id)
+    VALUES (NEW.id * 4, NEW.title, COALESCE(NEW.message, ''), NEW.course_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_updates_delete AFTER DELETE ON updates
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4;
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_events_insert AFTER INSERT ON events
+BEGIN
+    INSERT INTO search_index (rowid, title, body, course_id)
+    VALUES (NEW.id * 4 + 1, NEW.title, COALESCE(NEW.description, ''), NULL);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_events_update AFTER UPDATE OF title, description ON events
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4 + 1;
+    INSERT INTO search_index (rowid, title, body, course_id)
+    VALUES (NEW.id * 4 + 1, NEW.title, COALESCE(NEW.description, ''), NULL);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_events_delete AFTER DELETE ON events
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4 + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_resources_insert AFTER INSERT ON resources
+BEGIN
+    INSERT INTO search_index (rowid, title, body, course_id)
+    VALUES (NEW.id * 4 + 2, COALESCE(NEW.title, ''), '', NEW.course_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_resources_update AFTER UPDATE OF title, course_id ON resources
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4 + 2;
+    INSERT INTO search_index (rowid, title, body, course_id)
+    VALUES (NEW.id * 4 + 2, COALESCE(NEW.title, ''), '', NEW.course_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_resources_delete AFTER DELETE ON resources
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4 + 2;
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_videos_insert AFTER INSERT ON videos
+BEGIN
+    INSERT INTO search_index (rowid, title, body, course_id)
+    VALUES (NEW.id * 4 + 3, NEW.title, '', NEW.course_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_videos_update AFTER UPDATE OF title, course_id ON videos
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4 + 3;
+    INSERT INTO search_index (rowid, title, body, course_id)
+    VALUES (NEW.id * 4 + 3, NEW.title, '', NEW.course_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_videos_delete AFTER DELETE ON videos
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4 + 3;
+END;
+
+-- Index what is already there
+INSERT INTO search_index (rowid, title, body, course_id)
+SELECT id * 4, title, COALESCE(message, ''), course_id FROM updates;
+INSERT INTO search_index (rowid, title, body, course_id)
+SELECT id * 4 + 1, title, COALESCE(description, ''), NULL FROM events;
+INSERT INTO search_index (rowid, title, body, course_id)
+SELECT id * 4 + 2, COALESCE(title, ''), '', course_id FROM resources;
+INSERT INTO search_index (rowid, title, body, course_id)
+SELECT id * 4 + 3, title, '', course_id FROM videos;
@@ -0,0 +1,12 @@
+-- Events for the /stream push channel (push.py): each worker tails this
+-- table and fans new rows out to its connections; rows older than
+-- PUSH_RETENTION are pruned. course_id NULL means every user.
+CREATE TABLE IF NOT EXISTS push_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    course_id INTEGER,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_push_events_created_at ON push_events(created_at);
@@ -0,0 +1,61 @@
+-- Per-student inbox for /updates (feed.py). Posting an update writes one row
+-- per enrolled student, enrolling backfills the course's updates and
+-- unenrolling prunes them, so a student's feed is one range scan of the
+-- primary key instead of a join over updates x enrollments.
+-- Triggers keep it in step with every write path, including ON DELETE
+-- CASCADE from users and courses. `python feed.py check` verifies it.
+CREATE TABLE IF NOT EXISTS student_feed (
+    student_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    update_id INTEGER NOT NULL,
+    course_id INTEGER NOT NULL,
+    PRIMARY KEY (student_id, created_at, update_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_student_feed_update ON student_feed(update_id);
+CREATE INDEX IF NOT EXISTS idx_student_feed_course ON student_feed(student_id, course_id);
+
+CREATE TRIGGER IF NOT EXISTS feed_updates_insert AFTER INSERT ON updates
+BEGIN
+    INSERT OR IGNORE INTO student_feed (student_id, created_at, update_id, course_id)
+    SELECT student_id, NEW.created_at, NEW.id, NEW.course_id FROM enrollments
+    WHERE course_id = NEW.course_id AND NEW.created_at IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS feed_updates_update AFTER UPDATE OF course_id, created_at ON updates
+BEGIN
+    DELETE FROM student_feed WHERE update_id = OLD.id;
+    INSERT OR IGNORE INTO student_feed (student_id, created_at, update_id, course_id)
+    SELECT student_id, NEW.created_at, NEW.id, NEW.course_id FROM enrollments
+    WHERE course_id = NEW.course_id AND NEW.created_at IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS feed_updates_delete AFTER DELETE ON updates
+BEGIN
+    DELETE FROM student_feed WHERE update_id = OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS feed_enrollments_insert AFTER INSERT ON enrollments
+BEGIN
+    INSERT OR IGNORE INTO student_feed (student_id, created_at, update_id, course_id)
+    SELECT NEW.student_id, created_at, id, course_id FROM updates
+    WHERE course_id = NEW.course_id AND created_at IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS feed_enrollments_update AFTER UPDATE OF student_id, course_id ON enrollments
+BEGIN
+    DELETE FROM student_feed WHERE student_id = OLD.student_id AND course_id = OLD.course_id;
+    INSERT OR IGNORE INTO student_feed (student_id, created_at, update_id, course_id)
+    SELECT NEW.student_id, created_at, id, course_id FROM updates
+    WHERE course_id = NEW.course_id AND created_at IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS feed_enrollments_delete AFTER DELETE ON enrollments
+BEGIN
+    DELETE FROM student_feed WHERE student_id = OLD.student_id AND course_id = OLD.course_id;
+END;
+
+INSERT OR IGNORE INTO student_feed (student_id, created_at, update_id, course_id)
+SELECT e.student_id, u.created_at, u.id, u.course_id
+FROM updates u JOIN enrollments e ON e.course_id = u.course_id
+WHERE u.created_at IS NOT NULL;
@@ -0,0 +1,5 @@
+-- Events are paged on (COALESCE(event_date, ''), id), so events without a
+-- date come after every dated one instead of dropping out of the keyset
+-- comparison (a row value holding NULL is never less than the cursor)
+CREATE INDEX IF NOT EXISTS idx_events_date_key ON events(COALESCE(event_date, ''));
+DROP INDEX IF EXISTS idx_events_date;
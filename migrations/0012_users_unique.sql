@@ -0,0 +1,9 @@
+-- One account per phone number and per roll number. add_student already
+-- expects an IntegrityError for duplicates; roster imports map inserted
+-- phones back to user ids, which is only right if each phone is unique.
+-- Admins and teachers have no roll; NULLs don't conflict. Fails if the
+-- database already holds duplicates, which have to be merged by hand first.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_phone_unique ON users(phone);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_roll_unique ON users(roll);
+DROP INDEX IF EXISTS idx_users_phone;
+DROP INDEX IF EXISTS idx_users_roll;
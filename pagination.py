@@ -0,0 +1,56 @@
+import base64
+import binascii
+import json
+
+from flask import abort, current_app, request
+
+
+# Keyset ("seek") pagination. A page is fetched with
+#     WHERE (sort_col, id) < (?, ?) ORDER BY sort_col DESC, id DESC LIMIT ?
+# so page N costs the same as page 1, unlike OFFSET which reads and throws
+# away every earlier row. The cursor is the sort key of the last row shown.
+
+MAX_ID = 2 ** 63 - 1
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, default):
+    if not token:
+        return tuple(default)
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError):
+        abort(400, 'Invalid cursor')
+    if not isinstance(values, list) or len(values) != len(default):
+        abort(400, 'Invalid cursor')
+    # Same types as the default, and ids SQLite can hold (True is not an id)
+    for value, expected in zip(values, default):
+        if type(value) is not type(expected) or (type(value) is int and abs(value) > MAX_ID):
+            abort(400, 'Invalid cursor')
+    return tuple(values)
+
+
+def page_args(default_cursor):
+    """(cursor, limit) for the current request. `limit` is the page size."""
+    cursor = decode_cursor(request.args.get('cursor'), default_cursor)
+    limit = request.args.get('limit', type=int) or current_app.config['PAGE_SIZE']
+    limit = max(1, min(limit, current_app.config['MAX_PAGE_SIZE']))
+    return cursor, limit
+
+
+def make_page(rows, limit, key):
+    """Trim a `limit + 1` row fetch to one page and build the next cursor from its last row."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(key(rows[-1]))
+    return rows, None
+
+
+def init_app(app):
+    app.config.setdefault('PAGE_SIZE', 20)
+    app.config.setdefault('MAX_PAGE_SIZE', 100)
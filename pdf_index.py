@@ -0,0 +1,128 @@
+"""Page counts, sizes and first-page thumbnails for uploaded PDFs.
+
+Resource listings show these instead of making students download each PDF to
+see what it is. Rows live in `resource_metadata`, keyed by the stored file
+name, so a PDF shared by several courses through the blob store is indexed
+once. Thumbnails are small JPEGs in THUMBNAIL_FOLDER, served by /thumb/<name>.
+
+New uploads are indexed by the process_pdf background job. For everything
+uploaded before that, or after changing the thumbnail size:
+
+    python pdf_index.py              # index PDFs that have no metadata yet
+    python pdf_index.py --rebuild    # re-index every PDF
+
+Rendering needs PyMuPDF (pip install pymupdf). Without it, only the file size
+is recorded and listings simply show no thumbnail.
+"""
+import argparse
+import os
+import sqlite3
+
+import blob_store
+
+THUMB_WIDTH = 160
+THUMB_QUALITY = 70
+
+
+def thumbnail_name(filename):
+    return filename.rsplit('.', 1)[0] + '.jpg'
+
+
+def inspect(path, thumb_path, width=THUMB_WIDTH):
+    """Render the first page to `thumb_path`. Returns (page_count, error)."""
+    try:
+        import pymupdf
+    except ImportError:
+        return None, 'PyMuPDF is not installed'
+
+    try:
+        with pymupdf.open(path) as doc:
+            page_count = doc.page_count
+            if not page_count:
+                return 0, 'PDF has no pages'
+            page = doc.load_page(0)
+            zoom = width / page.rect.width
+            pixmap = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+            # Written next to the final file and renamed, so a half-written
+            # thumbnail is never served
+            tmp_path = thumb_path + '.part'
+            with open(tmp_path, 'wb') as f:
+                f.write(pixmap.tobytes('jpeg', jpg_quality=THUMB_QUALITY))
+            os.replace(tmp_path, thumb_path)
+    except Exception as e:  # damaged or encrypted PDFs: keep what we know
+        return None, f'{type(e).__name__}: {e}'
+    return page_count, None
+
+
+def index_file(conn, upload_folder, thumb_folder, filename):
+    """Index one stored PDF. Does not commit. Returns False if the file is missing."""
+    directory, name = blob_store.locate(upload_folder, filename)
+    path = os.path.join(directory, name)
+    if not os.path.isfile(path):
+        return False
+
+    os.makedirs(thumb_folder, exist_ok=True)
+    thumbnail = thumbnail_name(filename)
+    page_count, error = inspect(path, os.path.join(thumb_folder, thumbnail))
+    conn.execute('''
+        INSERT OR REPLACE INTO resource_metadata (filename, page_count, size, thumbnail, error)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (filename, page_count, os.path.getsize(path), None if error else thumbnail, error))
+    return True
+
+
+def forget(conn, thumb_folder, filenames):
+    """Drop metadata and thumbnails of PDFs that were removed. Does not commit."""
+    for filename in filenames:
+        conn.execute('DELETE FROM resource_metadata WHERE filename = ?', (filename,))
+        try:
+            os.remove(os.path.join(thumb_folder, thumbnail_name(filename)))
+        except FileNotFoundError:
+            pass
+
+
+def stored_pdfs(conn, rebuild=False):
+    """Names of every PDF a course or resource points to (only unindexed ones unless rebuild)."""
+    rows = conn.execute('''
+        SELECT filename FROM resources
+        UNION
+        SELECT syllabus_pdf FROM courses
+        WHERE syllabus_pdf IS NOT NULL AND syllabus_pdf != ''  -- full scan, offline indexer
+    ''').fetchall()
+    names = {row[0] for row in rows}
+    if not rebuild:
+        names -= {row[0] for row in conn.execute('SELECT filename FROM resource_metadata')}
+    return sorted(names)
+
+
+def index_all(conn, upload_folder, thumb_folder, rebuild=False):
+    """Returns (indexed, missing) counts."""
+    indexed = missing = 0
+    for filename in stored_pdfs(conn, rebuild):
+        if index_file(conn, upload_folder, thumb_folder, filename):
+            indexed += 1
+        else:
+            missing += 1
+        conn.commit()  # one PDF at a time, so a long run never holds the write lock
+    return indexed, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Index page counts and thumbnails of uploaded PDFs')
+    parser.add_argument('--database', default=os.environ.get('DATABASE', 'database.db'))
+    parser.add_argument('--uploads', default='static/uploads')
+    parser.add_argument('--thumbnails', default=os.environ.get('THUMBNAIL_FOLDER', 'static/uploads/thumbs'))
+    parser.add_argument('--rebuild', action='store_true', help='re-index PDFs that already have metadata')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    conn.execute('PRAGMA foreign_keys = ON')
+    try:
+        indexed, missing = index_all(conn, args.uploads, args.thumbnails, args.rebuild)
+    finally:
+        conn.close()
+    print(f'Indexed {indexed} PDF(s), {missing} missing on disk.')
+
+
+if __name__ == '__main__':
+    main()
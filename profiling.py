@@ -0,0 +1,300 @@
+"""Opt-in request profiling: timings, SQL statistics and cProfile samples.
+
+With PROFILING=1 every request records its endpoint, wall time, time spent
+rendering templates, how many SQL statements it ran, their total time and the
+slowest one. Pooled connections are opened with a cursor that times each
+statement, execute and fetches together, and COUNT_QUERIES is turned on so
+db.py's trace callback counts statements, including those run by triggers.
+
+The numbers are aggregated per endpoint into in-memory histograms and served
+in Prometheus text format at /metrics (per worker process, so scrape each
+worker or read them as a sample). /admin/profiling lists the slowest recent
+requests.
+
+PROFILE_SAMPLE_RATE > 0 also runs that fraction of requests under cProfile
+and keeps the dump when the request took longer than PROFILE_THRESHOLD_MS:
+
+    python -m pstats instance/profiles/<file>.prof
+"""
+import cProfile
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from flask import before_render_template, current_app, g, has_app_context, request, template_rendered
+
+import db
+
+# Seconds; fine at the low end, where most requests are
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+SLOW_REQUESTS_KEPT = 50
+STATEMENT_CHARS = 300
+
+
+# ---------- Timed connections ----------
+
+def _record_sql(cursor, elapsed):
+    # Only statements of a request's (or job's) connection; not the PRAGMAs
+    # a new pooled connection runs before get_db() hands it out
+    if not has_app_context() or 'db' not in g:
+        return
+    stats = g.get('sql_timing')
+    if stats is None:
+        stats = g.sql_timing = {'total': 0.0, 'slowest': 0.0, 'slowest_sql': None}
+    stats['total'] += elapsed
+    cursor._elapsed += elapsed
+    if cursor._elapsed > stats['slowest']:
+        stats['slowest'] = cursor._elapsed
+        stats['slowest_sql'] = cursor._sql
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that adds the time of each statement (execute plus fetches) to the request."""
+    _sql = None
+    _elapsed = 0.0
+
+    def _timed(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            _record_sql(self, time.perf_counter() - start)
+
+    def execute(self, sql, parameters=()):
+        self._sql, self._elapsed = sql, 0.0
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._sql, self._elapsed = sql, 0.0
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+    def fetchone(self):
+        return self._timed(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed(super().fetchmany, size or self.arraysize)
+
+    def fetchall(self):
+        return self._timed(super().fetchall)
+
+    def __next__(self):
+        return self._timed(super().__next__)
+
+
+class TimedConnection(sqlite3.Connection):
+    # Connection.execute() runs statements without going through the cursor's
+    # methods, so route it through one
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# ---------- Aggregation ----------
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.series = {}  # labels tuple -> [bucket counts..., sum, count]
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def lines(self, name, label_names):
+        for labels, series in sorted(self.series.items()):
+            base = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(label_names, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f'{name}_bucket{{{base},le="{bound}"}} {cumulative}'
+            yield f'{name}_bucket{{{base},le="+Inf"}} {series[-1]}'
+            yield f'{name}_sum{{{base}}} {series[-2]:.6f}'
+            yield f'{name}_count{{{base}}} {series[-1]}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+class Profiler:
+    def __init__(self, app, sample_rate=0.0, threshold=0.5, profile_dir='instance/profiles', keep=100):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.profile_dir = profile_dir
+        self.keep = keep
+
+        self._lock = threading.Lock()
+        self._sampling = threading.Lock()  # one cProfile at a time per process
+        self.requests = {}  # (endpoint, method, status) -> count
+        self.wall = Histogram(LATENCY_BUCKETS)
+        self.templates = Histogram(LATENCY_BUCKETS)
+        self.sql = Histogram(LATENCY_BUCKETS)
+        self.statements = Histogram(COUNT_BUCKETS)
+        self.slowest_statement = {}  # endpoint -> (seconds, sql)
+        self.slow_requests = deque(maxlen=SLOW_REQUESTS_KEPT)
+        self.profiles_written = 0
+
+    # ---------- Request hooks ----------
+
+    def before_request(self):
+        g.profile_start = time.perf_counter()
+        g.template_time = 0.0
+        if self.sample_rate and random.random() < self.sample_rate and self._sampling.acquire(blocking=False):
+            g.cprofile = cProfile.Profile()
+            g.cprofile.enable()
+
+    def after_request(self, response):
+        g.profile_status = response.status_code
+        return response
+
+    def teardown_request(self, exc):
+        start = g.pop('profile_start', None)
+        if start is None:
+            return  # the request failed before profiling started
+        wall = time.perf_counter() - start
+        profile = g.pop('cprofile', None)
+        if profile is not None:
+            profile.disable()
+            self._sampling.release()
+
+        endpoint = request.endpoint or 'unmatched'
+        status = g.get('profile_status', 500)
+        sql = g.get('sql_timing') or {'total': 0.0, 'slowest': 0.0, 'slowest_sql': None}
+        statements = g.get('sql_count', 0)
+        templates = g.get('template_time', 0.0)
+
+        with self._lock:
+            key = (endpoint, request.method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.wall.observe((endpoint, request.method), wall)
+            self.templates.observe((endpoint,), templates)
+            self.sql.observe((endpoint,), sql['total'])
+            self.statements.observe((endpoint,), statements)
+            if sql['slowest_sql'] and sql['slowest'] > self.slowest_statement.get(endpoint, (0.0,))[0]:
+                self.slowest_statement[endpoint] = (sql['slowest'], ' '.join(sql['slowest_sql'].split()))
+            if wall >= self.threshold:
+                self.slow_requests.append({
+                    'at': time.time(),
+                    'endpoint': endpoint,
+                    'path': request.path,
+                    'status': status,
+                    'wall_ms': round(wall * 1000, 2),
+                    'template_ms': round(templates * 1000, 2),
+                    'sql_ms': round(sql['total'] * 1000, 2),
+                    'sql_statements': statements,
+                    'slowest_sql_ms': round(sql['slowest'] * 1000, 2),
+                    'slowest_sql': ' '.join((sql['slowest_sql'] or '').split())[:STATEMENT_CHARS],
+                })
+
+        if profile is not None and wall >= self.threshold:
+            self._dump(profile, endpoint, wall)
+
+    def _dump(self, profile, endpoint, wall):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{endpoint}-{int(wall * 1000)}ms.prof"
+        profile.dump_stats(os.path.join(self.profile_dir, name))
+        with self._lock:
+            self.profiles_written += 1
+        # Keep only the newest dumps
+        dumps = sorted(
+            (os.path.join(self.profile_dir, f) for f in os.listdir(self.profile_dir) if f.endswith('.prof')),
+            key=os.path.getmtime,
+        )
+        for path in dumps[:-self.keep]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _template_started(self, sender, template, context, **extra):
+        g.template_start = time.perf_counter()
+
+    def _template_finished(self, sender, template, context, **extra):
+        start = g.pop('template_start', None)
+        if start is not None:
+            g.template_time = g.get('template_time', 0.0) + time.perf_counter() - start
+
+    # ---------- Output ----------
+
+    def metrics(self):
+        """Everything in Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            lines.append('# HELP uniportal_requests_total Requests handled by this worker.')
+            lines.append('# TYPE uniportal_requests_total counter')
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(f'uniportal_requests_total{{endpoint="{_escape(endpoint)}",method="{method}",'
+                             f'status="{status}"}} {count}')
+            for name, help_text, hist, label_names in (
+                ('uniportal_request_duration_seconds', 'Wall time per request.', self.wall, ('endpoint', 'method')),
+                ('uniportal_template_render_seconds', 'Template rendering time per request.', self.templates,
+                 ('endpoint',)),
+                ('uniportal_sql_duration_seconds', 'Total SQL time per request.', self.sql, ('endpoint',)),
+                ('uniportal_sql_statements', 'SQL statements per request.', self.statements, ('endpoint',)),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                lines.extend(hist.lines(name, label_names))
+            lines.append('# HELP uniportal_slowest_sql_seconds Slowest statement seen per endpoint.')
+            lines.append('# TYPE uniportal_slowest_sql_seconds gauge')
+            for endpoint, (seconds, sql) in sorted(self.slowest_statement.items()):
+                lines.append(f'uniportal_slowest_sql_seconds{{endpoint="{_escape(endpoint)}",'
+                             f'statement="{_escape(sql[:STATEMENT_CHARS])}"}} {seconds:.6f}')
+            lines.append('# HELP uniportal_profiles_written_total cProfile dumps of slow requests.')
+            lines.append('# TYPE uniportal_profiles_written_total counter')
+            lines.append(f'uniportal_profiles_written_total {self.profiles_written}')
+        return '\n'.join(lines) + '\n'
+
+    def slowest(self):
+        with self._lock:
+            return sorted(self.slow_requests, key=lambda r: r['wall_ms'], reverse=True)
+
+
+def get_profiler(app=None):
+    app = app or current_app
+    return app.extensions.get('profiler')
+
+
+def init_app(app):
+    app.config.setdefault('PROFILING', False)
+    app.config.setdefault('PROFILE_SAMPLE_RATE', 0.0)
+    app.config.setdefault('PROFILE_THRESHOLD_MS', 500)
+    app.config.setdefault('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+    app.config.setdefault('PROFILE_KEEP', 100)
+    app.config.setdefault('METRICS_TOKEN', None)
+    if not app.config['PROFILING']:
+        return
+
+    profiler = Profiler(
+        app,
+        sample_rate=app.config['PROFILE_SAMPLE_RATE'],
+        threshold=app.config['PROFILE_THRESHOLD_MS'] / 1000,
+        profile_dir=app.config['PROFILE_DIR'],
+        keep=app.config['PROFILE_KEEP'],
+    )
+    app.extensions['profiler'] = profiler
+    app.config['COUNT_QUERIES'] = True
+    db.get_pool(app).factory = TimedConnection  # connections are opened lazily, so this covers all of them
+
+    app.before_request(profiler.before_request)
+    app.after_request(profiler.after_request)
+    app.teardown_request(profiler.teardown_request)
+    before_render_template.connect(profiler._template_started, app)
+    template_rendered.connect(profiler._template_finished, app)
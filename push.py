@@ -0,0 +1,257 @@
+"""Server-Sent Events push channel for new updates and schedule changes.
+
+Publishing writes a row to `push_events` with the caller's transaction, so
+an event goes out exactly when the change it announces is committed. Each
+worker process runs one tailer thread that reads new rows and fans them out
+to the open /stream connections of that process, per course: a student only
+hears about courses they are enrolled in (and course-less events). The table
+doubles as a short replay log, so a browser reconnecting with Last-Event-ID
+gets what it missed.
+
+Every connection has a bounded buffer. A client that can't keep up has its
+buffer replaced by a single `resync` event (the page reloads its data)
+instead of letting memory grow. Idle connections get a comment line every
+PUSH_HEARTBEAT seconds so proxies don't time them out.
+
+A /stream connection stays open for as long as the page does. serve.py
+runs an eventlet worker (eventlet_worker.py) where it can, so each one is
+a green thread and open pages aren't limited by the thread count; under
+WEB_WORKER_CLASS=gthread each holds one of the WEB_STREAM_THREADS.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from flask import current_app
+
+from db import get_pool
+
+RESYNC = {'id': None, 'event': 'resync', 'data': '{}'}
+CLOSED = {'id': None, 'event': 'closed', 'data': '{}'}  # never sent, ends the stream
+REPLAY_LIMIT = 100
+
+
+def publish(conn, course_id, event, data):
+    """Queue an event for a course (None: everyone). Does not commit."""
+    conn.execute(
+        'INSERT INTO push_events (course_id, event, data, created_at) VALUES (?, ?, ?, ?)',
+        (course_id, event, json.dumps(data), time.time()),
+    )
+
+
+def format_event(item):
+    lines = []
+    if item['id'] is not None:
+        lines.append(f"id: {item['id']}")
+    lines.append(f"event: {item['event']}")
+    lines.extend(f'data: {line}' for line in item['data'].splitlines() or [''])
+    return '\n'.join(lines) + '\n\n'
+
+
+class Subscription:
+    def __init__(self, course_ids, buffer_size):
+        self.course_ids = course_ids  # None: every course
+        self.buffer_size = buffer_size
+        self.last_id = 0
+        self.overflows = 0
+        self._buffer = deque()
+        self._ready = threading.Condition()
+        self.closed = False
+
+    def wants(self, course_id):
+        return course_id is None or self.course_ids is None or course_id in self.course_ids
+
+    def put(self, item):
+        with self._ready:
+            if item['id'] is not None:
+                if item['id'] <= self.last_id:
+                    return  # already delivered by the replay
+                self.last_id = item['id']
+            if len(self._buffer) >= self.buffer_size:
+                self._buffer.clear()
+                self._buffer.append(RESYNC)
+                self.overflows += 1
+            else:
+                self._buffer.append(item)
+            self._ready.notify()
+
+    def get(self, timeout):
+        """Next item, None after `timeout` seconds without one, CLOSED once closed and drained."""
+        with self._ready:
+            if not self._ready.wait_for(lambda: self._buffer or self.closed, timeout):
+                return None
+            return self._buffer.popleft() if self._buffer else CLOSED
+
+    def close(self):
+        with self._ready:
+            self.closed = True
+            self._ready.notify()
+
+
+class Broker:
+    def __init__(self, app, buffer_size=64, heartbeat=15.0, poll_interval=0.5, retention=3600):
+        self.app = app
+        self.buffer_size = buffer_size
+        self.heartbeat = heartbeat
+        self.poll_interval = poll_interval
+        self.retention = retention
+
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._last_id = 0
+
+        # Metrics (this process only)
+        self.connections_total = 0
+        self.delivered = 0
+        self.overflows = 0
+
+    # ---------- Tailer ----------
+
+    def _query(self, sql, params=()):
+        pool = get_pool(self.app)
+        conn = pool.acquire()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+            conn.commit()
+            return rows
+        finally:
+            pool.release(conn)
+
+    def _start(self):
+        # One tailer per worker process, started by the first subscriber
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._last_id = self._query('SELECT COALESCE(MAX(id), 0) FROM push_events')[0][0]
+        threading.Thread(target=self._tail, name='push-tailer', daemon=True).start()
+
+    def _tail(self):
+        last_prune = 0
+        while True:
+            try:
+                rows = self._query('''
+                    SELECT id, course_id, event, data FROM push_events
+                    WHERE id > ? ORDER BY id LIMIT 500
+                ''', (self._last_id,))
+                for row in rows:
+                    self.dispatch(dict(row))
+                    self._last_id = row['id']
+                if time.time() - last_prune > 60:
+                    self._query('DELETE FROM push_events WHERE created_at < ?', (time.time() - self.retention,))
+                    last_prune = time.time()
+            except Exception as e:  # keep the tailer alive through a locked or busy database
+                print(f'push tailer: {e}')
+            time.sleep(self.poll_interval)
+
+    def dispatch(self, item):
+        with self._lock:
+            targets = [sub for sub in self._subscribers if sub.wants(item['course_id'])]
+        for sub in targets:
+            before = sub.overflows
+            sub.put(item)
+            with self._lock:
+                self.delivered += 1
+                self.overflows += sub.overflows - before
+
+    # ---------- Connections ----------
+
+    def subscribe(self, conn, course_ids, last_event_id=None):
+        """Register a connection; replays events after `last_event_id` using `conn`."""
+        self._start()
+        sub = Subscription(None if course_ids is None else set(course_ids), self.buffer_size)
+        with self._lock:
+            self._subscribers.add(sub)
+            self.connections_total += 1
+
+        if last_event_id:
+            # Holding the subscription's lock keeps live events from jumping
+            # ahead of the replay; put() drops whatever the replay already sent
+            with sub._ready:
+                rows = conn.execute('''
+                    SELECT id, course_id, event, data FROM push_events
+                    WHERE id > ?
+                      AND (course_id IS NULL OR ? IS NULL OR course_id IN (SELECT value FROM json_each(?)))
+                    ORDER BY id LIMIT ?
+                ''', (int(last_event_id), None if course_ids is None else 1,
+                      json.dumps(list(course_ids or [])), REPLAY_LIMIT + 1)).fetchall()
+                if len(rows) > REPLAY_LIMIT:
+                    sub._buffer.append(RESYNC)  # missed too much, reload instead
+                else:
+                    for row in rows:
+                        sub._buffer.append(dict(row))
+                        sub.last_id = row['id']
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def stream(self, sub):
+        """Generator of SSE text for a subscription; unsubscribes when the client goes away."""
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                item = sub.get(self.heartbeat)
+                if item is CLOSED:
+                    return  # the browser reconnects, with Last-Event-ID, to another worker
+                if item is None:
+                    yield ': ping\n\n'
+                else:
+                    yield format_event(item)
+        finally:
+            self.unsubscribe(sub)
+
+    def close(self):
+        """End every open stream, e.g. when the worker is shutting down (serve.py)."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            sub.close()
+
+    def stats(self):
+        with self._lock:
+            channels = {}
+            for sub in self._subscribers:
+                for course_id in (['all'] if sub.course_ids is None else sub.course_ids):
+                    channels[str(course_id)] = channels.get(str(course_id), 0) + 1
+            return {
+                'connections': len(self._subscribers),
+                'connections_total': self.connections_total,
+                'connections_by_course': channels,
+                'delivered': self.delivered,
+                'overflows': self.overflows,
+                'last_event_id': self._last_id,
+                'greenlet_worker': _green_threads(),
+            }
+
+
+def _green_threads():
+    try:
+        from eventlet import patcher
+    except ImportError:
+        return False
+    return patcher.is_monkey_patched('thread')
+
+
+def get_broker(app=None):
+    app = app or current_app
+    return app.extensions['push_broker']
+
+
+def init_app(app):
+    app.config.setdefault('PUSH_BUFFER_SIZE', 64)
+    app.config.setdefault('PUSH_HEARTBEAT', 15.0)
+    app.config.setdefault('PUSH_POLL_INTERVAL', 0.5)
+    app.config.setdefault('PUSH_RETENTION', 3600)
+
+    app.extensions['push_broker'] = Broker(
+        app,
+        buffer_size=app.config['PUSH_BUFFER_SIZE'],
+        heartbeat=app.config['PUSH_HEARTBEAT'],
+        poll_interval=app.config['PUSH_POLL_INTERVAL'],
+        retention=app.config['PUSH_RETENTION'],
+    )
@@ -0,0 +1,245 @@
+"""Bulk student import from a CSV or XLSX roster.
+
+Columns (header row required, case-insensitive):
+    name, roll, phone, passcode, courses (optional; course codes or ids separated by ';')
+
+    python roster_import.py roster.csv [--database database.db] [--batch-size 500]
+
+Rows are read as a stream and written in batches: passcodes for a batch are
+hashed in parallel, then users and enrollments go in with executemany inside
+one transaction per batch. Rows with a duplicate phone or roll (in the file or
+already in the database) are reported and skipped without aborting the import.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sqlite3
+import time
+
+REQUIRED_COLUMNS = ('name', 'roll', 'phone', 'passcode')
+
+
+class RosterError(Exception):
+    pass
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.enrollments = 0
+        self.errors = []  # (line number, message)
+        self.seconds = 0.0
+
+    @property
+    def rows(self):
+        return self.created + len(self.errors)
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+# ---------- Reading ----------
+
+def _normalise_header(header):
+    columns = [str(h or '').strip().lower() for h in header]
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    if missing:
+        raise RosterError(f"Roster is missing column(s): {', '.join(missing)}")
+    return columns
+
+
+def _read_csv(stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    try:
+        columns = _normalise_header(next(reader))
+    except StopIteration:
+        raise RosterError('Roster is empty')
+    for line_no, values in enumerate(reader, start=2):
+        if any(v.strip() for v in values):
+            yield line_no, dict(zip(columns, values))
+
+
+def _read_xlsx(stream):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RosterError('Reading .xlsx rosters needs openpyxl (pip install openpyxl)')
+
+    # read_only streams rows instead of loading the whole sheet
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        try:
+            columns = _normalise_header(next(rows))
+        except StopIteration:
+            raise RosterError('Roster is empty')
+        for line_no, values in enumerate(rows, start=2):
+            values = ['' if v is None else str(v) for v in values]
+            if any(v.strip() for v in values):
+                yield line_no, dict(zip(columns, values))
+    finally:
+        workbook.close()
+
+
+def read_roster(stream, filename):
+    """Yield (line number, row dict) from a binary roster stream."""
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if ext == 'csv':
+        return _read_csv(stream)
+    if ext in ('xlsx', 'xlsm'):
+        return _read_xlsx(stream)
+    raise RosterError('Roster must be a .csv or .xlsx file')
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ---------- Writing ----------
+
+def _existing(conn, column, values):
+    rows = conn.execute(
+        f'SELECT {column} FROM users WHERE {column} IN (SELECT value FROM json_each(?))',
+        (json.dumps(values),),
+    ).fetchall()
+    return {row[0] for row in rows}
+
+
+def _skip_duplicates(conn, rows, seen_phones, seen_rolls, result):
+    """The (line number, record) rows whose phone and roll are new; the rest go into result.errors."""
+    phones_in_db = _existing(conn, 'phone', [r['phone'] for _, r in rows])
+    rolls_in_db = _existing(conn, 'roll', [r['roll'] for _, r in rows])
+
+    accepted = []
+    for line_no, record in rows:
+        if record['phone'] in phones_in_db or record['phone'] in seen_phones:
+            result.errors.append((line_no, f"Duplicate phone {record['phone']}"))
+        elif record['roll'] in rolls_in_db or record['roll'] in seen_rolls:
+            result.errors.append((line_no, f"Duplicate roll {record['roll']}"))
+        else:
+            seen_phones.add(record['phone'])
+            seen_rolls.add(record['roll'])
+            accepted.append((line_no, record))
+    return accepted
+
+
+def _course_lookup(conn):
+    lookup = {}
+    for course_id, code in conn.execute('SELECT id, code FROM courses'):
+        lookup[str(course_id)] = course_id
+        lookup[code.strip().lower()] = course_id
+    return lookup
+
+
+def import_roster(conn, rows, hasher, batch_size=500):
+    """Import (line number, row) pairs. Returns an ImportResult."""
+    result = ImportResult()
+    started = time.perf_counter()
+    courses = _course_lookup(conn)
+    seen_phones, seen_rolls = set(), set()
+
+    for batch in _batches(rows, batch_size):
+        valid = []
+        for line_no, row in batch:
+            record = {k: (row.get(k) or '').strip() for k in REQUIRED_COLUMNS}
+            blank = [k for k in REQUIRED_COLUMNS if not record[k]]
+            if blank:
+                result.errors.append((line_no, f"Missing {', '.join(blank)}"))
+                continue
+
+            refs = [c.strip().lower() for c in (row.get('courses') or '').split(';') if c.strip()]
+            unknown = [c for c in refs if c not in courses]
+            if unknown:
+                result.errors.append((line_no, f'Unknown course {unknown[0]!r}'))
+                continue
+
+            record['course_ids'] = [courses[c] for c in refs]
+            valid.append((line_no, record))
+
+        # Checked here so known duplicates aren't hashed, and again under the
+        # write lock below for rows added while this batch was hashing
+        accepted = _skip_duplicates(conn, valid, seen_phones, seen_rolls, result)
+        if not accepted:
+            continue
+
+        hashes = hasher.hash_many([r['passcode'] for _, r in accepted])
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            hashed = [(line_no, dict(r, password_hash=h)) for (line_no, r), h in zip(accepted, hashes)]
+            accepted = [r for _, r in _skip_duplicates(conn, hashed, set(), set(), result)]
+            conn.executemany(
+                "INSERT INTO users (name, role, roll, phone, password_hash) VALUES (?, 'student', ?, ?, ?)",
+                [(r['name'], r['roll'], r['phone'], r['password_hash']) for r in accepted],
+            )
+            # Phones are unique and these were new, so they map back to the inserted ids
+            ids = dict(conn.execute(
+                'SELECT phone, id FROM users WHERE phone IN (SELECT value FROM json_each(?))',
+                (json.dumps([r['phone'] for r in accepted]),),
+            ).fetchall())
+            enrollments = [(ids[r['phone']], course_id) for r in accepted for course_id in r['course_ids']]
+            conn.executemany(
+                'INSERT OR IGNORE INTO enrollments (student_id, course_id) VALUES (?, ?)',
+                enrollments,
+            )
+            conn.commit()
+        except sqlite3.IntegrityError as e:
+            # e.g. a course deleted while the batch was hashing
+            conn.rollback()
+            raise RosterError(f'Stopped at line {batch[0][0]}, rows before it were imported: {e}')
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
+        result.created += len(accepted)
+        result.enrollments += len(enrollments)
+
+    result.errors.sort()
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def main():
+    from db import PRAGMA_PROFILES, apply_pragmas
+    from hashing import DEFAULT_METHOD, PasswordHasher
+
+    parser = argparse.ArgumentParser(description='Import students from a CSV/XLSX roster')
+    parser.add_argument('roster')
+    parser.add_argument('--database', default=os.environ.get('DATABASE', 'database.db'))
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=None, help='hashing processes (default: CPU count)')
+    parser.add_argument('--method', default=os.environ.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD))
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    apply_pragmas(conn, PRAGMA_PROFILES[os.environ.get('DB_PROFILE', 'production')])
+    hasher = PasswordHasher(method=args.method, workers=args.workers)
+
+    try:
+        with open(args.roster, 'rb') as f:
+            result = import_roster(conn, read_roster(f, args.roster), hasher, args.batch_size)
+    except RosterError as e:
+        raise SystemExit(str(e))
+    finally:
+        hasher.shutdown()
+        conn.close()
+
+    for line_no, message in result.errors:
+        print(f'line {line_no}: {message}')
+    print(f'Imported {result.created} student(s) and {result.enrollments} enrollment(s), '
+          f'{len(result.errors)} row(s) skipped, {result.rows_per_second:.0f} rows/s')
+
+
+if __name__ == '__main__':
+    main()
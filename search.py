@@ -0,0 +1,131 @@
+"""Full-text search over updates, events, resources and videos.
+
+The `search_index` FTS5 table (migrations/0008_search_index.sql) is kept in
+sync by triggers. Its rowid is `id * 4 + kind`, so a hit maps straight back to
+its source row. search() answers a query with one statement: ranked by BM25
+(titles weigh more than bodies), with highlighted snippets, and limited to the
+student's enrolled courses plus events.
+
+    python search.py rebuild            # re-create the index from the source tables
+    python search.py query "algebra"    # try a query from the shell
+"""
+import argparse
+import os
+import re
+import sqlite3
+
+from markupsafe import Markup, escape
+
+KINDS = ('update', 'event', 'resource', 'video')
+TITLE_WEIGHT = 5.0
+SNIPPET_TOKENS = 16
+
+# Control characters mark matches inside FTS output; the text is escaped
+# first and the markers turned into <mark> afterwards
+_OPEN, _CLOSE = '\x02', '\x03'
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def match_expression(query):
+    """Turn what the user typed into a safe FTS5 query.
+
+    Every word must appear; the last one also matches as a prefix, so results
+    show up while a word is still being typed. Returns None if there are no words.
+    """
+    words = _TOKEN.findall(query)
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _highlight(text):
+    return Markup(str(escape(text or '')).replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>'))
+
+
+def search(conn, query, user_id, role, limit=20):
+    """List of result dicts, best match first."""
+    expression = match_expression(query)
+    if expression is None:
+        return []
+
+    rows = conn.execute(f'''
+        SELECT s.rowid % 4 AS kind, s.rowid / 4 AS item_id, s.course_id,
+               highlight(search_index, 0, '{_OPEN}', '{_CLOSE}') AS title,
+               snippet(search_index, 1, '{_OPEN}', '{_CLOSE}', '…', {SNIPPET_TOKENS}) AS snippet,
+               c.name AS course_name, c.code AS course_code,
+               r.filename
+        FROM search_index s
+        LEFT JOIN courses c ON c.id = s.course_id
+        LEFT JOIN resources r ON s.rowid % 4 = 2 AND r.id = s.rowid / 4
+        WHERE search_index MATCH ?
+          AND (? != 'student' OR s.course_id IS NULL OR s.course_id IN (
+                SELECT course_id FROM enrollments WHERE student_id = ?))
+        ORDER BY s.rank
+        LIMIT ?
+    ''', (expression, role, user_id, limit)).fetchall()
+
+    return [{
+        'kind': KINDS[row['kind']],
+        'id': row['item_id'],
+        'course_id': row['course_id'],
+        'course': f"{row['course_name']} ({row['course_code']})" if row['course_name'] else None,
+        'title': _highlight(row['title']),
+        'snippet': _highlight(row['snippet']),
+        'filename': row['filename'],
+    } for row in rows]
+
+
+def rebuild(conn):
+    """Re-create the index from the source tables. Returns the number of documents."""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute('DELETE FROM search_index')
+        conn.execute('''
+            INSERT INTO search_index (rowid, title, body, course_id)
+            SELECT id * 4, title, COALESCE(message, ''), course_id FROM updates
+        ''')
+        conn.execute('''
+            INSERT INTO search_index (rowid, title, body, course_id)
+            SELECT id * 4 + 1, title, COALESCE(description, ''), NULL FROM events
+        ''')
+        conn.execute('''
+            INSERT INTO search_index (rowid, title, body, course_id)
+            SELECT id * 4 + 2, COALESCE(title, ''), '', course_id FROM resources
+        ''')
+        conn.execute('''
+            INSERT INTO search_index (rowid, title, body, course_id)
+            SELECT id * 4 + 3, title, '', course_id FROM videos
+        ''')
+        conn.execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
+        count = conn.execute('SELECT COUNT(*) FROM search_index').fetchone()[0]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Full-text search index')
+    parser.add_argument('command', choices=['rebuild', 'query'])
+    parser.add_argument('query', nargs='?', default='')
+    parser.add_argument('--database', default=os.environ.get('DATABASE', 'database.db'))
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    conn.row_factory = sqlite3.Row
+    try:
+        if args.command == 'rebuild':
+            print(f'Indexed {rebuild(conn)} document(s).')
+        else:
+            for result in search(conn, args.query, user_id=None, role='admin'):
+                print(f"[{result['kind']} {result['id']}] {result['title'].striptags()}"
+                      f"  {result['snippet'].striptags()}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+"""Create a database full of synthetic data at production scale.
+
+    python seed.py /tmp/large.db --scale large            # 500k students
+    python seed.py /tmp/x.db --students 50000 --updates 2000 --seed 7
+    python seed.py /tmp/load.db --scale small --uploads /tmp/load-uploads
+
+Starts from init_db.init_db() (tables, default admins, every migration),
+then bulk-loads students, courses, dense enrollments, updates, schedule
+changes, events, resources and videos. The same options and seed always
+give the same rows.
+
+Loading is fast because nothing is maintained row by row: migration indexes
+and triggers are dropped first, everything goes in with executemany inside
+one transaction, then the indexes are created once over the full tables and
+the trigger-maintained tables (student_feed, search_index, blob refcounts)
+are filled with one INSERT ... SELECT each before the triggers come back.
+
+Synthetic students log in with phone load-<n>, the synthetic admin with
+load-admin, all with the password in PASSWORD. With --uploads, a few small
+PDFs go into the blob store so /pdf/<name> serves real files.
+"""
+import argparse
+import io
+import itertools
+import os
+import random
+import sqlite3
+import time
+
+from werkzeug.security import generate_password_hash
+
+import blob_store
+import hashing
+import search
+from init_db import init_db
+
+PASSWORD = 'load-test-password'
+ADMIN_PHONE = 'load-admin'
+
+SCALES = {
+    'tiny': dict(students=1000, courses=20, per_student=3, updates=200, events=100, resources=4, videos=4),
+    'small': dict(students=10000, courses=100, per_student=4, updates=1000, events=500, resources=6, videos=6),
+    'medium': dict(students=100000, courses=400, per_student=5, updates=3000, events=2000, resources=8, videos=8),
+    'large': dict(students=500000, courses=1000, per_student=6, updates=5000, events=5000, resources=10, videos=10),
+}
+
+# Tables whose rows the triggers derive from the others; filled in one pass
+# after the load instead
+DERIVED = ('student_feed', 'search_index', 'blobs')
+
+PDF_COUNT = 8
+START = 1735689600  # 2025-01-01
+WORDS = ('exam class lab notes assignment deadline quiz lecture chapter review room moved '
+         'project group marks syllabus test practice solution reading tutorial').split()
+
+
+def sentence(rng, n):
+    return ' '.join(rng.choices(WORDS, k=n)).capitalize()
+
+
+def timestamp(rng, days=300):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(START + rng.randrange(days * 86400)))
+
+
+def fake_pdf(rng, n):
+    return f"%PDF-1.4\n% synthetic resource {n}\n{' '.join(rng.choices(WORDS, k=2000))}\n%%EOF\n".encode()
+
+
+def enrollments(rng, student_ids, course_ids, per_student):
+    # Popular courses get more students, like real timetables
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) ** 0.5 for rank in range(len(course_ids))))
+    per_student = min(per_student, len(course_ids))
+    for student_id in student_ids:
+        chosen = set()
+        while len(chosen) < per_student:
+            chosen.update(rng.choices(course_ids, cum_weights=cum_weights, k=per_student - len(chosen)))
+        for course_id in sorted(chosen):
+            yield student_id, course_id
+
+
+def drop_deferred(conn):
+    """Drop migration indexes and triggers; returns what to re-create, as (type, table, sql)."""
+    rows = conn.execute('''
+        SELECT type, name, tbl_name, sql FROM sqlite_master
+        WHERE type IN ('index', 'trigger') AND sql IS NOT NULL
+    ''').fetchall()
+    for kind, name, _, _ in rows:
+        conn.execute(f'DROP {kind.upper()} "{name}"')
+    return [(kind, table, sql) for kind, _, table, sql in rows]
+
+
+def fill_derived(conn):
+    conn.execute('BEGIN')
+    conn.execute('''
+        INSERT INTO student_feed (student_id, created_at, update_id, course_id)
+        SELECT e.student_id, u.created_at, u.id, u.course_id
+        FROM updates u JOIN enrollments e ON e.course_id = u.course_id
+        WHERE u.created_at IS NOT NULL
+        ORDER BY e.student_id, u.created_at, u.id
+    ''')
+    conn.execute('''
+        UPDATE blobs SET refcount =
+            (SELECT COUNT(*) FROM resources WHERE filename = blobs.name)
+          + (SELECT COUNT(*) FROM courses WHERE syllabus_pdf = blobs.name)
+    ''')
+    conn.execute('COMMIT')
+    search.rebuild(conn)
+
+
+def build(path, scale='small', seed=0, upload_folder=None, log=None):
+    """Create `path` (which must not exist) and fill it.
+
+    `scale` is a SCALES name or a dict of the same counts. Returns
+    {'students': range of ids, 'admins': [ids], 'pdfs': [blob names]}.
+    """
+    counts = dict(SCALES[scale]) if isinstance(scale, str) else dict(scale)
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+    started = time.perf_counter()
+
+    def phase(message):
+        log(f'{time.perf_counter() - started:6.1f}s  {message}')
+
+    init_db(path)
+    conn = sqlite3.connect(path, isolation_level=None)
+    # Throwaway data: no fsyncs, and every row is consistent by construction
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA foreign_keys = OFF')
+    conn.execute('PRAGMA cache_size = -262144')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    conn.execute(f'PRAGMA threads = {min(8, os.cpu_count() or 1)}')  # parallel sorts for CREATE INDEX
+
+    pdfs = []
+    if upload_folder:
+        for n in range(PDF_COUNT):
+            pdfs.append(blob_store.store(conn, io.BytesIO(fake_pdf(rng, n)), upload_folder, f'resource-{n}.pdf'))
+            conn.execute('COMMIT')
+
+    deferred = drop_deferred(conn)
+    phase(f"schema ready, {len(deferred)} indexes and triggers deferred")
+
+    password_hash = generate_password_hash(PASSWORD, hashing.DEFAULT_METHOD)
+    conn.execute('BEGIN')
+    conn.execute("INSERT INTO users (name, role, phone, password_hash) VALUES ('Load Admin', 'admin', ?, ?)",
+                 (ADMIN_PHONE, password_hash))
+    admins = [row[0] for row in conn.execute("SELECT id FROM users WHERE role = 'admin' ORDER BY id")]
+
+    first = conn.execute('SELECT COALESCE(MAX(id), 0) FROM courses').fetchone()[0] + 1
+    course_ids = list(range(first, first + counts['courses']))
+    conn.executemany('INSERT INTO courses (id, name, code) VALUES (?, ?, ?)',
+                     ((c, f'Course {n} {sentence(rng, 2)}', f'LT{n:04d}') for n, c in enumerate(course_ids)))
+
+    first = conn.execute('SELECT COALESCE(MAX(id), 0) FROM users').fetchone()[0] + 1
+    student_ids = range(first, first + counts['students'])
+    conn.executemany(
+        "INSERT INTO users (id, name, role, roll, phone, password_hash) VALUES (?, ?, 'student', ?, ?, ?)",
+        ((s, f'Student {n}', f'LT-{n:06d}', f'load-{n}', password_hash) for n, s in enumerate(student_ids)),
+    )
+    phase(f"{counts['students']} students, {counts['courses']} courses")
+
+    conn.executemany('INSERT INTO enrollments (student_id, course_id) VALUES (?, ?)',
+                     enrollments(rng, student_ids, course_ids, counts['per_student']))
+    phase('enrollments')
+
+    conn.executemany(
+        'INSERT INTO updates (course_id, teacher_id, title, message, created_at) VALUES (?, ?, ?, ?, ?)',
+        sorted(((rng.choice(course_ids), rng.choice(admins), sentence(rng, 4), sentence(rng, 40), timestamp(rng))
+                for _ in range(counts['updates'])), key=lambda row: row[4]),
+    )
+    conn.executemany(
+        'INSERT INTO schedule_updates (course_id, teacher_id, new_date, new_time, message, created_at) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        ((rng.choice(course_ids), rng.choice(admins), timestamp(rng, 330)[:10], f'{rng.randrange(8, 18):02d}:00',
+          sentence(rng, 6), timestamp(rng)) for _ in range(counts['updates'] // 10)),
+    )
+    conn.executemany(
+        'INSERT INTO events (title, description, created_by, event_date) VALUES (?, ?, ?, ?)',
+        ((sentence(rng, 3), sentence(rng, 20), rng.choice(admins), timestamp(rng, 365)[:10])
+         for _ in range(counts['events'])),
+    )
+    conn.executemany(
+        'INSERT INTO resources (course_id, filename, title, uploaded_at) VALUES (?, ?, ?, ?)',
+        ((c, rng.choice(pdfs) if pdfs else f'missing-{c}-{n}.pdf', sentence(rng, 3), timestamp(rng))
+         for c in course_ids for n in range(counts['resources'])),
+    )
+    conn.executemany(
+        'INSERT INTO videos (course_id, title, embed_code) VALUES (?, ?, ?)',
+        ((c, sentence(rng, 3), '<iframe src="https://www.youtube.com/embed/dQw4w9WgXcQ"></iframe>')
+         for c in course_ids for _ in range(counts['videos'])),
+    )
+    conn.execute('COMMIT')
+    phase('updates, events, resources and videos')
+
+    # Indexes on the source tables first (the derived fills use them), then
+    # the derived tables, then their indexes, then the triggers
+    indexes = [(table, sql) for kind, table, sql in deferred if kind == 'index']
+    for table, sql in indexes:
+        if table not in DERIVED:
+            conn.execute(sql)
+    phase('indexes')
+    fill_derived(conn)
+    for table, sql in indexes:
+        if table in DERIVED:
+            conn.execute(sql)
+    for kind, _, sql in deferred:
+        if kind == 'trigger':
+            conn.execute(sql)
+    feed_rows = conn.execute('SELECT COUNT(*) FROM student_feed').fetchone()[0]
+    phase(f'student feeds ({feed_rows} rows), search index, triggers')
+
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    conn.close()
+    return {'students': student_ids, 'admins': admins, 'pdfs': pdfs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Create a database full of synthetic data')
+    parser.add_argument('database')
+    parser.add_argument('--scale', choices=list(SCALES), default='small')
+    for name in SCALES['small']:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, help=f'override the scale\'s {name}')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--uploads', help='upload folder for the synthetic PDFs')
+    parser.add_argument('--force', action='store_true', help='replace the database if it exists')
+    args = parser.parse_args()
+
+    if os.path.exists(args.database):
+        if not args.force:
+            parser.error(f'{args.database} exists (use --force to replace it)')
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.database + suffix):
+                os.remove(args.database + suffix)
+
+    counts = dict(SCALES[args.scale])
+    for name in counts:
+        if getattr(args, name) is not None:
+            counts[name] = getattr(args, name)
+
+    start = time.perf_counter()
+    data = build(args.database, counts, args.seed, args.uploads, log=print)
+    print(f"Seeded {args.database}: {len(data['students'])} students in {time.perf_counter() - start:.1f}s "
+          f"(password: {PASSWORD})")
+
+
+if __name__ == '__main__':
+    main()
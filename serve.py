@@ -0,0 +1,211 @@
+"""Production server: gunicorn, sized for the machine it runs on.
+
+    python serve.py                     # what `python app.py` runs too
+    python serve.py --print-config      # show the computed settings and exit
+    gunicorn app:app                    # same settings, read from gunicorn.conf.py
+
+Sizing (each setting can be overridden with the variable in brackets):
+
+- workers [WEB_CONCURRENCY]: one process per available CPU, plus one so a
+  core isn't left idle while a worker waits on disk. Python threads share
+  one GIL, so only processes add CPU parallelism.
+- worker class [WEB_WORKER_CLASS]: eventlet (eventlet_worker.py) when it
+  is installed. Each open /stream page is a green thread waiting on the
+  push broker, so the number of live pages is capped by
+  WEB_WORKER_CONNECTIONS (default 1000) per worker, not by threads.
+  The standard library is patched before the app is imported.
+- threads [WEB_THREADS], with WEB_WORKER_CLASS=gthread: DB_POOL_SIZE per
+  worker, so every request thread can get a pooled connection without
+  waiting, plus WEB_STREAM_THREADS (default 16) for /stream connections.
+  Each open live page holds one of those for as long as it is open.
+- HASH_WORKERS: the available CPUs split between the workers, instead of
+  every worker starting a password-hashing process per CPU.
+- CACHE_TYPE: 'filesystem' with more than one worker, so a cache
+  invalidation in one worker reaches the others. The app's own default,
+  'lru', is only coherent within a single process.
+
+The app is imported once in the master (preload), so migrations run once
+and workers share its memory pages, compiled templates included (the
+master loads them all before forking, see templating.py). Workers are
+recycled after WEB_MAX_REQUESTS requests (with jitter, so they don't all
+restart together) to keep memory flat. On SIGTERM or recycling, a worker
+stops accepting, ends its /stream connections (browsers reconnect to
+another worker with Last-Event-ID), finishes in-flight requests within
+WEB_GRACEFUL_TIMEOUT seconds, then stops its job threads, hashing pool and
+database connections.
+
+Where gunicorn can't run (Windows) this falls back to waitress, in one
+process with the same number of threads.
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import threading
+import time
+
+STREAM_THREADS = 16
+EVENTLET_WORKER = 'eventlet_worker.EventletWorker'
+
+
+def available_cpus():
+    """CPUs this process may actually use: CPU affinity and a cgroup v2 quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def settings(env=None, cpus=None):
+    """gunicorn settings (and the environment for the app) for this machine."""
+    env = os.environ if env is None else env
+    cpus = cpus or available_cpus()
+    pool_size = int(env.get('DB_POOL_SIZE', 5))
+    workers = int(env.get('WEB_CONCURRENCY') or cpus + 1)
+    max_requests = int(env.get('WEB_MAX_REQUESTS', 1000))
+    worker_class = env.get('WEB_WORKER_CLASS') or (
+        'eventlet' if importlib.util.find_spec('eventlet') and importlib.util.find_spec('gunicorn') else 'gthread')
+    if worker_class == 'eventlet':
+        worker_class = EVENTLET_WORKER  # gunicorn no longer ships one
+
+    config = {
+        'bind': f"{env.get('HOST', '0.0.0.0')}:{env.get('PORT', 5000)}",
+        'workers': workers,
+        'worker_class': worker_class,
+        'preload_app': True,
+        'max_requests': max_requests,
+        'max_requests_jitter': max_requests // 10,
+        'graceful_timeout': int(env.get('WEB_GRACEFUL_TIMEOUT', 30)),
+        'timeout': int(env.get('WEB_TIMEOUT', 60)),
+        'keepalive': int(env.get('WEB_KEEPALIVE', 5)),  # longer than most proxies wait between requests
+        'accesslog': env.get('WEB_ACCESS_LOG', '-') or None,
+        'when_ready': when_ready,
+        'post_worker_init': post_worker_init,
+        'worker_exit': worker_exit,
+    }
+    if worker_class == 'gthread':
+        config['threads'] = int(env.get('WEB_THREADS') or pool_size + int(env.get('WEB_STREAM_THREADS',
+                                                                                  STREAM_THREADS)))
+    else:
+        config['worker_connections'] = int(env.get('WEB_WORKER_CONNECTIONS', 1000))
+    if os.path.isdir('/dev/shm'):
+        config['worker_tmp_dir'] = '/dev/shm'  # heartbeat files off a possibly slow disk
+
+    app_env = {'HASH_WORKERS': str(max(1, cpus // workers))}
+    if workers > 1:
+        # The default 'lru' cache is per process: a dashboard or course list
+        # invalidated in one worker would stay stale in the others
+        app_env['CACHE_TYPE'] = 'filesystem'
+    return config, app_env
+
+
+def apply_app_env(app_env):
+    # Before the app is imported; an explicit setting always wins
+    for name, value in app_env.items():
+        os.environ.setdefault(name, value)
+
+
+def green_patch(config):
+    # Also before the app is imported: with preload, the locks, queues and
+    # threads it makes in the master must be green ones in the workers
+    if config['worker_class'] == EVENTLET_WORKER:
+        import eventlet_worker
+        eventlet_worker.green_patch()
+
+
+# ---------- gunicorn hooks ----------
+
+def when_ready(server):
+    cfg = server.cfg
+    if cfg.preload_app:
+        # Called before the first fork: every worker inherits the compiled templates
+        import templating
+        templates = templating.compile_templates(server.app.wsgi())
+        server.log.info('Loaded %s templates', len(templates))
+    per_worker = f'{cfg.threads} threads' if cfg.worker_class_str == 'gthread' else \
+        f'{cfg.worker_connections} connections'
+    server.log.info('Serving with %s %s workers x %s, recycled after ~%s requests',
+                    cfg.workers, cfg.worker_class_str, per_worker, cfg.max_requests)
+
+
+def post_worker_init(worker):
+    # /stream responses never finish on their own, so a worker told to stop
+    # would sit out the whole graceful timeout; end them as soon as it is
+    def watch():
+        while worker.alive:
+            time.sleep(0.5)
+        import push
+        push.get_broker(worker.wsgi).close()
+
+    threading.Thread(target=watch, name='shutdown-watch', daemon=True).start()
+
+
+def worker_exit(server, worker):
+    import db
+    import hashing
+    import jobs
+
+    app = getattr(worker, 'wsgi', None)
+    if not hasattr(app, 'extensions'):
+        return  # the worker never loaded the app
+    jobs.get_queue(app).stop()  # lets a running job finish
+    hashing.get_hasher(app).shutdown()
+    db.get_pool(app).close_all()
+
+
+# ---------- Running ----------
+
+def run(app, config):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:  # no gunicorn on Windows
+        return run_waitress(app, config)
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for name, value in config.items():
+                self.cfg.set(name, value)
+
+        def load(self):
+            return app
+
+    Server().run()
+
+
+def run_waitress(app, config):
+    try:
+        from waitress import serve
+    except ImportError:
+        sys.exit('Neither gunicorn nor waitress is installed (pip install gunicorn)')
+    host, port = config['bind'].rsplit(':', 1)
+    serve(app, host=host, port=int(port), threads=config.get('threads', STREAM_THREADS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the production server')
+    parser.add_argument('--print-config', action='store_true', help='show the computed settings and exit')
+    args = parser.parse_args()
+
+    config, app_env = settings()
+    if args.print_config:
+        for name, value in sorted({**config, **app_env}.items()):
+            if not callable(value):
+                print(f'{name} = {value!r}')
+        return
+
+    apply_app_env(app_env)
+    green_patch(config)
+    from app import app
+    run(app, config)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+// Sends the file of any <input type="file" data-chunked-upload="pdf|video">
+// through the resumable /uploads endpoint in chunks, then submits the form
+// with the finished upload's id instead of the file itself. A chunk that
+// fails is retried from the offset the server reports.
+(function () {
+  var CHUNK_SIZE = 8 * 1024 * 1024;
+  var RETRIES = 5;
+
+  function request(method, url, headers, body) {
+    return fetch(url, { method: method, headers: headers, body: body, credentials: 'same-origin' })
+      .then(function (response) {
+        if (!response.ok) {
+          return response.text().then(function (text) {
+            var error = new Error(text || response.statusText);
+            error.status = response.status;
+            throw error;
+          });
+        }
+        return response;
+      });
+  }
+
+  function sendFrom(url, file, offset, progress, retries) {
+    if (offset >= file.size) {
+      return Promise.resolve();
+    }
+    var chunk = file.slice(offset, offset + CHUNK_SIZE);
+    return request('PATCH', url, {
+      'Content-Type': 'application/offset+octet-stream',
+      'Upload-Offset': String(offset)
+    }, chunk).then(function (response) {
+      var next = parseInt(response.headers.get('Upload-Offset'), 10);
+      progress(next / file.size);
+      return sendFrom(url, file, next, progress, RETRIES);
+    }, function (error) {
+      // Bad file type or size: give up. Network trouble: ask where we are and resume.
+      if (retries <= 0 || (error.status && error.status !== 409 && error.status < 500)) {
+        throw error;
+      }
+      return new Promise(function (resolve) { setTimeout(resolve, 1000); })
+        .then(function () { return request('HEAD', url, {}); })
+        .then(function (response) {
+          var resumeAt = parseInt(response.headers.get('Upload-Offset'), 10);
+          return sendFrom(url, file, resumeAt, progress, retries - 1);
+        });
+    });
+  }
+
+  function upload(input, form) {
+    var file = input.files[0];
+    var status = form.querySelector('.upload-status');
+    var button = form.querySelector('button[type="submit"]');
+    var progress = function (done) {
+      if (status) {
+        status.textContent = 'Uploading… ' + Math.floor(done * 100) + '%';
+      }
+    };
+
+    if (button) {
+      button.disabled = true;
+    }
+    progress(0);
+    request('POST', '/uploads', {
+      'Upload-Kind': input.dataset.chunkedUpload,
+      'Upload-Length': String(file.size),
+      'Upload-Filename': file.name
+    }).then(function (response) {
+      var url = response.headers.get('Location');
+      return sendFrom(url, file, 0, progress, RETRIES).then(function () {
+        return url.split('/').pop();
+      });
+    }).then(function (uploadId) {
+      var hidden = document.createElement('input');
+      hidden.type = 'hidden';
+      hidden.name = 'upload_id';
+      hidden.value = uploadId;
+      form.appendChild(hidden);
+      input.disabled = true;  // the bytes are already on the server
+      form.submit();
+    }).catch(function (error) {
+      if (status) {
+        status.textContent = 'Upload failed: ' + error.message;
+      }
+      if (button) {
+        button.disabled = false;
+      }
+    });
+  }
+
+  document.querySelectorAll('input[type="file"][data-chunked-upload]').forEach(function (input) {
+    input.form.addEventListener('submit', function (event) {
+      if (input.files.length) {
+        event.preventDefault();
+        upload(input, input.form);
+      }
+    });
+  });
+})();
@@ -0,0 +1,64 @@
+// Listens on /stream for new updates and schedule changes of the student's
+// courses. On the dashboard they are added to the top of their list; on
+// other pages a short notice appears instead. EventSource reconnects by
+// itself and sends Last-Event-ID, so nothing is missed across a blip; a
+// 'resync' event means too much was missed and the page reloads.
+(function () {
+  if (!window.EventSource) {
+    return;
+  }
+
+  function item(html) {
+    var li = document.createElement('li');
+    li.className = 'list-group-item';
+    li.innerHTML = html;
+    return li;
+  }
+
+  function text(value) {
+    var span = document.createElement('span');
+    span.textContent = value == null ? '' : String(value);
+    return span.innerHTML;
+  }
+
+  function notice(message) {
+    var box = document.createElement('div');
+    box.className = 'alert alert-info position-fixed bottom-0 end-0 m-3 shadow-sm';
+    box.style.zIndex = 2000;
+    box.textContent = message;
+    document.body.appendChild(box);
+    setTimeout(function () { box.remove(); }, 8000);
+  }
+
+  function show(kind, html, message) {
+    var list = document.querySelector('[data-live-list="' + kind + '"]');
+    if (list) {
+      list.insertBefore(item(html), list.firstChild);
+    } else {
+      notice(message);
+    }
+  }
+
+  var source = new EventSource('/stream');
+
+  source.addEventListener('update', function (e) {
+    var u = JSON.parse(e.data);
+    show('update',
+      '<strong>' + text(u.title) + '</strong><br>' +
+      '<small class="text-muted">' + text(u.created_at) + '</small><br>' + text(u.message),
+      'New update in ' + u.course_code + ': ' + u.title);
+  });
+
+  source.addEventListener('schedule', function (e) {
+    var s = JSON.parse(e.data);
+    show('schedule',
+      '<strong>' + text(s.course_code) + '</strong>: ' + text(s.new_date) + ' at ' + text(s.new_time) +
+      '<br>' + text(s.message),
+      s.course_code + ' moved to ' + s.new_date + ' at ' + s.new_time);
+  });
+
+  source.addEventListener('resync', function () {
+    source.close();
+    window.location.reload();
+  });
+})();
@@ -0,0 +1,67 @@
+"""Compiled templates: a bytecode cache on disk and a compile step for deploys.
+
+    python templating.py compile      # at deploy time, before the workers start
+    python templating.py clear
+
+Jinja turns each template into Python code the first time it is rendered,
+in every worker and again after every restart. With TEMPLATE_CACHE_DIR set
+(default instance/jinja) that code is kept on disk, keyed by the template
+name and a checksum of its source. Workers and restarts load it instead of
+parsing the template again, and an edited template simply misses and is
+compiled anew, so the cache never needs clearing on deploy. Files are
+written to a temporary name and renamed, so workers can share the directory.
+
+`compile` fills the cache for every template ahead of time. Under serve.py
+the gunicorn master also loads them all before forking, so workers start
+with compiled templates already in memory.
+"""
+import argparse
+import os
+import time
+
+from jinja2 import FileSystemBytecodeCache
+
+
+def init_app(app):
+    app.config.setdefault('TEMPLATE_CACHE_DIR', 'instance/jinja')  # '' turns the cache off
+
+    directory = app.config['TEMPLATE_CACHE_DIR']
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        # Read when Flask creates app.jinja_env, on first use
+        app.jinja_options = {**app.jinja_options, 'bytecode_cache': FileSystemBytecodeCache(directory)}
+
+
+def compile_templates(app):
+    """Load every template the app can render, compiling the ones not in the cache yet."""
+    names = app.jinja_env.list_templates()
+    for name in names:
+        app.jinja_env.get_template(name)
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compiled template cache')
+    parser.add_argument('command', choices=['compile', 'clear'])
+    args = parser.parse_args()
+
+    os.environ.setdefault('AUTO_MIGRATE', '0')
+    from app import app
+
+    cache = app.jinja_env.bytecode_cache
+    if cache is None:
+        parser.exit(1, 'TEMPLATE_CACHE_DIR is empty, there is no template cache.\n')
+
+    if args.command == 'compile':
+        start = time.perf_counter()
+        names = compile_templates(app)
+        print(f'{len(names)} template(s) in {app.config["TEMPLATE_CACHE_DIR"]} '
+              f'({(time.perf_counter() - start) * 1000:.0f} ms).')
+
+    elif args.command == 'clear':
+        cache.clear()
+        print(f'Cleared {app.config["TEMPLATE_CACHE_DIR"]}.')
+
+
+if __name__ == '__main__':
+    main()
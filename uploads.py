@@ -0,0 +1,264 @@
+"""Resumable, chunked uploads (the core of the tus protocol).
+
+    POST   /uploads        Upload-Length, Upload-Kind (pdf|video), Upload-Filename
+                           -> 201, Location: /uploads/<id>
+    HEAD   /uploads/<id>   -> Upload-Offset, Upload-Length
+    PATCH  /uploads/<id>   Upload-Offset: <current offset>, body: the next chunk
+                           -> 204, Upload-Offset: <new offset>
+    DELETE /uploads/<id>   abandon the upload
+
+Chunks are appended to a temp file as they are read from the request stream,
+so memory use does not depend on the file size. If a PATCH is cut off, the
+client asks for the offset with HEAD and carries on from there. The first
+bytes are checked against the file type's signature as soon as they arrive.
+Nothing is visible outside the temp folder until the form that uses the upload
+is saved: store_video() renames the file into the video folder and
+store_pdf() hands it to the blob store, which does the same.
+"""
+import json
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from flask import current_app
+
+import blob_store
+
+CHUNK_SIZE = 64 * 1024
+SNIFF_BYTES = 12
+
+MB = 1024 * 1024
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _is_video(head):
+    return (
+        head[4:8] in (b'ftyp', b'moov', b'mdat', b'wide', b'free')  # mp4 / mov
+        or head[:4] == b'\x1a\x45\xdf\xa3'                           # mkv / webm
+        or (head[:4] == b'RIFF' and head[8:12] == b'AVI ')           # avi
+    )
+
+
+SIGNATURES = {
+    'pdf': lambda head: head.startswith(b'%PDF-'),
+    'video': _is_video,
+}
+
+
+def sniff(stream, kind):
+    """Check a seekable stream's first bytes without consuming it."""
+    position = stream.tell()
+    head = stream.read(SNIFF_BYTES)
+    stream.seek(position)
+    return SIGNATURES[kind](head)
+
+
+# ---------- State on disk ----------
+# <id>.part holds the bytes received so far (its size is the offset),
+# <id>.json the upload's kind, length, filename and owner, and
+# <id>.part.lock is locked while a PATCH writes to it.
+
+def _folder():
+    folder = current_app.config['UPLOAD_TEMP_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def _paths(upload_id):
+    try:
+        upload_id = uuid.UUID(upload_id).hex
+    except (TypeError, ValueError):
+        raise UploadError('Upload not found', 404)
+    folder = _folder()
+    return (os.path.join(folder, f'{upload_id}.part'),
+            os.path.join(folder, f'{upload_id}.json'))
+
+
+def _load(upload_id, owner):
+    part, meta_path = _paths(upload_id)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        raise UploadError('Upload not found', 404)
+    if meta['owner'] != owner:
+        raise UploadError('Upload not found', 404)
+    meta['offset'] = os.path.getsize(part)
+    return part, meta
+
+
+def _remove(upload_id):
+    part, meta_path = _paths(upload_id)
+    for path in (part, meta_path, part + '.lock'):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def purge_expired(max_age=None):
+    """Remove uploads that were started but not finished in time."""
+    max_age = current_app.config['UPLOAD_EXPIRY'] if max_age is None else max_age
+    cutoff = time.time() - max_age
+    removed = 0
+    folder = _folder()
+    for name in os.listdir(folder):
+        if name.endswith('.lock'):
+            continue  # goes with its .part, which is rewritten while in use
+        path = os.path.join(folder, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+                if name.endswith('.part') and os.path.exists(path + '.lock'):
+                    os.remove(path + '.lock')
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+# ---------- Protocol ----------
+
+def create(owner, kind, length, filename):
+    if kind not in SIGNATURES:
+        raise UploadError(f'Unknown upload kind {kind!r}')
+    try:
+        length = int(length)
+    except (TypeError, ValueError):
+        raise UploadError('Upload-Length is required')
+    if length <= 0:
+        raise UploadError('Upload-Length must be positive')
+    if length > current_app.config['UPLOAD_MAX_SIZES'][kind]:
+        raise UploadError('File is too large', 413)
+
+    purge_expired()
+    upload_id = uuid.uuid4().hex
+    part, meta_path = _paths(upload_id)
+    open(part, 'wb').close()
+    with open(meta_path, 'w') as f:
+        json.dump({'kind': kind, 'length': length, 'filename': filename, 'owner': owner}, f)
+    return upload_id
+
+
+def status(upload_id, owner):
+    _, meta = _load(upload_id, owner)
+    return meta['offset'], meta['length']
+
+
+@contextmanager
+def _locked(part):
+    # One PATCH at a time per upload, across threads and worker processes.
+    # The OS releases the lock when its holder exits, so a crashed worker
+    # can't leave an upload locked.
+    fd = os.open(part + '.lock', os.O_CREAT | os.O_RDWR)
+    try:
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            raise UploadError('Upload is busy', 409)
+        yield
+    finally:
+        os.close(fd)  # releases the lock
+
+
+def append(upload_id, owner, offset, stream):
+    """Write the request body at `offset`. Returns the new offset."""
+    part, meta = _load(upload_id, owner)
+
+    with _locked(part):
+        # Compared under the lock: a PATCH that just finished has moved it
+        current = os.path.getsize(part)
+        if str(offset) != str(current):
+            raise UploadError('Upload-Offset does not match', 409)
+        remaining = meta['length'] - current
+        check = SIGNATURES[meta['kind']]
+        head = None  # bytes seen so far, until the signature has been checked
+        if current < SNIFF_BYTES:
+            with open(part, 'rb') as f:
+                head = f.read()
+
+        with open(part, 'ab') as out:
+            while remaining > 0:
+                chunk = stream.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                if head is not None:
+                    head += chunk
+                    if len(head) >= min(SNIFF_BYTES, meta['length']):
+                        if not check(head):
+                            out.close()
+                            _remove(upload_id)
+                            raise UploadError(f"Not a {meta['kind']} file", 415)
+                        head = None
+                out.write(chunk)
+                remaining -= len(chunk)
+
+        if remaining == 0 and stream.read(1):
+            raise UploadError('Chunk goes past Upload-Length', 413)
+        return meta['length'] - remaining
+
+
+def abandon(upload_id, owner):
+    _load(upload_id, owner)
+    _remove(upload_id)
+
+
+def _completed(upload_id, owner, kind):
+    part, meta = _load(upload_id, owner)
+    if meta['kind'] != kind:
+        raise UploadError(f'Upload is not a {kind}')
+    if meta['offset'] != meta['length']:
+        raise UploadError('Upload is not complete', 409)
+    return part, meta
+
+
+# ---------- Committing ----------
+
+def store_pdf(conn, upload_id, owner, upload_folder):
+    """Move a completed PDF upload into the blob store. Returns the blob name.
+
+    Like blob_store.store(), this leaves a write transaction open for the
+    caller's INSERT/UPDATE and commit.
+    """
+    part, meta = _completed(upload_id, owner, 'pdf')
+    with open(part, 'rb') as f:
+        name = blob_store.store(conn, f, upload_folder, original_name=meta['filename'])
+    _remove(upload_id)
+    return name
+
+
+def store_video(upload_id, owner, video_folder):
+    """Move a completed video upload into the video folder. Returns its file name."""
+    part, meta = _completed(upload_id, owner, 'video')
+    ext = meta['filename'].rsplit('.', 1)[1].lower()
+    name = f'{uuid.UUID(upload_id).hex}.{ext}'
+    os.makedirs(video_folder, exist_ok=True)
+    # A rename when the temp folder is on the same filesystem, a copy otherwise
+    shutil.move(part, os.path.join(video_folder, name))
+    _remove(upload_id)
+    return name
+
+
+def init_app(app):
+    # Plain form posts and each PATCH chunk are capped by MAX_CONTENT_LENGTH;
+    # whole chunked uploads by UPLOAD_MAX_SIZES
+    app.config.setdefault('MAX_CONTENT_LENGTH', 64 * MB)
+    app.config.setdefault('UPLOAD_MAX_SIZES', {'pdf': 50 * MB, 'video': 4096 * MB})
+    app.config.setdefault('UPLOAD_TEMP_FOLDER', os.path.join(app.instance_path, 'uploads'))
+    app.config.setdefault('UPLOAD_EXPIRY', 24 * 3600)
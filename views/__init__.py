@@ -0,0 +1,7 @@
+"""Blueprints registered by app.create_app().
+
+auth     login, logout and the landing page; login_required
+student  dashboard, courses, enrollment, updates, events, search, /stream
+content  course resources and videos, PDF and lecture files, chunked uploads
+admin    users, courses, updates, events, enrollments and the stats endpoints
+"""
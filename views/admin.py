@@ -0,0 +1,506 @@
+import sqlite3
+
+from flask import Blueprint, Response, current_app, flash, jsonify, redirect, render_template, request, session, url_for
+
+import cache
+import db
+import jobs
+import profiling
+import push
+from course_content import get_course_catalogue, invalidate_course_catalogue
+from db import get_db
+from enrollments import apply_enrollments, move_students
+from hashing import get_hasher, hash_password
+from pagination import make_page, page_args
+from roster_import import RosterError, import_roster, read_roster
+from views.auth import login_required
+from views.content import collect_uploads, pdf_from_request, release_upload, release_video_file
+from views.student import bump_dashboard_version, load_events_page
+
+bp = Blueprint('admin', __name__)
+
+
+# ---------- Students ----------
+
+@bp.route('/admin/add-student', methods=['GET', 'POST'])
+@login_required
+def add_student():
+    if session.get('role') != 'admin':
+        return redirect('/login')
+
+    conn = get_db()
+    c = conn.cursor()
+
+    if request.method == 'POST':
+        name = request.form['name']
+        roll = request.form['roll']
+        phone = request.form['phone']
+        passcode = request.form['passcode']
+        course_id = request.form['course_id']
+
+        password_hash = hash_password(passcode)
+
+        try:
+            # Insert student
+            c.execute('''
+                INSERT INTO users (name, role, roll, phone, password_hash)
+                VALUES (?, 'student', ?, ?, ?)
+            ''', (name, roll, phone, password_hash))
+
+            student_id = c.lastrowid
+
+            # Enroll in course
+            c.execute('''
+                INSERT INTO enrollments (student_id, course_id)
+                VALUES (?, ?)
+            ''', (student_id, course_id))
+
+            conn.commit()
+            bump_dashboard_version()
+            flash("✅ Student added successfully!")
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            flash("❌ Error: Student with this roll or phone already exists.")
+
+        return redirect(url_for('admin.add_student'))  # Reload the same page with flash message
+
+    # GET request
+    courses = get_course_catalogue()
+    return render_template('add_student.html', courses=courses)
+
+
+@bp.route('/admin/import-students', methods=['GET', 'POST'])
+@login_required
+def import_students():
+    if session.get('role') != 'admin':
+        return redirect('/login')
+
+    result = None
+    if request.method == 'POST':
+        file = request.files.get('roster')
+        if not file or not file.filename:
+            flash("Please choose a roster file.")
+            return redirect(url_for('admin.import_students'))
+
+        try:
+            rows = read_roster(file.stream, file.filename)
+            result = import_roster(get_db(), rows, get_hasher())
+        except RosterError as e:
+            flash(str(e))
+            return redirect(url_for('admin.import_students'))
+
+        if result.created:
+            bump_dashboard_version()
+
+    return render_template('import_students.html', result=result)
+
+
+# Bulk re-enrollment API for admins. JSON body, either
+#   {"student_ids": [...], "from_course_id": 1, "to_course_id": 2}   move a batch
+#   {"enrollments": {"<student_id>": [course ids], ...}}             set exactly
+@bp.route('/admin/enrollments/bulk', methods=['POST'])
+@login_required
+def bulk_enrollments():
+    if session.get('role') != 'admin':
+        return jsonify(error="Unauthorized"), 403
+
+    data = request.get_json(silent=True) or {}
+    conn = get_db()
+    try:
+        if 'enrollments' in data:
+            added, removed = apply_enrollments(conn, data['enrollments'])
+        elif {'student_ids', 'from_course_id', 'to_course_id'} <= data.keys():
+            added, removed = move_students(conn, data['student_ids'], data['from_course_id'], data['to_course_id'])
+        else:
+            return jsonify(error="Send either 'enrollments' or 'student_ids', 'from_course_id' and 'to_course_id'"), 400
+    except (TypeError, ValueError, AttributeError):
+        return jsonify(error="Ids must be integers"), 400
+    except sqlite3.IntegrityError:
+        return jsonify(error="Unknown student or course id"), 400
+
+    if added or removed:
+        bump_dashboard_version()
+    return jsonify(added=added, removed=removed)
+
+
+# ---------- Courses ----------
+
+# Manage Courses (Add & List) for Admin
+@bp.route('/admin/manage_course', methods=['GET', 'POST'])
+@login_required
+def manage_course():
+    if session.get('role') != 'admin':
+        return redirect(url_for('student.dashboard'))
+
+    conn = get_db()
+
+    if request.method == 'POST':
+        # Handle adding new course
+        name = request.form['name']
+        code = request.form['code']
+        filename = pdf_from_request(conn, 'syllabus_pdf')
+
+        if filename:
+            conn.execute('INSERT INTO courses (name, code, syllabus_pdf) VALUES (?, ?, ?)',
+                         (name, code, filename))
+            conn.commit()
+            invalidate_course_catalogue()
+            bump_dashboard_version()
+        else:
+            return "Invalid file. Only PDF allowed."
+
+    courses = get_course_catalogue()
+    return render_template('manage_course.html', courses=courses, role='admin')
+
+
+@bp.route('/admin/edit_course/<int:course_id>', methods=['GET', 'POST'])
+@login_required
+def edit_course(course_id):
+    if session.get('role') != 'admin':
+        return redirect(url_for('student.dashboard'))
+
+    conn = get_db()
+    course = conn.execute('SELECT * FROM courses WHERE id = ?', (course_id,)).fetchone()
+
+    if not course:
+        return "Course not found", 404
+
+    if request.method == 'POST':
+        name = request.form['name']
+        code = request.form['code']
+        syllabus_filename = course['syllabus_pdf']  # keep current file unless updated
+
+        new_filename = pdf_from_request(conn, 'syllabus_pdf')
+        if new_filename:
+            # Delete old file safely
+            release_upload(conn, syllabus_filename)
+            syllabus_filename = new_filename
+            collect_uploads(conn)
+
+        conn.execute('''
+            UPDATE courses
+            SET name = ?, code = ?, syllabus_pdf = ?
+            WHERE id = ?
+        ''', (name, code, syllabus_filename, course_id))
+
+        conn.commit()
+        invalidate_course_catalogue()
+        bump_dashboard_version()
+        return redirect(url_for('admin.manage_course'))
+
+    return render_template('edit_course.html', course=course)
+
+
+@bp.route('/admin/delete_course/<int:course_id>', methods=['POST'])
+@login_required
+def delete_course(course_id):
+    if session.get('role') != 'admin':
+        return redirect(url_for('student.dashboard'))
+
+    conn = get_db()
+    course = conn.execute('SELECT * FROM courses WHERE id = ?', (course_id,)).fetchone()
+    if course:
+        # Optionally delete the PDF file from server
+        release_upload(conn, course['syllabus_pdf'])
+        for row in conn.execute(
+                'SELECT filename FROM videos WHERE course_id = ? AND filename IS NOT NULL', (course_id,)).fetchall():
+            release_video_file(conn, row['filename'])
+
+        # Cascades to the course's resources; triggers drop their blob references
+        conn.execute('DELETE FROM courses WHERE id = ?', (course_id,))
+        collect_uploads(conn)
+        conn.commit()
+        invalidate_course_catalogue()
+        bump_dashboard_version()
+
+    return redirect(url_for('admin.manage_course'))
+
+
+# ---------- Updates, schedule changes and events ----------
+
+@bp.route('/upload_update', methods=['GET', 'POST'])
+@login_required
+def upload_update():
+    if session.get('role') != 'admin':
+        return "Unauthorized", 403
+
+    conn = get_db()
+    user_id = session['user_id']
+
+    courses = get_course_catalogue()
+
+    if request.method == 'POST':
+        course_id = request.form['course_id']
+        title = request.form['title']
+        message = request.form['message']
+
+        # Use teacher_id or admin_id based on role
+        teacher_id = user_id
+
+        cur = conn.execute(
+            "INSERT INTO updates (course_id, teacher_id, title, message) VALUES (?, ?, ?, ?)",
+            (course_id, teacher_id, title, message)
+        )
+        update = conn.execute('''
+            SELECT u.id, u.title, u.message, u.created_at, c.code AS course_code
+            FROM updates u JOIN courses c ON c.id = u.course_id
+            WHERE u.id = ?
+        ''', (cur.lastrowid,)).fetchone()
+        push.publish(conn, int(course_id), 'update', dict(update))
+
+        conn.commit()
+        bump_dashboard_version()
+        return redirect(url_for('student.updates'))
+
+    return render_template('upload_update.html', courses=courses)
+
+
+@bp.route('/delete-update/<int:update_id>', methods=['POST'])
+@login_required
+def delete_update(update_id):
+    conn = get_db()
+    update = conn.execute('SELECT * FROM updates WHERE id = ?', (update_id,)).fetchone()
+
+    if not update:
+        return "Update not found", 404
+
+    user_id = session.get('user_id')
+    role = session.get('role')
+
+    # Only allow if admin or owner
+    if role == 'admin' or (role == 'teacher' and update['teacher_id'] == user_id):
+        conn.execute('DELETE FROM updates WHERE id = ?', (update_id,))
+        conn.commit()
+        bump_dashboard_version()
+        return redirect(url_for('student.updates'))
+    else:
+        return "Unauthorized", 403
+
+
+@bp.route('/admin/schedule-change', methods=['GET', 'POST'])
+@login_required
+def schedule_change():
+    if session.get('role') != 'admin':
+        return "Unauthorized", 403
+
+    conn = get_db()
+    if request.method == 'POST':
+        course_id = int(request.form['course_id'])
+        new_date = request.form['new_date']
+        new_time = request.form['new_time']
+        message = request.form.get('message', '').strip()
+
+        cur = conn.execute('''
+            INSERT INTO schedule_updates (course_id, teacher_id, new_date, new_time, message)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (course_id, session['user_id'], new_date, new_time, message))
+        course = conn.execute('SELECT code FROM courses WHERE id = ?', (course_id,)).fetchone()
+        push.publish(conn, course_id, 'schedule', {
+            'id': cur.lastrowid,
+            'course_code': course['code'],
+            'new_date': new_date,
+            'new_time': new_time,
+            'message': message,
+        })
+        conn.commit()
+        bump_dashboard_version()
+        flash('Schedule change posted.')
+        return redirect(url_for('admin.schedule_change'))
+
+    changes = conn.execute('''
+        SELECT s.new_date, s.new_time, s.message, c.code
+        FROM schedule_updates s JOIN courses c ON c.id = s.course_id
+        ORDER BY s.id DESC LIMIT 20
+    ''').fetchall()
+    return render_template('schedule_change.html', courses=get_course_catalogue(), changes=changes)
+
+
+@bp.route('/manage-events', methods=['GET', 'POST'])
+@login_required
+def manage_events():
+    if session.get('role') != 'admin':
+        return redirect(url_for('auth.home'))
+
+    conn = get_db()
+
+    if request.method == 'POST':
+        title = request.form['title']
+        description = request.form['description']
+        event_date = request.form['event_date']
+        conn.execute('INSERT INTO events (title, description, event_date) VALUES (?, ?, ?)',
+                     (title, description, event_date))
+        conn.commit()
+
+    events, next_cursor = load_events_page(conn)
+    return render_template('manage_events.html', events=events, next_cursor=next_cursor)
+
+
+@bp.route('/delete-event/<int:event_id>', methods=['POST'])
+@login_required
+def delete_event(event_id):
+    if session.get('role') != 'admin':
+        return redirect(url_for('auth.home'))
+
+    conn = get_db()
+    conn.execute('DELETE FROM events WHERE id = ?', (event_id,))
+    conn.commit()
+    return redirect(url_for('admin.manage_events'))
+
+
+# ---------- Manage Users ----------
+@bp.route('/manage-users', methods=['GET'])
+def manage_users():
+    conn = get_db()
+
+    (after_id,), limit = page_args(default_cursor=(0,))
+
+    # One page of users with their course names in one query.
+    # char(31) (unit separator) keeps course names containing commas intact.
+    users = conn.execute('''
+        SELECT users.*, GROUP_CONCAT(courses.name, char(31)) AS course_names
+        FROM users
+        LEFT JOIN enrollments ON enrollments.student_id = users.id AND users.role = 'student'
+        LEFT JOIN courses ON courses.id = enrollments.course_id
+        WHERE users.id > ?
+        GROUP BY users.id
+        ORDER BY users.id
+        LIMIT ?
+    ''', (after_id, limit + 1)).fetchall()
+    users, next_cursor = make_page(users, limit, key=lambda u: (u['id'],))
+
+    user_courses = {
+        user['id']: user['course_names'].split('\x1f') if user['course_names'] else []
+        for user in users
+    }
+
+    return render_template('manage_users.html', users=users, user_courses=user_courses, next_cursor=next_cursor)
+
+
+# ---------- Edit User ----------
+@bp.route('/edit-user/<int:user_id>', methods=['GET', 'POST'])
+def edit_user(user_id):
+    conn = get_db()
+    c = conn.cursor()
+
+    if request.method == 'POST':
+        # Process form submission
+        name = request.form['name']
+        phone = request.form['phone']
+        id_num = request.form.get('id_num')
+        roll = request.form.get('roll')
+        reg_no = request.form.get('reg_no')
+
+        c.execute('''
+            UPDATE users
+            SET name = ?, phone = ?, id_num = ?, roll = ?, reg_no = ?
+            WHERE id = ?
+        ''', (name, phone, id_num, roll, reg_no, user_id))
+        conn.commit()
+        bump_dashboard_version()
+
+        return redirect(url_for('admin.manage_users'))
+
+    # GET request - load the form
+    c.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+    user = c.fetchone()
+
+    if not user:
+        return "User not found", 404
+
+    return render_template('edit_user.html', user=user)
+
+
+# ---------- Delete User ----------
+@bp.route('/delete-user', methods=['POST'])
+def delete_user():
+    user_id = request.form['user_id']
+
+    conn = get_db()
+    c = conn.cursor()
+
+    # Optional: Confirm role isn't admin before deleting
+    c.execute("SELECT role FROM users WHERE id = ?", (user_id,))
+    role_row = c.fetchone()
+    if role_row and role_row[0] != 'admin':
+        c.execute("DELETE FROM users WHERE id = ?", (user_id,))
+        conn.commit()
+        bump_dashboard_version()
+
+    return redirect(url_for('admin.manage_users'))
+
+
+# ---------- Stats ----------
+
+# Prometheus scrape target. Scrapers send METRICS_TOKEN as a bearer token;
+# admins can also open it in the browser
+@bp.route('/metrics')
+def metrics():
+    profiler = profiling.get_profiler()
+    if profiler is None:
+        return "Profiling is off (set PROFILING=1).", 404
+    token = current_app.config['METRICS_TOKEN']
+    if session.get('role') != 'admin' and not (token and request.headers.get('Authorization') == f'Bearer {token}'):
+        return "Unauthorized", 403
+    return Response(profiler.metrics(), mimetype='text/plain; version=0.0.4')
+
+
+@bp.route('/admin/profiling')
+@login_required
+def profiling_stats():
+    if session.get('role') != 'admin':
+        return "Unauthorized", 403
+    profiler = profiling.get_profiler()
+    if profiler is None:
+        return "Profiling is off (set PROFILING=1).", 404
+    return jsonify(slow_requests=profiler.slowest(), profiles_written=profiler.profiles_written)
+
+
+# Connection pool metrics (checkout wait time, exhaustion)
+@bp.route('/admin/db-pool')
+@login_required
+def db_pool_stats():
+    if session.get('role') != 'admin':
+        return "Unauthorized", 403
+    return jsonify(db.get_pool().stats())
+
+
+@bp.route('/admin/cache-stats')
+@login_required
+def cache_stats():
+    if session.get('role') != 'admin':
+        return "Unauthorized", 403
+    return jsonify(cache.get_cache().stats())
+
+
+@bp.route('/admin/hash-stats')
+@login_required
+def hash_stats():
+    if session.get('role') != 'admin':
+        return "Unauthorized", 403
+    return jsonify(get_hasher().stats())
+
+
+@bp.route('/admin/jobs')
+@login_required
+def job_stats():
+    if session.get('role') != 'admin':
+        return "Unauthorized", 403
+    stats = jobs.get_queue().stats()
+    stats['dead_jobs'] = [dict(job) for job in jobs.dead_jobs(get_db(), limit=20)]
+    return jsonify(stats)
+
+
+@bp.route('/admin/push-stats')
+@login_required
+def push_stats():
+    if session.get('role') != 'admin':
+        return "Unauthorized", 403
+    return jsonify(push.get_broker().stats())
+
+
+@bp.route('/admin/jobs/<int:job_id>/retry', methods=['POST'])
+@login_required
+def retry_job(job_id):
+    if session.get('role') != 'admin':
+        return "Unauthorized", 403
+    return jsonify(requeued=jobs.retry_dead(get_db(), job_id))
@@ -0,0 +1,63 @@
+from functools import wraps
+
+from flask import Blueprint, redirect, render_template, request, session, url_for
+
+from db import get_db
+from hashing import HashingBusy, get_hasher, hash_password, verify_password
+
+bp = Blueprint('auth', __name__)
+
+
+# Login required decorator
+def login_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return redirect(url_for('auth.login'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+@bp.app_context_processor
+def inject_user_role():
+    return dict(role=session.get('role'))
+
+
+@bp.route('/')
+def home():
+    return render_template('index.html')
+
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        phone = request.form['phone']
+        password = request.form['password']
+
+        conn = get_db()
+        user = conn.execute('SELECT * FROM users WHERE phone = ?', (phone,)).fetchone()
+
+        if user and verify_password(user['password_hash'], password):
+            session['user_id'] = user['id']
+            session['role'] = user['role']
+
+            # Upgrade hashes made with an older method or cost while we have the password
+            if get_hasher().needs_rehash(user['password_hash']):
+                try:
+                    conn.execute('UPDATE users SET password_hash = ? WHERE id = ?',
+                                 (hash_password(password), user['id']))
+                    conn.commit()
+                except HashingBusy:
+                    pass  # try again on a later login
+
+            return redirect(url_for('student.dashboard'))
+        else:
+            return "Invalid Credentials!"
+
+    return render_template('login.html')
+
+
+@bp.route('/logout')
+def logout():
+    session.clear()
+    return redirect(url_for('auth.login'))
@@ -0,0 +1,465 @@
+import os
+
+from flask import Blueprint, current_app, flash, redirect, render_template, request, session, url_for
+from werkzeug.utils import secure_filename
+
+import blob_store
+import file_serving
+import jobs
+import pdf_index
+import uploads
+from course_content import get_course_catalogue, load_resources, load_videos
+from db import get_db
+from views.auth import login_required
+
+bp = Blueprint('content', __name__)
+
+ALLOWED_EXTENSIONS = {'pdf'}
+VIDEO_ALLOWED_EXTENSIONS = {'mp4', 'mov', 'avi', 'mkv'}
+
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+def allowed_video_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in VIDEO_ALLOWED_EXTENSIONS
+
+
+# PDFs go into the content-addressed blob store; the returned name is what
+# courses.syllabus_pdf / resources.filename keep
+def save_pdf(conn, file):
+    return blob_store.store(conn, file.stream, current_app.config['UPLOAD_FOLDER'],
+                            original_name=secure_filename(file.filename))
+
+
+# The PDF from a form: either a finished chunked upload (upload_id, sent by
+# static/js/chunked_upload.js) or a plain file field. None if there is no valid PDF.
+def pdf_from_request(conn, field):
+    upload_id = request.form.get('upload_id')
+    file = request.files.get(field)
+    if upload_id:
+        name = uploads.store_pdf(conn, upload_id, session['user_id'], current_app.config['UPLOAD_FOLDER'])
+    elif file and allowed_file(file.filename) and uploads.sniff(file.stream, 'pdf'):
+        name = save_pdf(conn, file)
+    else:
+        return None
+    jobs.enqueue(conn, 'process_pdf', {'name': name}, unique=True)
+    return name
+
+
+# File removals go through the job queue (jobs.py) and are committed with the
+# change that orphaned the file, so they are retried instead of lost.
+def release_upload(conn, name):
+    # Blobs are reference counted and removed by blob_store.collect_garbage();
+    # files uploaded before the blob store existed are deleted directly
+    if name and not blob_store.is_blob(name):
+        jobs.enqueue(conn, 'remove_file', {'folder': 'UPLOAD_FOLDER', 'name': name})
+
+
+def release_video_file(conn, name):
+    if name:
+        jobs.enqueue(conn, 'remove_file', {'folder': 'VIDEO_UPLOAD_FOLDER', 'name': name})
+
+
+def collect_uploads(conn):
+    jobs.enqueue(conn, 'collect_blobs', unique=True)
+
+
+# Chunked, resumable uploads (protocol in uploads.py). Large lecture videos
+# can only come in this way; PDF forms use it too when JavaScript is on.
+UPLOAD_KINDS = {'pdf': allowed_file, 'video': allowed_video_file}
+
+
+@bp.route('/uploads', methods=['POST'])
+@login_required
+def upload_create():
+    if session.get('role') != 'admin':
+        return "Forbidden", 403
+
+    kind = request.headers.get('Upload-Kind', '')
+    filename = secure_filename(request.headers.get('Upload-Filename', ''))
+    allowed = UPLOAD_KINDS.get(kind)
+    if not allowed or not allowed(filename):
+        return "Only PDF files or mp4/mov/avi/mkv videos can be uploaded.", 415
+
+    upload_id = uploads.create(session['user_id'], kind, request.headers.get('Upload-Length'), filename)
+    return '', 201, {
+        'Location': url_for('content.upload_resource', upload_id=upload_id),
+        'Upload-Offset': '0',
+    }
+
+
+@bp.route('/uploads/<upload_id>', methods=['HEAD', 'PATCH', 'DELETE'])
+@login_required
+def upload_resource(upload_id):
+    if session.get('role') != 'admin':
+        return "Forbidden", 403
+
+    owner = session['user_id']
+    if request.method == 'PATCH':
+        # request.stream is read chunk by chunk, never as a whole body
+        offset = uploads.append(upload_id, owner, request.headers.get('Upload-Offset'), request.stream)
+        return '', 204, {'Upload-Offset': str(offset)}
+    if request.method == 'DELETE':
+        uploads.abandon(upload_id, owner)
+        return '', 204
+
+    offset, length = uploads.status(upload_id, owner)
+    return '', 200, {'Upload-Offset': str(offset), 'Upload-Length': str(length), 'Cache-Control': 'no-store'}
+
+
+# ---------- Resources ----------
+
+@bp.route('/admin/course/<int:course_id>/resources', methods=['GET', 'POST'])
+@login_required
+def manage_resources(course_id):
+    if session.get('role') != 'admin':
+        return redirect(url_for('student.dashboard'))
+
+    conn = get_db()
+    course = conn.execute('SELECT * FROM courses WHERE id = ?', (course_id,)).fetchone()
+    if not course:
+        return "Course not found", 404
+
+    if request.method == 'POST':
+        title = request.form['title']
+        filename = pdf_from_request(conn, 'resource_pdf')
+
+        if filename:
+            conn.execute('INSERT INTO resources (course_id, filename, title) VALUES (?, ?, ?)',
+                         (course_id, filename, title))
+            conn.commit()
+        else:
+            flash("Invalid file. Only PDF allowed.")
+            return redirect(url_for('content.manage_resources', course_id=course_id))
+
+    resources = load_resources(conn, [course_id])[course_id]
+    return render_template('manage_resources.html', course=course, resources=resources)
+
+
+@bp.route('/admin/resource/<int:resource_id>/edit', methods=['GET', 'POST'])
+@login_required
+def edit_resource(resource_id):
+    if session.get('role') != 'admin':
+        return redirect(url_for('student.dashboard'))
+
+    conn = get_db()
+    resource = conn.execute('SELECT * FROM resources WHERE id = ?', (resource_id,)).fetchone()
+
+    if not resource:
+        return "Resource not found", 404
+
+    if request.method == 'POST':
+        title = request.form['title']
+        filename = resource['filename']
+
+        new_filename = pdf_from_request(conn, 'resource_pdf')
+        if new_filename:
+            # Delete old file
+            release_upload(conn, filename)
+            filename = new_filename
+            collect_uploads(conn)
+
+        conn.execute('UPDATE resources SET title = ?, filename = ? WHERE id = ?',
+                     (title, filename, resource_id))
+        conn.commit()
+        return redirect(url_for('content.manage_resources', course_id=resource['course_id']))
+
+    return render_template('edit_resource.html', resource=resource)
+
+
+@bp.route('/admin/resource/<int:resource_id>/delete', methods=['POST'])
+@login_required
+def delete_resource(resource_id):
+    if session.get('role') != 'admin':
+        return redirect(url_for('student.dashboard'))
+
+    conn = get_db()
+    resource = conn.execute('SELECT * FROM resources WHERE id = ?', (resource_id,)).fetchone()
+
+    if resource:
+        # Delete file from disk
+        release_upload(conn, resource['filename'])
+
+        conn.execute('DELETE FROM resources WHERE id = ?', (resource_id,))
+        collect_uploads(conn)
+        conn.commit()
+
+    return redirect(url_for('content.manage_resources', course_id=resource['course_id']))
+
+
+@bp.route('/resources')
+@login_required
+def student_resources():
+    if session.get('role') != 'student':
+        return redirect(url_for('student.dashboard'))
+
+    conn = get_db()
+    student_id = session['user_id']
+
+    # Get courses student is enrolled in
+    courses = conn.execute('''
+        SELECT c.id, c.name, c.code FROM courses c
+        JOIN enrollments e ON e.course_id = c.id
+        WHERE e.student_id = ?
+    ''', (student_id,)).fetchall()
+
+    # Get resources for these courses
+    course_resources = load_resources(conn, [course['id'] for course in courses])
+
+    return render_template('student_resources.html', courses=courses, course_resources=course_resources)
+
+
+@bp.route('/admin/manage_resources')
+@login_required
+def manage_resources_list():
+    if session.get('role') != 'admin':
+        return redirect(url_for('student.dashboard'))
+    courses = get_course_catalogue()
+    return render_template('manage_resources_list.html', courses=courses)
+
+
+@bp.route('/pdf/<filename>')
+@login_required
+def serve_pdf(filename):
+    filename = secure_filename(filename)  # sanitize filename
+    directory, filename = blob_store.locate(current_app.config['UPLOAD_FOLDER'], filename)
+    download_name, etag = None, None
+    if blob_store.is_blob(filename):
+        # A blob's name is the SHA-256 of its content, so it doubles as the etag
+        download_name, etag = blob_store.original_name(get_db(), filename), filename[:-len('.pdf')]
+    return file_serving.send_cached_file(directory, filename, mimetype='application/pdf',
+                                         download_name=download_name, etag=etag)
+
+
+# {{ pdf_url(name) }} in templates: /pdf/<name>?v=<content hash>, cacheable forever
+@bp.app_template_global()
+def pdf_url(filename):
+    if blob_store.is_blob(filename):
+        # Named after its content hash already, no need to open the file
+        return url_for('content.serve_pdf', filename=filename, v=filename[:16])
+    directory, filename = blob_store.locate(current_app.config['UPLOAD_FOLDER'], filename)
+    return file_serving.versioned_url('content.serve_pdf', directory, filename)
+
+
+@bp.route('/thumb/<filename>')
+@login_required
+def serve_thumbnail(filename):
+    return file_serving.send_cached_file(current_app.config['THUMBNAIL_FOLDER'], secure_filename(filename),
+                                         mimetype='image/jpeg')
+
+
+# {{ thumb_url(r.thumbnail) }}: versioned like pdf_url, so listings revalidate nothing
+@bp.app_template_global()
+def thumb_url(thumbnail):
+    return file_serving.versioned_url('content.serve_thumbnail', current_app.config['THUMBNAIL_FOLDER'], thumbnail)
+
+
+# ---------- Videos ----------
+
+@bp.route('/admin/manage_videos')
+@login_required
+def manage_videos_list():
+    if session.get('role') != 'admin':
+        return redirect(url_for('student.dashboard'))
+
+    courses = get_course_catalogue()
+    return render_template('manage_videos_list.html', courses=courses)
+
+
+@bp.route('/admin/course/<int:course_id>/videos', methods=['GET', 'POST'])
+@login_required
+def manage_videos(course_id):
+    if session.get('role') != 'admin':
+        return redirect(url_for('student.dashboard'))
+
+    conn = get_db()
+    course = conn.execute('SELECT * FROM courses WHERE id = ?', (course_id,)).fetchone()
+    if not course:
+        return "Course not found", 404
+
+    if request.method == 'POST':
+        title = request.form['title'].strip()
+        embed_code = request.form.get('embed_code', '').strip()  # full iframe embed code
+        upload_id = request.form.get('upload_id')  # or a lecture file sent as a chunked upload
+
+        if not title:
+            flash("Title is required.")
+        elif not embed_code and not upload_id:
+            flash("Embed code or a video file is required.")
+        else:
+            filename = None
+            if upload_id:
+                filename = uploads.store_video(upload_id, session['user_id'],
+                                               current_app.config['VIDEO_UPLOAD_FOLDER'])
+            conn.execute(
+                'INSERT INTO videos (course_id, title, embed_code, filename) VALUES (?, ?, ?, ?)',
+                (course_id, title, embed_code, filename)
+            )
+            conn.commit()
+            flash("Video added successfully.")
+            return redirect(url_for('content.manage_videos', course_id=course_id))
+
+    videos = conn.execute('SELECT * FROM videos WHERE course_id = ?', (course_id,)).fetchall()
+    return render_template('manage_videos.html', course=course, videos=videos)
+
+
+@bp.route('/admin/video/<int:video_id>/edit', methods=['GET', 'POST'])
+@login_required
+def edit_video(video_id):
+    if session.get('role') != 'admin':
+        return redirect(url_for('student.dashboard'))
+
+    conn = get_db()
+    video = conn.execute('SELECT * FROM videos WHERE id = ?', (video_id,)).fetchone()
+
+    if not video:
+        return "Video not found", 404
+
+    if request.method == 'POST':
+        title = request.form['title'].strip()
+        embed_code = request.form.get('embed_code', '').strip()
+
+        if not title:
+            flash("Title is required.")
+        elif not embed_code and not video['filename']:
+            flash("Embed code is required.")
+        else:
+            conn.execute(
+                'UPDATE videos SET title = ?, embed_code = ? WHERE id = ?',
+                (title, embed_code, video_id)
+            )
+            conn.commit()
+            flash("Video updated successfully.")
+            return redirect(url_for('content.manage_videos', course_id=video['course_id']))
+
+    return render_template('edit_video.html', video=video)
+
+
+@bp.route('/admin/video/<int:video_id>/delete', methods=['POST'])
+@login_required
+def delete_video(video_id):
+    if session.get('role') != 'admin':
+        return redirect(url_for('student.dashboard'))
+
+    conn = get_db()
+    video = conn.execute('SELECT * FROM videos WHERE id = ?', (video_id,)).fetchone()
+
+    if video:
+        conn.execute('DELETE FROM videos WHERE id = ?', (video_id,))
+        release_video_file(conn, video['filename'])
+        conn.commit()
+        flash("Video deleted.")
+        course_id = video['course_id']
+    else:
+        course_id = None
+
+    if course_id:
+        return redirect(url_for('content.manage_videos', course_id=course_id))
+    else:
+        return redirect(url_for('content.manage_videos_list'))
+
+
+@bp.route('/videos')
+@login_required
+def student_videos():
+    if session.get('role') != 'student':
+        return redirect(url_for('student.dashboard'))
+
+    conn = get_db()
+    student_id = session['user_id']
+
+    courses = conn.execute('''
+        SELECT c.id, c.name, c.code FROM courses c
+        JOIN enrollments e ON e.course_id = c.id
+        WHERE e.student_id = ?
+    ''', (student_id,)).fetchall()
+
+    course_videos = load_videos(conn, [course['id'] for course in courses])
+
+    return render_template('student_videos.html', courses=courses, course_videos=course_videos)
+
+
+@bp.route('/videos/watch/<int:video_id>')
+@login_required
+def watch_video(video_id):
+    conn = get_db()
+    video = conn.execute('SELECT * FROM videos WHERE id = ?', (video_id,)).fetchone()
+
+    if not video:
+        return "Video not found", 404
+
+    user_role = session.get('role')
+    user_id = session.get('user_id')
+
+    # If student, check enrollment for the video's course
+    if user_role == 'student':
+        enrollment = conn.execute(
+            'SELECT * FROM enrollments WHERE student_id = ? AND course_id = ?',
+            (user_id, video['course_id'])
+        ).fetchone()
+        if not enrollment:
+            flash("You are not authorized to view this video.")
+            return redirect(url_for('content.student_videos'))
+
+    # Pass the embed code directly
+    return render_template('watch_video.html', video=video)
+
+
+@bp.route('/lectures/<filename>')
+@login_required
+def serve_video_file(filename):
+    conn = get_db()
+    video = conn.execute('SELECT course_id FROM videos WHERE filename = ?', (filename,)).fetchone()
+    if not video:
+        return "Video not found", 404
+
+    if session.get('role') == 'student':
+        enrollment = conn.execute(
+            'SELECT 1 FROM enrollments WHERE student_id = ? AND course_id = ?',
+            (session['user_id'], video['course_id'])
+        ).fetchone()
+        if not enrollment:
+            return "Forbidden", 403
+
+    # Uploaded files get a fresh name and are never overwritten, so the name is the etag
+    return file_serving.send_cached_file(
+        current_app.config['VIDEO_UPLOAD_FOLDER'], filename,
+        etag=filename.rsplit('.', 1)[0], accel_prefix=current_app.config['VIDEO_ACCEL_PREFIX'],
+        accel_root=current_app.config['VIDEO_UPLOAD_FOLDER'],
+    )
+
+
+# ---------- Background job handlers ----------
+
+@jobs.handler('remove_file')
+def remove_file_job(payload):
+    if payload['folder'] not in ('UPLOAD_FOLDER', 'VIDEO_UPLOAD_FOLDER'):
+        raise ValueError(f"Unknown upload folder {payload['folder']!r}")
+    name = secure_filename(payload['name'])
+    try:
+        os.remove(os.path.join(current_app.config[payload['folder']], name))
+    except FileNotFoundError:
+        pass  # already gone
+    if payload['folder'] == 'UPLOAD_FOLDER':
+        pdf_index.forget(get_db(), current_app.config['THUMBNAIL_FOLDER'], [name])
+
+
+@jobs.handler('collect_blobs')
+def collect_blobs_job(payload):
+    conn = get_db()
+    removed = blob_store.collect_garbage(conn, current_app.config['UPLOAD_FOLDER'])
+    pdf_index.forget(conn, current_app.config['THUMBNAIL_FOLDER'], removed)
+
+
+@jobs.handler('process_pdf')
+def process_pdf_job(payload):
+    # Post-upload work for a new PDF: check the bytes on disk match their
+    # hash, then record page count, size and a first-page thumbnail
+    name = payload['name']
+    conn = get_db()
+    if not conn.execute('SELECT 1 FROM blobs WHERE name = ?', (name,)).fetchone():
+        return  # already garbage collected
+    blob_store.verify(current_app.config['UPLOAD_FOLDER'], name)
+    pdf_index.index_file(conn, current_app.config['UPLOAD_FOLDER'], current_app.config['THUMBNAIL_FOLDER'], name)
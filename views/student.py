@@ -0,0 +1,199 @@
+from flask import Blueprint, Response, jsonify, redirect, render_template, request, session, url_for
+
+import cache
+import db
+import feed
+import push
+import search
+from course_content import get_course_catalogue
+from db import get_db
+from enrollments import apply_enrollments
+from pagination import MAX_ID, make_page, page_args
+from views.auth import login_required
+
+bp = Blueprint('student', __name__)
+
+
+# Dashboards show updates, course and student counts, so their cached pages are
+# keyed by a version that every write to those tables bumps
+def bump_dashboard_version():
+    cache.get_cache().bump('dashboard')
+
+
+@bp.route('/dashboard')
+@login_required
+def dashboard():
+    # Repeat views are served from the cache without touching SQLite
+    dashboard_cache = cache.get_cache()
+    key = f"dashboard:{session['user_id']}:{dashboard_cache.version('dashboard')}"
+    return dashboard_cache.get_or_load(key, render_dashboard)
+
+
+def render_dashboard():
+    conn = get_db()
+    user = conn.execute('SELECT * FROM users WHERE id = ?', (session['user_id'],)).fetchone()
+
+    if user['role'] == 'student':
+        # Fetch latest updates for students
+        updates = conn.execute(
+            'SELECT title, message, created_at FROM updates ORDER BY created_at DESC LIMIT 5'
+        ).fetchall()
+        schedule_changes = conn.execute('''
+            SELECT s.new_date, s.new_time, s.message, c.code
+            FROM schedule_updates s
+            JOIN enrollments e ON e.course_id = s.course_id AND e.student_id = ?
+            JOIN courses c ON c.id = s.course_id
+            ORDER BY s.id DESC LIMIT 5
+        ''', (user['id'],)).fetchall()
+
+        return render_template(
+            'student_dashboard.html',
+            user=user,
+            role=user['role'],
+            updates=updates,
+            schedule_changes=schedule_changes
+        )
+
+    elif user['role'] == 'admin':
+        # Fetch counts
+        total_courses = conn.execute('SELECT COUNT(*) FROM courses').fetchone()[0]
+        total_students = conn.execute('SELECT COUNT(*) FROM users WHERE role = "student"').fetchone()[0]
+
+        stats = {
+            "courses": total_courses,
+            "students": total_students
+        }
+
+        return render_template(
+            'admin_dashboard.html',
+            user=user,
+            role=user['role'],
+            stats=stats
+        )
+
+    else:
+        return "Invalid role!"
+
+
+@bp.route('/courses')
+def course_list():
+    courses = get_course_catalogue()
+    return render_template('course_list.html', courses=courses)
+
+
+@bp.route('/student/enroll', methods=['GET', 'POST'])
+@login_required
+def enroll_courses():
+    if session.get('role') != 'student':
+        return redirect(url_for('student.dashboard'))
+
+    conn = get_db()
+
+    if request.method == 'POST':
+        student_id = session['user_id']
+
+        # Only touch the courses that were ticked or unticked, in one transaction.
+        # The ids are checked against courses there, not the cached catalogue,
+        # which may not have a just-added course yet.
+        selected = {int(c) for c in request.form.getlist('courses') if c.isdigit()}
+        added, removed = apply_enrollments(conn, {student_id: selected}, only_existing=True)
+
+        if added or removed:
+            bump_dashboard_version()
+        return redirect(url_for('student.dashboard'))
+
+    # GET method: show courses with checkbox, pre-check enrolled courses
+    courses = get_course_catalogue()
+    enrolled_courses = conn.execute('SELECT course_id FROM enrollments WHERE student_id = ?', (session['user_id'],)).fetchall()
+
+    enrolled_ids = {row['course_id'] for row in enrolled_courses}
+
+    return render_template('enroll_courses.html', courses=courses, enrolled_ids=enrolled_ids)
+
+
+# Server-Sent Events: new updates and schedule changes for the user's courses.
+# The pooled connection is handed back before streaming starts, so an open
+# page doesn't hold one for its whole lifetime.
+@bp.route('/stream')
+@login_required
+def stream():
+    conn = get_db()
+    course_ids = None  # admins hear about every course
+    if session.get('role') == 'student':
+        course_ids = [row['course_id'] for row in conn.execute(
+            'SELECT course_id FROM enrollments WHERE student_id = ?', (session['user_id'],))]
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    last_id = int(last_id) if last_id and last_id.isdigit() else None
+
+    broker = push.get_broker()
+    sub = broker.subscribe(conn, course_ids, last_id)
+    db.close_db()
+    response = Response(broker.stream(sub), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(lambda: broker.unsubscribe(sub))  # also if streaming never started
+    return response
+
+
+@bp.route('/updates')
+@login_required
+def updates():
+    conn = get_db()
+    c = conn.cursor()
+
+    role = session.get('role')
+    user_id = session.get('user_id')
+
+    # Newest first, one page at a time (cursor = created_at, id of the last update shown)
+    (before_created, before_id), limit = page_args(default_cursor=('9999-12-31', MAX_ID))
+
+    if role == 'student':
+        # Only updates from the student's courses, read from their inbox (feed.py)
+        rows = feed.page(conn, user_id, (before_created, before_id), limit + 1)
+    else:
+        # Admin or teacher can see all updates
+        c.execute('''
+            SELECT updates.id, updates.message, updates.created_at, updates.teacher_id,
+                   users.name, updates.title
+            FROM updates
+            JOIN users ON updates.teacher_id = users.id
+            WHERE (updates.created_at, updates.id) < (?, ?)
+            ORDER BY updates.created_at DESC, updates.id DESC
+            LIMIT ?
+        ''', (before_created, before_id, limit + 1))
+        rows = c.fetchall()
+
+    updates, next_cursor = make_page(rows, limit, key=lambda u: (u['created_at'], u['id']))
+
+    return render_template('updates.html', updates=updates, next_cursor=next_cursor)
+
+
+def load_events_page(conn):
+    # Latest event date first, then events without a date, paged on (date, id).
+    # The first comparison lets SQLite seek the idx_events_date_key index.
+    (before_date, before_id), limit = page_args(default_cursor=('9999-12-31', MAX_ID))
+    events = conn.execute('''
+        SELECT * FROM events
+        WHERE COALESCE(event_date, '') <= ? AND (COALESCE(event_date, ''), id) < (?, ?)
+        ORDER BY COALESCE(event_date, '') DESC, id DESC
+        LIMIT ?
+    ''', (before_date, before_date, before_id, limit + 1)).fetchall()
+    return make_page(events, limit, key=lambda e: (e['event_date'] or '', e['id']))
+
+
+@bp.route('/events')
+@login_required
+def events():
+    conn = get_db()
+    events, next_cursor = load_events_page(conn)
+    return render_template('events.html', events=events, next_cursor=next_cursor)
+
+
+# Full-text search (search.py); ?format=json for the same results as JSON
+@bp.route('/search')
+@login_required
+def search_results():
+    q = request.args.get('q', '').strip()[:200]
+    results = search.search(get_db(), q, session['user_id'], session.get('role')) if q else []
+    if request.args.get('format') == 'json':
+        return jsonify(query=q, results=results)
+    return render_template('search.html', q=q, results=results)